@@ -61,7 +61,8 @@ REM Run the master installer Python script
 echo Starting master installer...
 echo.
 
-python "%SRC_DIR%\master_installer.py"
+REM Arguments are passed through (e.g. --offline-bundle PATH)
+python "%SRC_DIR%\master_installer.py" %*
 
 REM Capture exit code
 set "EXIT_CODE=%errorlevel%"
@@ -9,6 +9,9 @@ import shutil
 from pathlib import Path
 from typing import Optional, Tuple
 
+from bandwidth_scheduler import Priority, get_scheduler
+from retry_policy import CircuitOpenError, RetryPolicy, is_transient_output
+
 try:
     from colorama import Fore, Style, init
     init(autoreset=True)
@@ -158,14 +161,32 @@ class AILabInstaller:
         self.print_info(f"Repository: {self.REPOSITORY_URL}")
         print(f"\n{Fore.CYAN}This may take a few minutes depending on your connection...{Style.RESET_ALL}\n")
 
-        try:
-            result = subprocess.run(
+        # Network failures are retried with backoff; errors such as a missing repository are not
+        policy = RetryPolicy.from_config(max_attempts=3)
+        attempts = []
+
+        def clone() -> subprocess.CompletedProcess:
+            if attempts and self.target_path.exists():
+                # A failed clone can leave a partial directory that blocks the next one
+                shutil.rmtree(self.target_path, ignore_errors=True)
+            attempts.append(True)
+            return subprocess.run(
                 ['git', 'clone', self.REPOSITORY_URL, str(self.target_path)],
                 capture_output=True,
                 text=True,
                 timeout=300  # 5 minute timeout
             )
 
+        def announce_retry(attempt: int, delay: float):
+            self.print_warning(f"Git clone hit a network error, retrying in {delay:.0f} seconds "
+                               f"(attempt {attempt}/{policy.max_attempts})...")
+
+        try:
+            with get_scheduler().transfer("git clone AI_Lab", Priority.NORMAL, external=True):
+                result = policy.call(clone, "git clone AI_Lab", host=self.REPOSITORY_URL,
+                                     retry_result=lambda r: r.returncode != 0 and is_transient_output(r.stderr),
+                                     on_retry=announce_retry)
+
             if result.returncode == 0:
                 self.print_success(f"Repository cloned successfully")
                 return True
@@ -176,6 +197,9 @@ class AILabInstaller:
         except subprocess.TimeoutExpired:
             self.print_error("Git clone timed out (network issue or repository too large)")
             return False
+        except CircuitOpenError:
+            self.print_error("GitHub is not reachable at the moment. Please try again later.")
+            return False
         except Exception as e:
             self.print_error(f"Git clone error: {e}")
             return False
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artifact Cache - Machine-wide cache of downloaded installer artifacts
+Artifacts are stored once by sha256 and looked up by digest or source URL,
+so a reinstall on the same machine copies or hardlinks instead of downloading
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+
+class ArtifactCache:
+    """Content-addressed artifact cache with LRU eviction"""
+
+    DEFAULT_MAX_SIZE_GB = 20
+    INDEX_VERSION = 1
+    LOCK_TIMEOUT = 30  # seconds to wait for another process holding the index lock
+    STALE_LOCK_AGE = 120  # seconds after which a leftover lock file is ignored
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size_gb: float = DEFAULT_MAX_SIZE_GB):
+        """
+        Initialize artifact cache
+
+        Args:
+            cache_dir: Cache root directory (machine-wide default if None)
+            max_size_gb: Size cap; least recently used artifacts are evicted above it
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else self.default_cache_dir()
+        self.max_size_bytes = int(max_size_gb * 1024 ** 3)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.index_file = self.cache_dir / "index.json"
+        self.lock_file = self.cache_dir / "index.lock"
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def default_cache_dir() -> Path:
+        """Get machine-wide cache location (AI_ENV_CACHE_DIR overrides it)"""
+        override = os.environ.get("AI_ENV_CACHE_DIR")
+        if override:
+            return Path(override)
+
+        if os.name == 'nt':
+            program_data = os.environ.get("PROGRAMDATA", "C:\\ProgramData")
+            return Path(program_data) / "AI_Environment_Installer" / "cache"
+
+        return Path.home() / ".cache" / "ai_environment_installer"
+
+    @staticmethod
+    def default_staging_dir() -> Path:
+        """Get the machine-wide directory prefetched downloads are staged in (next to the cache)"""
+        return ArtifactCache.default_cache_dir().parent / "staging"
+
+    @classmethod
+    def from_config(cls, config_file: Path) -> Optional["ArtifactCache"]:
+        """
+        Create cache from the download_cache section of install_config.json
+
+        Returns:
+            ArtifactCache, or None if the cache is disabled
+        """
+        settings: Dict[str, Any] = {}
+        try:
+            if config_file.exists():
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    settings = json.load(f).get("download_cache", {})
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not read cache settings: {e}")
+
+        if not settings.get("enabled", True):
+            return None
+
+        cache_dir = settings.get("path")
+        return cls(Path(cache_dir) if cache_dir else None,
+                   settings.get("max_size_gb", cls.DEFAULT_MAX_SIZE_GB))
+
+    def _blob_path(self, sha256: str) -> Path:
+        """Get storage path of an artifact"""
+        return self.blobs_dir / sha256[:2] / sha256
+
+    def _acquire_lock(self) -> bool:
+        """Take the inter-process index lock"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        deadline = time.time() + self.LOCK_TIMEOUT
+
+        while True:
+            try:
+                fd = os.open(str(self.lock_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - self.lock_file.stat().st_mtime > self.STALE_LOCK_AGE:
+                        self.lock_file.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    self.logger.warning("Timed out waiting for artifact cache lock")
+                    return False
+                time.sleep(0.1)
+
+    def _release_lock(self):
+        """Release the inter-process index lock"""
+        try:
+            self.lock_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _load_index(self) -> Dict[str, Any]:
+        """Load index from disk"""
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get("version") == self.INDEX_VERSION:
+                    return index
+        except Exception as e:
+            self.logger.warning(f"Artifact cache index unreadable, starting empty: {e}")
+
+        return {"version": self.INDEX_VERSION, "entries": {}}
+
+    def _save_index(self, index: Dict[str, Any]):
+        """Save index atomically"""
+        temp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def _link_or_copy(source: Path, destination: Path) -> str:
+        """Hardlink source to destination, copying when linking isn't possible"""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists():
+            destination.unlink()
+
+        try:
+            os.link(source, destination)
+            return "hardlink"
+        except OSError:
+            # Different volume or filesystem without hardlinks (e.g. FAT32 USB sticks)
+            temp_file = destination.with_name(destination.name + ".cache-tmp")
+            shutil.copyfile(source, temp_file)
+            os.replace(temp_file, destination)
+            return "copy"
+
+    def lookup(self, url: Optional[str] = None, checksum: Optional[str] = None) -> Optional[str]:
+        """
+        Find a cached artifact by sha256 digest or by source URL
+
+        Returns:
+            sha256 of the cached artifact, or None on a miss
+        """
+        if not self.index_file.exists():
+            return None
+        if not self._acquire_lock():
+            return None
+
+        try:
+            index = self._load_index()
+            entries = index["entries"]
+
+            sha256 = None
+            if checksum and checksum.lower() in entries:
+                sha256 = checksum.lower()
+            elif url and not checksum:
+                # Most recently stored artifact for this URL
+                candidates = [(entry.get("added", 0), digest) for digest, entry in entries.items()
+                              if url in entry.get("urls", [])]
+                if candidates:
+                    sha256 = max(candidates)[1]
+
+            if sha256 is None:
+                return None
+
+            blob = self._blob_path(sha256)
+            if not blob.exists() or blob.stat().st_size != entries[sha256]["size"]:
+                self.logger.warning(f"Dropping damaged cache entry {sha256[:12]}")
+                del entries[sha256]
+                blob.unlink(missing_ok=True)
+                self._save_index(index)
+                return None
+
+            entries[sha256]["last_access"] = time.time()
+            self._save_index(index)
+            return sha256
+
+        except Exception as e:
+            self.logger.warning(f"Artifact cache lookup failed: {e}")
+            return None
+        finally:
+            self._release_lock()
+
+    def get_http_metadata(self, sha256: str, url: str) -> Optional[Dict[str, Any]]:
+        """Get HTTP validators recorded when the artifact was downloaded from url"""
+        try:
+            entry = self._load_index()["entries"].get(sha256, {})
+            return entry.get("http", {}).get(url)
+        except Exception:
+            return None
+
+    def get_entry(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Get the index entry of a cached artifact (size, added, urls, ...)"""
+        try:
+            return self._load_index()["entries"].get(sha256)
+        except Exception:
+            return None
+
+    def materialize(self, sha256: str, destination: Path) -> bool:
+        """Place a cached artifact at destination (hardlink when possible)"""
+        try:
+            method = self._link_or_copy(self._blob_path(sha256), destination)
+            self.logger.info(f"Artifact cache hit ({method}): {destination.name}")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Could not copy cached artifact to {destination}: {e}")
+            return False
+
+    def add(self, file_path: Path, url: Optional[str] = None, sha256: Optional[str] = None,
+            http_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Store a downloaded file in the cache
+
+        Args:
+            file_path: Downloaded file
+            url: Source URL (for URL lookups)
+            sha256: Digest of the file if already known
+            http_metadata: HTTP validators (ETag, Last-Modified) the URL served it with
+
+        Returns:
+            sha256 of the stored artifact, or None on failure
+        """
+        try:
+            if sha256 is None:
+                hash_func = hashlib.sha256()
+                with open(file_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        hash_func.update(chunk)
+                sha256 = hash_func.hexdigest()
+            sha256 = sha256.lower()
+
+            size = file_path.stat().st_size
+            if size > self.max_size_bytes:
+                self.logger.info(f"Not caching {file_path.name}: larger than cache size cap")
+                return None
+
+            blob = self._blob_path(sha256)
+            if not blob.exists():
+                self._link_or_copy(file_path, blob)
+
+            if not self._acquire_lock():
+                return None
+            try:
+                index = self._load_index()
+                entry = index["entries"].setdefault(sha256, {
+                    "size": size,
+                    "name": file_path.name,
+                    "urls": [],
+                    "added": time.time()
+                })
+                if url and url not in entry["urls"]:
+                    entry["urls"].append(url)
+                if url and http_metadata:
+                    entry.setdefault("http", {})[url] = http_metadata
+                entry["last_access"] = time.time()
+
+                self._evict(index, keep=sha256)
+                self._save_index(index)
+            finally:
+                self._release_lock()
+
+            self.logger.info(f"Stored in artifact cache: {file_path.name} ({sha256[:12]})")
+            return sha256
+
+        except Exception as e:
+            self.logger.warning(f"Could not add {file_path.name} to artifact cache: {e}")
+            return None
+
+    def _evict(self, index: Dict[str, Any], max_size_bytes: Optional[int] = None, keep: Optional[str] = None) -> List[str]:
+        """Evict least recently used entries until the cache fits the size cap"""
+        limit = self.max_size_bytes if max_size_bytes is None else max_size_bytes
+        entries = index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        evicted = []
+
+        for sha256, entry in sorted(entries.items(), key=lambda item: item[1].get("last_access", 0)):
+            if total <= limit:
+                break
+            if sha256 == keep:
+                continue
+            self._blob_path(sha256).unlink(missing_ok=True)
+            total -= entry["size"]
+            evicted.append(sha256)
+
+        for sha256 in evicted:
+            del entries[sha256]
+            self.logger.info(f"Evicted from artifact cache: {sha256[:12]}")
+
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        index = self._load_index()
+        entries = index["entries"]
+        return {
+            "cache_dir": str(self.cache_dir),
+            "artifacts": len(entries),
+            "total_bytes": sum(entry["size"] for entry in entries.values()),
+            "max_size_bytes": self.max_size_bytes,
+            "entries": [
+                {
+                    "sha256": sha256,
+                    "name": entry.get("name"),
+                    "size": entry["size"],
+                    "urls": entry.get("urls", []),
+                    "last_access": entry.get("last_access")
+                }
+                for sha256, entry in sorted(entries.items(), key=lambda item: -item[1].get("last_access", 0))
+            ]
+        }
+
+    def prune(self, max_size_gb: Optional[float] = None) -> int:
+        """
+        Evict least recently used artifacts down to the size cap
+
+        Args:
+            max_size_gb: Target size (configured cap if None, 0 empties the cache)
+
+        Returns:
+            Number of artifacts removed
+        """
+        if not self._acquire_lock():
+            return 0
+        try:
+            index = self._load_index()
+            limit = None if max_size_gb is None else int(max_size_gb * 1024 ** 3)
+            evicted = self._evict(index, max_size_bytes=limit)
+            self._save_index(index)
+            return len(evicted)
+        finally:
+            self._release_lock()
+
+
+def main():
+    """Command-line interface for the artifact cache"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the machine-wide installer artifact cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show cached artifacts and total size")
+    prune_parser = subparsers.add_parser("prune", help="Evict least recently used artifacts")
+    prune_parser.add_argument("--max-size-gb", type=float, default=None,
+                              help="Target cache size (defaults to the configured cap, 0 empties the cache)")
+
+    args = parser.parse_args()
+
+    config_file = Path(__file__).parent.parent / "config" / "install_config.json"
+    cache = ArtifactCache.from_config(config_file)
+    if cache is None:
+        print("Artifact cache is disabled in install_config.json")
+        sys.exit(1)
+
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"Cache directory: {stats['cache_dir']}")
+        print(f"Artifacts:       {stats['artifacts']}")
+        print(f"Total size:      {stats['total_bytes']/(1024**2):.1f} MB "
+              f"(cap {stats['max_size_bytes']/(1024**3):.1f} GB)")
+        for entry in stats["entries"]:
+            print(f"  {entry['sha256'][:12]}  {entry['size']/(1024**2):8.1f} MB  {entry['name']}")
+
+    elif args.command == "prune":
+        removed = cache.prune(args.max_size_gb)
+        print(f"Removed {removed} artifact(s)")
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
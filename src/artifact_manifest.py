@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artifact Manifest - Versioned list of downloadable components and their mirrors
+Reads config/artifact_manifest.json and ranks mirrors by measured latency and throughput
+"""
+
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+
+class ArtifactManifest:
+    """Pinned artifact manifest (URL, mirrors, expected size and digest per component version)"""
+
+    SUPPORTED_VERSION = 1
+
+    def __init__(self, data: Dict[str, Any], source: Optional[Path] = None):
+        self.data = data
+        self.source = source
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def load(cls, manifest_file: Path) -> Optional["ArtifactManifest"]:
+        """
+        Load manifest file
+
+        Returns:
+            ArtifactManifest, or None if the file is missing or unsupported
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            if not manifest_file.exists():
+                return None
+
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            if data.get("manifest_version") != cls.SUPPORTED_VERSION:
+                logger.warning(f"Unsupported artifact manifest version: {data.get('manifest_version')}")
+                return None
+
+            return cls(data, manifest_file)
+
+        except Exception as e:
+            logger.warning(f"Could not load artifact manifest {manifest_file}: {e}")
+            return None
+
+    def components(self) -> List[str]:
+        """Get names of all components in the manifest"""
+        return list(self.data.get("components", {}).keys())
+
+    def get(self, component: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get artifact entry for a component version
+
+        Args:
+            component: Component name (e.g. "vscode")
+            version: Version key (component's default_version if None)
+
+        Mirrors are only listed for entries with a sha256: without a digest
+        nothing would tell a tampered mirror copy from the real file, so
+        unpinned entries are fetched from their primary URL alone.
+
+        Returns:
+            Entry with component, version, filename, urls (primary first), sha256 and size_mb
+        """
+        component_info = self.data.get("components", {}).get(component)
+        if not component_info:
+            return None
+
+        version = version or component_info.get("default_version", "latest")
+        entry = component_info.get("versions", {}).get(version)
+        if not entry:
+            return None
+
+        return {
+            "component": component,
+            "version": version,
+            "filename": entry.get("filename"),
+            "urls": [entry["url"]] + self._mirrors(component, version, entry),
+            "sha256": entry.get("sha256"),
+            "size_mb": entry.get("size_mb")
+        }
+
+    def _mirrors(self, component: str, version: str, entry: Dict[str, Any]) -> List[str]:
+        """Get the mirrors of an entry that may be used (none unless its digest is pinned)"""
+        mirrors = list(entry.get("mirrors", []))
+        if mirrors and not entry.get("sha256"):
+            self.logger.debug(f"Ignoring mirrors of unpinned {component} {version}")
+            return []
+        return mirrors
+
+    def as_download_urls(self) -> Dict[str, Dict[str, Any]]:
+        """Get manifest in the shape of DownloadManager.get_download_urls"""
+        urls: Dict[str, Dict[str, Any]] = {}
+        for component, component_info in self.data.get("components", {}).items():
+            urls[component] = {}
+            for version, entry in component_info.get("versions", {}).items():
+                info = {"url": entry["url"], "mirrors": self._mirrors(component, version, entry)}
+                if entry.get("sha256"):
+                    info["checksum"] = entry["sha256"]
+                if entry.get("size_mb") is not None:
+                    info["size_mb"] = entry["size_mb"]
+                urls[component][version] = info
+        return urls
+
+
+class MirrorSelector:
+    """Ranks mirrors of an artifact by probing them concurrently"""
+
+    PROBE_BYTES = 256 * 1024  # Size of the throughput sample fetched from each mirror
+    PROBE_TIMEOUT = 10
+
+    def __init__(self, session):
+        self.session = session
+        self.logger = logging.getLogger(__name__)
+        self.measurements: Dict[str, Dict[str, Any]] = {}
+
+    def probe(self, url: str) -> Dict[str, Any]:
+        """
+        Measure latency (time to first byte) and throughput of one URL
+
+        Returns:
+            Dict with reachable, latency_ms and throughput_mbps
+        """
+        result = {"url": url, "reachable": False, "latency_ms": None, "throughput_mbps": None}
+        try:
+            start = time.time()
+            headers = {'Range': f'bytes=0-{self.PROBE_BYTES - 1}'}
+            with self.session.get(url, headers=headers, stream=True, timeout=self.PROBE_TIMEOUT) as response:
+                if response.status_code not in (200, 206):
+                    result["error"] = f"HTTP {response.status_code}"
+                    return result
+
+                first_byte = None
+                received = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if first_byte is None:
+                        first_byte = time.time()
+                    received += len(chunk)
+                    # A 206 body is read to its end, so the connection goes back to the pool warm
+                    if received >= self.PROBE_BYTES and response.status_code == 200:
+                        break
+
+            end = time.time()
+            first_byte = first_byte or end
+            result["reachable"] = True
+            result["latency_ms"] = round((first_byte - start) * 1000, 1)
+            transfer_time = max(end - first_byte, 1e-3)
+            result["throughput_mbps"] = round(received * 8 / transfer_time / 1e6, 2)
+
+        except Exception as e:
+            result["error"] = str(e)
+
+        return result
+
+    def rank(self, urls: List[str]) -> List[str]:
+        """
+        Probe all URLs concurrently and order them best first
+
+        Unreachable mirrors are kept at the end so they are still tried as a last resort.
+        """
+        if len(urls) <= 1:
+            return list(urls)
+
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            results = list(executor.map(self.probe, urls))
+        return self.order(urls, results)
+
+    def order(self, urls: List[str], results: List[Dict[str, Any]]) -> List[str]:
+        """Order URLs best first by their probe results (one per URL, as returned by probe)"""
+        for result in results:
+            self.measurements[result["url"]] = result
+            if result["reachable"]:
+                self.logger.info(f"Mirror {result['url']}: {result['latency_ms']} ms, "
+                                 f"{result['throughput_mbps']} Mbit/s")
+            else:
+                self.logger.warning(f"Mirror unreachable {result['url']}: {result.get('error')}")
+
+        def score(result: Dict[str, Any]) -> float:
+            # Estimated seconds to fetch 50 MB: latency plus transfer time
+            if not result["reachable"]:
+                return float('inf')
+            throughput = max(result["throughput_mbps"] or 0.01, 0.01)
+            return result["latency_ms"] / 1000 + (50 * 8 / throughput)
+
+        ranked = sorted(range(len(urls)), key=lambda i: (score(results[i]), i))
+        return [urls[i] for i in ranked]
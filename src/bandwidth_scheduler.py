@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bandwidth Scheduler - Shares the network link between concurrent transfers
+Token-bucket rate limits per priority class with an optional global cap
+"""
+
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from enum import IntEnum
+from pathlib import Path
+from typing import Optional, Dict, List
+
+
+class Priority(IntEnum):
+    """Transfer priority classes (lower value wins)"""
+    CRITICAL = 0  # Installers on the critical path (Miniconda, VS Code, Ollama)
+    NORMAL = 1    # Packages, extensions, repository clones
+    BULK = 2      # Large optional payloads (LLM models)
+
+
+class TokenBucket:
+    """Token bucket that lets callers go into debt and sleep it off"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate * 0.25, 64 * 1024)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, rate: float):
+        self._refill()
+        self.rate = rate
+        self.capacity = max(rate * 0.25, 64 * 1024)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: int) -> float:
+        """Take amount tokens and get the seconds to wait until they are covered"""
+        self._refill()
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def wait_time(self) -> float:
+        """Get the seconds until the current debt is paid off at the current rate"""
+        self._refill()
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class Transfer:
+    """Handle of one registered transfer"""
+
+    def __init__(self, scheduler: "BandwidthScheduler", name: str, priority: Priority, external: bool):
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.external = external
+        self.bytes_transferred = 0
+        self.started = time.monotonic()
+        self.last_active = self.started  # Last time bytes moved (registration counts as about to send)
+
+    def consume(self, amount: int):
+        """Account for amount bytes received, sleeping as long as the schedule requires"""
+        self.scheduler._consume(self, amount)
+
+
+class BandwidthScheduler:
+    """
+    Process-wide arbiter for network transfers
+
+    In-process transfers report every chunk through Transfer.consume. The
+    highest active priority class gets the link; outranked classes are held to
+    a share of it (of the global cap, or of the measured link throughput when
+    no cap is set). A transfer only counts as active while it moves bytes: one
+    that is registered but idle (HEAD requests, retry backoff, waiting for
+    disk space) stops holding the others back after IDLE_AFTER seconds.
+    External transfers (ollama pull, git clone) can't be metered, so they
+    are admitted only while no higher priority transfer runs.
+    """
+
+    # Fraction of the link an outranked class may use
+    OUTRANKED_SHARE = {Priority.NORMAL: 0.3, Priority.BULK: 0.1}
+    REBALANCE_INTERVAL = 0.5  # Seconds between rate updates from the throughput estimate
+    IDLE_AFTER = 1.0          # Seconds without bytes after which a transfer stops counting as active
+    MAX_SLEEP = 0.25          # Longest throttling sleep before the class's rate is looked at again
+    MIN_LINK_RATE = 256 * 1024  # Floor of the link estimate in bytes/s
+
+    def __init__(self, max_mbps: Optional[float] = None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._transfers: List[Transfer] = []
+        self._class_buckets: Dict[Priority, TokenBucket] = {}
+        self.max_bytes_per_sec: Optional[float] = None
+
+        # Link throughput estimate (decaying peak of the aggregate rate)
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_uncapped = False  # Whether an unthrottled class sent in this window
+        self._link_rate = 0.0
+        self._last_rebalance = 0.0
+
+        self.set_cap(max_mbps)
+
+    def set_cap(self, max_mbps: Optional[float]):
+        """Set the global cap in Mbit/s (None or 0 for no cap)"""
+        with self._lock:
+            self.max_bytes_per_sec = max_mbps * 1e6 / 8 if max_mbps else None
+            self._rebalance()
+        if max_mbps:
+            self.logger.info(f"Bandwidth cap: {max_mbps} Mbit/s")
+
+    def active_transfers(self) -> List[Dict[str, object]]:
+        """Get name, priority and bytes of all registered transfers"""
+        with self._lock:
+            return [{"name": t.name, "priority": t.priority.name, "external": t.external,
+                     "bytes": t.bytes_transferred} for t in self._transfers]
+
+    @contextmanager
+    def transfer(self, name: str, priority: Priority = Priority.NORMAL, external: bool = False):
+        """
+        Register a transfer for the duration of the with block
+
+        External transfers block here until no higher priority transfer is active.
+        """
+        handle = Transfer(self, name, priority, external)
+        with self._changed:
+            if external:
+                waited = False
+                while any(t.priority < priority for t in self._transfers):
+                    if not waited:
+                        self.logger.info(f"{name} waiting for higher priority transfers to finish")
+                        waited = True
+                    self._changed.wait(timeout=1.0)
+            self._transfers.append(handle)
+            self._rebalance()
+
+        try:
+            yield handle
+        finally:
+            with self._changed:
+                self._transfers.remove(handle)
+                self._rebalance()
+                self._changed.notify_all()
+
+    def _rebalance(self):
+        """Recompute per-class rates (lock held)"""
+        now = time.monotonic()
+        classes = sorted({t.priority for t in self._transfers
+                          if t.external or now - t.last_active < self.IDLE_AFTER})
+        capacity = self.max_bytes_per_sec or self._link_rate
+
+        rates: Dict[Priority, Optional[float]] = {}
+        if classes:
+            top = classes[0]
+            reserved = 0.0
+            for priority in classes[1:]:
+                share = self.OUTRANKED_SHARE.get(priority, 0.1)
+                rates[priority] = share * capacity if capacity else None
+                reserved += rates[priority] or 0.0
+            if self.max_bytes_per_sec:
+                # Leave the top class at least half the cap
+                rates[top] = max(self.max_bytes_per_sec - reserved, self.max_bytes_per_sec * 0.5)
+            else:
+                rates[top] = None
+
+        for priority, rate in rates.items():
+            if rate is None:
+                self._class_buckets.pop(priority, None)
+            elif priority in self._class_buckets:
+                self._class_buckets[priority].set_rate(rate)
+            else:
+                self._class_buckets[priority] = TokenBucket(rate)
+        for priority in list(self._class_buckets):
+            if priority not in rates:
+                del self._class_buckets[priority]
+
+        self._last_rebalance = now
+
+    def _consume(self, transfer: Transfer, amount: int):
+        with self._lock:
+            now = time.monotonic()
+            resumed = now - transfer.last_active >= self.IDLE_AFTER
+            transfer.bytes_transferred += amount
+            transfer.last_active = now
+
+            # Update the link throughput estimate. Windows in which only throttled
+            # classes sent measure the throttle, not the link, so they can't lower it.
+            self._window_bytes += amount
+            if transfer.priority not in self._class_buckets:
+                self._window_uncapped = True
+            elapsed = now - self._window_start
+            if elapsed >= self.REBALANCE_INTERVAL:
+                current = self._window_bytes / elapsed
+                if self._window_uncapped:
+                    self._link_rate = max(current, self._link_rate * 0.9, self.MIN_LINK_RATE)
+                else:
+                    self._link_rate = max(current, self._link_rate)
+                self._window_start = now
+                self._window_bytes = 0
+                self._window_uncapped = False
+
+            # Rebalance regularly (transfers go idle) and at once when one starts sending again
+            if resumed or now - self._last_rebalance >= self.REBALANCE_INTERVAL:
+                self._rebalance()
+
+            bucket = self._class_buckets.get(transfer.priority)
+            delay = bucket.reserve(amount) if bucket else 0.0
+
+        # Sleep in short steps: the class may be promoted or its rate raised meanwhile
+        while delay > 0:
+            time.sleep(min(delay, self.MAX_SLEEP))
+            with self._lock:
+                if time.monotonic() - self._last_rebalance >= self.REBALANCE_INTERVAL:
+                    self._rebalance()
+                bucket = self._class_buckets.get(transfer.priority)
+                delay = bucket.wait_time() if bucket else 0.0
+
+
+_scheduler: Optional[BandwidthScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(config_file: Optional[Path] = None) -> BandwidthScheduler:
+    """
+    Get the process-wide scheduler
+
+    The first call reads the bandwidth section of install_config.json
+    (defaults to the installer's config directory).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            if config_file is None:
+                config_file = Path(__file__).parent.parent / "config" / "install_config.json"
+
+            max_mbps = None
+            try:
+                if config_file.exists():
+                    with open(config_file, 'r', encoding='utf-8') as f:
+                        max_mbps = json.load(f).get("bandwidth", {}).get("max_mbps")
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not read bandwidth settings: {e}")
+
+            _scheduler = BandwidthScheduler(max_mbps)
+        return _scheduler
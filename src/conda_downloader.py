@@ -7,21 +7,26 @@ Conda Downloader - Handles downloading Miniconda installer
 import os
 import logging
 from pathlib import Path
+from typing import Optional
 from download_manager import DownloadManager
 
 class CondaDownloader:
     """Handles Miniconda download operations"""
     
-    def __init__(self, ai_env_path: Path, logs_path: Path):
+    def __init__(self, ai_env_path: Path, logs_path: Path, download_manager: Optional[DownloadManager] = None):
         self.ai_env_path = ai_env_path
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
         
         # Download manager
-        self.download_manager = DownloadManager(logs_path)
+        self.download_manager = download_manager or DownloadManager(logs_path)
         
-        # Miniconda download URL (Windows 64-bit)
+        # Miniconda download URL (Windows 64-bit), pinned in the artifact manifest when available
         self.miniconda_url = "https://repo.anaconda.com/miniconda/Miniconda3-latest-Windows-x86_64.exe"
+        manifest = self.download_manager.manifest
+        entry = manifest.get("miniconda") if manifest else None
+        if entry:
+            self.miniconda_url = entry["urls"][0]
         
     def download_miniconda(self) -> Path:
         """Download Miniconda installer"""
@@ -34,13 +39,14 @@ class CondaDownloader:
             self.logger.info("Downloading Miniconda installer...")
             print("Downloading Miniconda (Python environment manager)...")
             
-            # Use simple download without description parameter
-            success = self.download_manager.download_file(
-                url=self.miniconda_url,
-                destination=installer_path
+            # Fetched from the fastest mirror listed in the artifact manifest
+            downloaded = self.download_manager.download_artifact(
+                "miniconda",
+                destination=installer_path,
+                fallback_url=self.miniconda_url
             )
             
-            if not success:
+            if not downloaded:
                 self.logger.error("Failed to download Miniconda installer")
                 return None
             
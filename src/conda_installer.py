@@ -10,12 +10,14 @@ import subprocess
 import logging
 import time
 from pathlib import Path
+from typing import Optional
 from conda_downloader import CondaDownloader
+from download_manager import DownloadManager
 
 class CondaInstaller:
     """Handles Miniconda installation operations"""
 
-    def __init__(self, ai_env_path: Path, logs_path: Path):
+    def __init__(self, ai_env_path: Path, logs_path: Path, download_manager: Optional[DownloadManager] = None):
         self.ai_env_path = ai_env_path
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
@@ -29,7 +31,7 @@ class CondaInstaller:
         self.conda_exe = self.conda_path / "Scripts" / "conda.exe"
 
         # Downloader
-        self.downloader = CondaDownloader(ai_env_path, logs_path)
+        self.downloader = CondaDownloader(ai_env_path, logs_path, download_manager)
 
     def check_existing_installation(self) -> dict:
         """
@@ -5,10 +5,17 @@ Conda Manager - Handles conda environments and package management
 """
 
 import os
+import json
+import tempfile
 import subprocess
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from env_runner import EnvRunner, get_env_runner
+from installed_index import InstalledIndex
+from retry_policy import CircuitOpenError, RetryPolicy, is_retryable, is_transient_output
 
 class CondaManager:
     """Manages conda environments and packages"""
@@ -30,11 +37,64 @@ class CondaManager:
         "seaborn", "seaborn>=", "seaborn==",
         "plotly", "plotly>=", "plotly=="
     }
+
+    # Hosts behind each package source, for their circuit breakers
+    CONDA_FORGE_HOST = "conda.anaconda.org"
+    DEFAULTS_HOST = "repo.anaconda.com"
+    PIP_HOST = "pypi.org"
     
-    def __init__(self, conda_exe: Path, ai_env_path: Path):
+    def __init__(self, conda_exe: Path, ai_env_path: Path, offline_bundle=None, wheel_dir: Optional[Path] = None,
+                 wheelhouse=None):
         self.conda_exe = conda_exe
         self.ai_env_path = ai_env_path
         self.logger = logging.getLogger(__name__)
+
+        # OfflineBundle to install from without network access (None for online installs)
+        self.offline_bundle = offline_bundle
+
+        # Prefetched wheels pip prefers over downloading (online installs only)
+        self.wheel_dir = wheel_dir
+
+        # Wheelhouse the batch install resolves and downloads into before installing offline from it
+        self.wheelhouse = wheelhouse
+        self._from_wheelhouse = False
+
+        self._prefixes: Dict[str, Path] = {}
+
+        # Network errors are retried with backoff before falling back to another source
+        self.retry_policy = RetryPolicy.from_config(max_attempts=3)
+
+    def _run_with_retry(self, cmd: List[str], name: str, host: str, timeout: int,
+                        env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+        """
+        Run a conda or pip command, retrying while it fails with network errors
+
+        Other failures are returned at once, so the caller can fall back to another
+        channel or to pip. Timeouts aren't retried: they are usually a slow solve.
+
+        Raises:
+            CircuitOpenError if host has been failing (never in offline mode)
+        """
+        def announce_retry(attempt: int, delay: float):
+            print(f"Network error during {name}, retrying in {delay:.0f} seconds "
+                  f"(attempt {attempt}/{self.retry_policy.max_attempts})")
+
+        return self.retry_policy.call(
+            lambda: subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env), name,
+            host=None if self.offline_bundle else host,
+            retry_result=lambda result: result.returncode != 0 and is_transient_output(result.stderr),
+            retry_error=lambda e: is_retryable(e) and not isinstance(e, subprocess.TimeoutExpired),
+            on_retry=announce_retry)
+
+    def _offline_env(self) -> Optional[Dict[str, str]]:
+        """Environment that adds the bundle's conda packages to the package cache"""
+        if not self.offline_bundle or not self.offline_bundle.conda_pkgs_dir:
+            return None
+        env = os.environ.copy()
+        # The first directory stays the writable default cache
+        default_pkgs = self.conda_exe.parent.parent / "pkgs"
+        env["CONDA_PKGS_DIRS"] = os.pathsep.join([str(default_pkgs), str(self.offline_bundle.conda_pkgs_dir)])
+        return env
     
     def create_environment(self, env_name: str = "AI2025", python_version: str = "3.10") -> bool:
         """Create conda environment"""
@@ -42,36 +102,34 @@ class CondaManager:
             self.logger.info(f"Creating conda environment: {env_name}")
             print(f"Creating conda environment: {env_name} with Python {python_version}")
             
-            # Create environment with specific Python version using conda-forge
-            cmd = [
-                str(self.conda_exe), 
-                "create", 
-                "--name", env_name,
-                f"python={python_version}",
-                "--channel", "conda-forge",
-                "--yes"
+            # Create environment with specific Python version using conda-forge, then the default channels
+            sources = [
+                ("conda-forge", ["--channel", "conda-forge"], self.CONDA_FORGE_HOST),
+                ("default channels", [], self.DEFAULTS_HOST),
             ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            
-            if result.returncode != 0:
-                self.logger.error(f"Failed to create conda environment: {result.stderr}")
-                
-                # Try with default channels if conda-forge fails
-                self.logger.info("Retrying with default channels...")
+            for label, channel_args, host in sources:
                 cmd = [
                     str(self.conda_exe), 
                     "create", 
                     "--name", env_name,
                     f"python={python_version}",
+                    *channel_args,
                     "--yes"
                 ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-                
-                if result.returncode != 0:
-                    self.logger.error(f"Failed to create conda environment with default channels: {result.stderr}")
-                    return False
+                if self.offline_bundle:
+                    cmd.append("--offline")
+
+                try:
+                    result = self._run_with_retry(cmd, f"conda create ({label})", host, 600, self._offline_env())
+                except CircuitOpenError as e:
+                    self.logger.warning(f"Skipping {label}: {e}")
+                    continue
+
+                if result.returncode == 0:
+                    break
+                self.logger.error(f"Failed to create conda environment with {label}: {result.stderr}")
+            else:
+                return False
             
             # Verify environment was created
             if not self._verify_environment(env_name):
@@ -85,6 +143,30 @@ class CondaManager:
             self.logger.error(f"Error creating conda environment: {e}")
             return False
     
+    def env_prefix(self, env_name: str) -> Path:
+        """Get the directory of an environment (usually <conda root>/envs/<name>)"""
+        if env_name in self._prefixes:
+            return self._prefixes[env_name]
+        # conda_exe is <root>/Scripts/conda.exe, <root>/condabin/conda.bat or <root>/bin/conda
+        prefix = Path(self.conda_exe).parent.parent / "envs" / env_name
+        if not (prefix / "conda-meta").is_dir():
+            # e.g. in the user profile when an all-users Miniconda isn't writable
+            try:
+                result = subprocess.run([str(self.conda_exe), "env", "list", "--json"],
+                                        capture_output=True, text=True, timeout=60)
+                listed = [Path(p) for p in json.loads(result.stdout).get("envs", []) if Path(p).name == env_name]
+            except (OSError, subprocess.TimeoutExpired, ValueError):
+                listed = []
+            if not listed:
+                return prefix
+            prefix = listed[0]
+        self._prefixes[env_name] = prefix
+        return prefix
+
+    def env_runner(self, env_name: str) -> EnvRunner:
+        """Get the runner that starts the environment's Python directly"""
+        return get_env_runner(self.env_prefix(env_name), self.conda_exe)
+
     def _verify_environment(self, env_name: str) -> bool:
         """Verify conda environment exists"""
         try:
@@ -134,6 +216,10 @@ class CondaManager:
                 self.logger.info(f"Fixed package name: {package} -> {fixed_package}")
                 package = fixed_package
             
+            # Offline installs only have the bundle's wheels
+            if self.offline_bundle and not use_pip:
+                return self.install_package(package, env_name, use_pip=True, timeout=timeout)
+
             # Check if this package should use pip directly
             if self._should_use_pip(package) and not use_pip:
                 self.logger.info(f"Package '{package}' is configured for pip-only installation")
@@ -141,30 +227,25 @@ class CondaManager:
                 return self.install_package(package, env_name, use_pip=True, timeout=timeout)
             
             # Determine timeout based on package
-            if "sentence-transformers" in package:
-                timeout = 600  # 10 minutes for large packages
-            elif "torch" in package or "transformers" in package:
-                timeout = 500  # 8+ minutes for ML packages
-            elif "streamlit" in package or "matplotlib" in package:
-                timeout = 400  # 6+ minutes for visualization packages
+            timeout = self._package_timeout(package, timeout)
             
             if use_pip:
                 # Use pip within conda environment
-                cmd = [
-                    str(self.conda_exe), "run", 
-                    "--name", env_name,
-                    "pip", "install", package
-                ]
+                cmd = self._pip_command([package], env_name)
             else:
                 # Use conda to install with conda-forge first
-                cmd = [
-                    str(self.conda_exe), "install", 
-                    "--name", env_name,
-                    "--channel", "conda-forge",
-                    package, "--yes"
-                ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+                cmd = self._conda_command([package], env_name)
+            
+            try:
+                result = self._run_with_retry(cmd, f"{'pip' if use_pip else 'conda'} install {package}",
+                                              self.PIP_HOST if use_pip else self.CONDA_FORGE_HOST, timeout,
+                                              self.env_runner(env_name).environment() if use_pip else None)
+            except CircuitOpenError as e:
+                if use_pip:
+                    self.logger.error(f"Failed to install {package}: {e}")
+                    return False
+                self.logger.warning(f"{e}; installing {package} with pip")
+                return self.install_package(package, env_name, use_pip=True, timeout=timeout)
             
             if result.returncode != 0:
                 self.logger.warning(f"Conda install failed for {package}, trying pip: {result.stderr}")
@@ -186,27 +267,148 @@ class CondaManager:
             self.logger.error(f"Error installing package {package}: {e}")
             return False
     
-    def _fix_package_name(self, package: str) -> str:
+    @staticmethod
+    def _package_timeout(package: str, default: int = 300) -> int:
+        """Get the install time limit of a package in seconds"""
+        if "sentence-transformers" in package:
+            return 600  # 10 minutes for large packages
+        if "torch" in package or "transformers" in package:
+            return 500  # 8+ minutes for ML packages
+        if "streamlit" in package or "matplotlib" in package:
+            return 400  # 6+ minutes for visualization packages
+        return default
+
+    def _pip_command(self, packages: List[str], env_name: str) -> List[str]:
+        """Build a pip install of packages within the conda environment"""
+        cmd = self.env_runner(env_name).pip_command("install")
+        if self.offline_bundle and self.offline_bundle.wheel_dir:
+            cmd += ["--no-index", "--find-links", str(self.offline_bundle.wheel_dir)]
+        elif self._from_wheelhouse:
+            cmd += self.wheelhouse.pip_args()
+        elif self.wheel_dir:
+            cmd += ["--find-links", str(self.wheel_dir)]
+        return cmd + list(packages)
+
+    def _lock_source_args(self) -> List[str]:
+        """pip options for the lockfile's hash lookup: the local wheels first, the index only when online"""
+        if self.offline_bundle:
+            return ["--no-index", "--find-links", str(self.offline_bundle.wheel_dir)]
+        directories = [self.wheelhouse.path, *self.wheelhouse.find_links] if self.wheelhouse else []
+        if self.wheel_dir and self.wheel_dir not in directories:
+            directories.append(self.wheel_dir)
+        return [arg for directory in directories if Path(directory).is_dir()
+                for arg in ("--find-links", str(directory))]
+
+    def _conda_command(self, packages: List[str], env_name: str) -> List[str]:
+        """Build a conda install of packages from conda-forge"""
+        return [str(self.conda_exe), "install", "--name", env_name, "--channel", "conda-forge", *packages, "--yes"]
+
+    @staticmethod
+    def _fix_package_name(package: str) -> str:
         """Fix common package name issues"""
         # Fix langraph -> langgraph
         if package.startswith("langraph"):
             return package.replace("langraph", "langgraph", 1)
         return package
     
+    def _install_transaction(self, packages: List[str], env_name: str, use_pip: bool) -> bool:
+        """Install packages with one conda transaction or one pip resolution"""
+        tool = "pip" if use_pip else "conda"
+        cmd = self._pip_command(packages, env_name) if use_pip else self._conda_command(packages, env_name)
+        timeout = sum(self._package_timeout(package) for package in packages)
+        try:
+            result = self._run_with_retry(cmd, f"{tool} install ({len(packages)} packages)",
+                                          self.PIP_HOST if use_pip else self.CONDA_FORGE_HOST, timeout,
+                                          self.env_runner(env_name).environment() if use_pip else None)
+        except subprocess.TimeoutExpired:
+            self.logger.warning(f"{tool} install of {packages} timed out after {timeout} seconds")
+            return False
+        except CircuitOpenError as e:
+            self.logger.warning(f"{tool} install of {packages} skipped: {e}")
+            return False
+
+        if result.returncode != 0:
+            self.logger.warning(f"{tool} install of {packages} failed: {result.stderr}")
+            return False
+        self.logger.info(f"Installed with {tool}: {packages}")
+        return True
+
+    def _install_bisecting(self, packages: List[str], env_name: str, use_pip: bool) -> List[str]:
+        """
+        Install packages in one transaction, splitting a failed one in halves
+
+        Returns:
+            The packages that fail even on their own
+        """
+        if not packages or self._install_transaction(packages, env_name, use_pip):
+            return []
+        if len(packages) == 1:
+            return list(packages)
+
+        middle = len(packages) // 2
+        print(f"{'pip' if use_pip else 'conda'} install of {len(packages)} packages failed, "
+              f"retrying as {middle} + {len(packages) - middle}")
+        return (self._install_bisecting(packages[:middle], env_name, use_pip)
+                + self._install_bisecting(packages[middle:], env_name, use_pip))
+
     def install_packages_batch(self, packages: List[str], env_name: str = "AI2025") -> bool:
-        """Install multiple packages in conda environment"""
+        """
+        Install multiple packages in conda environment
+
+        Specs the environment already satisfies are skipped, judged from its
+        metadata on disk (see InstalledIndex). The rest are split into a conda
+        set and a pip set (pip-only packages, or everything when installing
+        offline). Each set is installed in a single transaction, so
+        dependencies are solved once. A failed
+        transaction is bisected to find the packages that break it. Packages
+        conda can't install join the pip set, as install_package does for one.
+
+        With a wheelhouse, the pip set is resolved and all its wheels are
+        downloaded in parallel first; pip then installs without an index.
+        Packages that fail that way get one more try from the index.
+        """
         try:
             self.logger.info(f"Installing {len(packages)} packages in environment '{env_name}'")
-            
-            success_count = 0
-            failed_packages = []
-            
-            for package in packages:
-                print(f"Installing: {package}")
-                if self.install_package(package, env_name):
-                    success_count += 1
-                else:
-                    failed_packages.append(package)
+
+            specs = [self._fix_package_name(package) for package in packages]
+            index = InstalledIndex(self.env_prefix(env_name))
+            missing = [spec for spec in specs if not index.satisfies(spec)]
+            if len(missing) < len(specs):
+                print(f"{len(specs) - len(missing)} of {len(specs)} packages already installed")
+                self.logger.info(f"Already satisfied: {[spec for spec in specs if spec not in missing]}")
+
+            pip_specs = [spec for spec in missing if self.offline_bundle or self._should_use_pip(spec)]
+            conda_specs = [spec for spec in missing if spec not in pip_specs]
+
+            if conda_specs:
+                print(f"Installing {len(conda_specs)} packages with conda: {' '.join(conda_specs)}")
+                conda_failed = self._install_bisecting(conda_specs, env_name, use_pip=False)
+                if conda_failed:
+                    self.logger.warning(f"Conda could not install {conda_failed}, trying pip")
+                    pip_specs += conda_failed
+
+            failed_specs = []
+            if pip_specs:
+                if self.wheelhouse and not self.offline_bundle:
+                    print(f"Downloading wheels for {len(pip_specs)} packages...")
+                    runner = self.env_runner(env_name)
+                    self._from_wheelhouse = self.wheelhouse.prefetch(pip_specs, runner.python_command(),
+                                                                     env=runner.environment()) is not None
+                    if not self._from_wheelhouse:
+                        print("Wheel download failed, pip will download packages itself")
+
+                try:
+                    print(f"Installing {len(pip_specs)} packages with pip: {' '.join(pip_specs)}")
+                    failed_specs = self._install_bisecting(pip_specs, env_name, use_pip=True)
+                    if failed_specs and self._from_wheelhouse:
+                        self._from_wheelhouse = False
+                        print(f"Retrying {len(failed_specs)} packages from the package index")
+                        failed_specs = self._install_bisecting(failed_specs, env_name, use_pip=True)
+                finally:
+                    self._from_wheelhouse = False
+
+            failed_packages = [package for package, spec in zip(packages, specs) if spec in failed_specs]
+            success_count = len(packages) - len(failed_packages)
             
             self.logger.info(f"Package installation completed: {success_count}/{len(packages)} successful")
             
@@ -221,6 +423,129 @@ class CondaManager:
             self.logger.error(f"Error installing packages batch: {e}")
             return False
     
+    @staticmethod
+    def lockfile_paths(lock_dir: Path, env_name: str = "AI2025") -> Tuple[Path, Path]:
+        """Get the conda explicit list and the pip requirements file of an environment's lockfile"""
+        return lock_dir / f"{env_name}.conda-lock.txt", lock_dir / f"{env_name}.pip-lock.txt"
+
+    def write_lockfile(self, env_name: str, lock_dir: Path) -> bool:
+        """
+        Record the exact contents of an environment
+
+        Conda packages go to an explicit URL list with MD5s, pip packages to a
+        requirements file with exact versions and the sha256 of the file pip
+        picks for this platform, looked up with a dry run. Wheels of the
+        wheelhouse or prefetch are hashed where they are; offline bundles are
+        hashed from their wheels only, without touching the index.
+        """
+        try:
+            conda_lock, pip_lock = self.lockfile_paths(lock_dir, env_name)
+            # Nothing was installed or removed since the lockfile was written
+            changed = InstalledIndex(self.env_prefix(env_name)).modified()
+            if conda_lock.exists() and pip_lock.exists() and changed and \
+                    min(conda_lock.stat().st_mtime, pip_lock.stat().st_mtime) > changed:
+                self.logger.info(f"Lockfile of {env_name} is up to date")
+                return True
+
+            result = subprocess.run([str(self.conda_exe), "list", "--name", env_name, "--explicit", "--md5"],
+                                    capture_output=True, text=True, timeout=120)
+            if result.returncode != 0 or "@EXPLICIT" not in result.stdout:
+                self.logger.error(f"Cannot list conda packages of {env_name}: {result.stderr}")
+                return False
+            conda_text = result.stdout
+
+            result = subprocess.run([str(self.conda_exe), "list", "--name", env_name, "--json"],
+                                    capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                self.logger.error(f"Cannot list packages of {env_name}: {result.stderr}")
+                return False
+            pins = [f"{p['name']}=={p['version']}" for p in json.loads(result.stdout) if p.get("channel") == "pypi"]
+
+            requirements = []
+            if pins and self.offline_bundle and not self.offline_bundle.wheel_dir:
+                self.logger.warning("Offline bundle has no wheels to hash pip packages from, lockfile not written")
+                return False
+            if pins:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    report_file = Path(temp_dir) / "report.json"
+                    runner = self.env_runner(env_name)
+                    cmd = runner.pip_command("install", "--dry-run", "--ignore-installed", "--no-deps", "--quiet",
+                                             "--report", str(report_file), *self._lock_source_args(), *pins)
+                    result = self._run_with_retry(cmd, "pip hash lookup", self.PIP_HOST, 600, runner.environment())
+                    if result.returncode != 0 or not report_file.exists():
+                        self.logger.error(f"Cannot look up pip package hashes: {result.stderr}")
+                        return False
+                    with open(report_file, 'r', encoding='utf-8') as f:
+                        report = json.load(f)
+                for item in report.get("install", []):
+                    sha256 = item.get("download_info", {}).get("archive_info", {}).get("hashes", {}).get("sha256")
+                    if not sha256:
+                        self.logger.error(f"No hash for {item['metadata']['name']}, lockfile not written")
+                        return False
+                    requirements.append(f"{item['metadata']['name']}=={item['metadata']['version']} "
+                                        f"--hash=sha256:{sha256}")
+
+            lock_dir.mkdir(parents=True, exist_ok=True)
+            header = f"# Locked from environment {env_name} on {datetime.now().isoformat(timespec='seconds')}\n"
+            for path, text in ((conda_lock, header + conda_text),
+                               (pip_lock, header + "\n".join(sorted(requirements, key=str.lower)) + "\n")):
+                temp_file = path.with_name(path.name + ".tmp")
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(temp_file, path)
+
+            self.logger.info(f"Lockfile written: {conda_lock.name}, {pip_lock.name} "
+                             f"({len(requirements)} pip packages)")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error writing lockfile: {e}")
+            return False
+
+    def replay_lockfile(self, env_name: str, lock_dir: Path) -> bool:
+        """
+        Create an environment from its lockfile without solving
+
+        One `conda create --file` of the explicit list, then one pip install
+        of the requirements file with --no-deps and --require-hashes.
+        """
+        try:
+            conda_lock, pip_lock = self.lockfile_paths(lock_dir, env_name)
+            if not conda_lock.exists() or not pip_lock.exists():
+                self.logger.info(f"No lockfile for {env_name} in {lock_dir}")
+                return False
+
+            print(f"Creating environment {env_name} from {conda_lock.name}")
+            cmd = [str(self.conda_exe), "create", "--name", env_name, "--file", str(conda_lock), "--yes"]
+            if self.offline_bundle:
+                cmd.append("--offline")
+            result = self._run_with_retry(cmd, "conda create (lockfile)", self.CONDA_FORGE_HOST, 1800,
+                                          self._offline_env())
+            if result.returncode != 0:
+                self.logger.error(f"Conda lockfile replay failed: {result.stderr}")
+                return False
+
+            print(f"Installing pip packages from {pip_lock.name}")
+            cmd = self._pip_command(["--no-deps", "--require-hashes", "-r", str(pip_lock)], env_name)
+            result = self._run_with_retry(cmd, "pip install (lockfile)", self.PIP_HOST, 3600,
+                                          self.env_runner(env_name).environment())
+            if result.returncode != 0:
+                self.logger.error(f"Pip lockfile replay failed: {result.stderr}")
+                return False
+
+            self.logger.info(f"Environment {env_name} replayed from lockfile")
+            return True
+
+        except subprocess.TimeoutExpired:
+            self.logger.error("Lockfile replay timed out")
+            return False
+        except CircuitOpenError as e:
+            self.logger.error(f"Lockfile replay failed: {e}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error replaying lockfile: {e}")
+            return False
+
     def get_environment_info(self, env_name: str = "AI2025") -> Dict:
         """Get information about conda environment"""
         try:
@@ -256,8 +581,7 @@ class CondaManager:
     def _get_python_version(self, env_name: str) -> str:
         """Get Python version in environment"""
         try:
-            cmd = [str(self.conda_exe), "run", "--name", env_name, "python", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            result = self.env_runner(env_name).run(["--version"], timeout=30)
             return result.stdout.strip() if result.returncode == 0 else "unknown"
         except:
             return "unknown"
@@ -265,21 +589,7 @@ class CondaManager:
     def _get_installed_packages(self, env_name: str) -> List[str]:
         """Get list of installed packages"""
         try:
-            cmd = [str(self.conda_exe), "list", "--name", env_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode != 0:
-                return []
-            
-            packages = []
-            for line in result.stdout.split('\n'):
-                if line.strip() and not line.startswith('#'):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        packages.append(f"{parts[0]}=={parts[1]}")
-            
-            return packages
-            
+            return InstalledIndex(self.env_prefix(env_name)).as_requirements()
         except:
             return []
     
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dedup - Replaces identical files across AI_Environment installations with links
+Installations on the same volume (plus their uninstall backups) share one copy of
+each conda package, VS Code binary and model blob
+"""
+
+import os
+import sys
+import stat
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+from path_finder import AIEnvironmentPathFinder
+
+
+# Directories with user data or state that changes in place; a write through a link
+# would show up in every installation sharing it
+EXCLUDE_DIRS = {"Logs", "Projects", "data", "__pycache__"}
+EXCLUDE_SUFFIXES = {".json", ".log", ".txt", ".bat", ".ps1", ".cfg", ".ini", ".yml", ".yaml", ".pyc", ".lock"}
+
+BACKUP_PATTERN = "AI_Environment_Backup_*"  # Named by AutomatedUninstaller.backup_before_uninstall
+
+
+def find_installations() -> List[Path]:
+    """Get every AI_Environment installation plus the uninstall backups next to them"""
+    installations = AIEnvironmentPathFinder.find_all_installations()
+    backups = []
+    for installation in installations:
+        backups.extend(sorted(p for p in installation.parent.glob(BACKUP_PATTERN) if p.is_dir()))
+    return list(dict.fromkeys(installations + backups))
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    """Clone source into a new destination file sharing its blocks; False where unsupported"""
+    try:
+        if sys.platform.startswith("linux"):
+            import fcntl
+            FICLONE = 0x40049409  # btrfs, XFS
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        if sys.platform == "win32":
+            return _reflink_windows(source, destination)
+    except OSError:
+        pass
+    destination.unlink(missing_ok=True)
+    return False
+
+
+def _reflink_windows(source: Path, destination: Path) -> bool:
+    """Block cloning on ReFS volumes (Dev Drives); raises OSError where unsupported"""
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    FSCTL_DUPLICATE_EXTENTS_TO_FILE = 0x00098344
+    CHUNK = 1 << 30  # Clones are limited to less than 4 GB per call
+
+    class DuplicateExtentsData(ctypes.Structure):
+        _fields_ = [("FileHandle", wintypes.HANDLE), ("SourceFileOffset", ctypes.c_longlong),
+                    ("TargetFileOffset", ctypes.c_longlong), ("ByteCount", ctypes.c_longlong)]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    get_disk_free_space = kernel32.GetDiskFreeSpaceW
+    sectors, sector_size = wintypes.DWORD(), wintypes.DWORD()
+    if not get_disk_free_space(str(source.anchor), ctypes.byref(sectors), ctypes.byref(sector_size), None, None):
+        raise ctypes.WinError(ctypes.get_last_error())
+    cluster = sectors.value * sector_size.value
+
+    size = source.stat().st_size
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        dst.truncate(size)
+        data = DuplicateExtentsData(msvcrt.get_osfhandle(src.fileno()), 0, 0, 0)
+        target = msvcrt.get_osfhandle(dst.fileno())
+        returned = wintypes.DWORD()
+        for offset in range(0, size, CHUNK):
+            # Ranges end on a cluster boundary; the last one may reach past the end of file
+            count = min(CHUNK, size - offset)
+            data.SourceFileOffset = data.TargetFileOffset = offset
+            data.ByteCount = (count + cluster - 1) // cluster * cluster
+            if not kernel32.DeviceIoControl(wintypes.HANDLE(target), FSCTL_DUPLICATE_EXTENTS_TO_FILE,
+                                            ctypes.byref(data), ctypes.sizeof(data), None, 0,
+                                            ctypes.byref(returned), None):
+                raise ctypes.WinError(ctypes.get_last_error())
+    return True
+
+
+class Deduplicator:
+    """
+    Finds identical files across installations and links them together
+
+    Candidates are files on the same volume with the same size. They are
+    narrowed down by a hash of their first 64 KB, then by a full SHA-256
+    computed on a thread pool (hashlib releases the GIL on large reads).
+    A file is only replaced when its size and modification time are still
+    the ones that were hashed. Replacement is a reflink where the
+    filesystem supports one (the copies stay independent) and a hardlink
+    otherwise, created next to the file and moved over it atomically.
+    """
+
+    HEAD_SIZE = 64 * 1024
+    CHUNK_SIZE = 1024 * 1024
+    DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+    def __init__(self, roots: List[Path], min_size: int = 1024 * 1024, workers: Optional[int] = None):
+        self.roots = [Path(root) for root in roots]
+        self.min_size = max(1, min_size)
+        self.workers = max(1, workers or self.DEFAULT_WORKERS)
+        self.logger = logging.getLogger(__name__)
+
+    def _scan(self) -> Dict[Tuple[int, int], Dict[int, List[Tuple[Path, os.stat_result]]]]:
+        """Group candidate files by (volume, size), then by inode"""
+        groups: Dict[Tuple[int, int], Dict[int, List[Tuple[Path, os.stat_result]]]] = {}
+        for root in self.roots:
+            for directory, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+                for filename in filenames:
+                    path = Path(directory) / filename
+                    if path.suffix.lower() in EXCLUDE_SUFFIXES:
+                        continue
+                    try:
+                        info = path.lstat()
+                    except OSError:
+                        continue
+                    if not stat.S_ISREG(info.st_mode) or info.st_size < self.min_size:
+                        continue
+                    inodes = groups.setdefault((info.st_dev, info.st_size), {})
+                    inodes.setdefault(info.st_ino, []).append((path, info))
+        # Only sizes with more than one distinct file can be deduplicated
+        return {key: inodes for key, inodes in groups.items() if len(inodes) > 1}
+
+    def _hash(self, path: Path, limit: Optional[int] = None) -> Optional[str]:
+        """SHA-256 of a file (of its first limit bytes if given); None if it can't be read"""
+        digest = hashlib.sha256()
+        remaining = limit
+        try:
+            with open(path, 'rb') as f:
+                while remaining is None or remaining > 0:
+                    chunk = f.read(self.CHUNK_SIZE if remaining is None else min(self.CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    if remaining is not None:
+                        remaining -= len(chunk)
+        except OSError as e:
+            self.logger.warning(f"Cannot read {path}: {e}")
+            return None
+        return digest.hexdigest()
+
+    def _split(self, executor: ThreadPoolExecutor, sets: List[List[List[Tuple[Path, os.stat_result]]]],
+               limit: Optional[int]) -> List[List[List[Tuple[Path, os.stat_result]]]]:
+        """Split sets of inodes by the hash of one path of each; sets that stay unique are dropped"""
+        inodes = [inode for candidates in sets for inode in candidates]
+        digests = executor.map(lambda inode: self._hash(inode[0][0], limit), inodes)
+        by_digest: Dict[Tuple[int, str], List[List[Tuple[Path, os.stat_result]]]] = {}
+        for number, candidates in enumerate(sets):
+            for inode in candidates:
+                digest = next(digests)
+                if digest is not None:
+                    by_digest.setdefault((number, digest), []).append(inode)
+        return [candidates for candidates in by_digest.values() if len(candidates) > 1]
+
+    def find_duplicates(self) -> List[List[List[Tuple[Path, os.stat_result]]]]:
+        """
+        Find sets of identical files
+
+        Returns:
+            One entry per content: its inodes, each a list of (path, stat) of
+            the scanned paths linked to it
+        """
+        groups = self._scan()
+        sets = [list(inodes.values()) for inodes in groups.values()]
+        self.logger.info(f"Dedup scan: {sum(len(s) for s in sets)} candidate files in {len(sets)} size groups")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Files larger than the head only need a full hash if their heads match
+            large = [s for s in sets if s[0][0][1].st_size > self.HEAD_SIZE]
+            small = [s for s in sets if s[0][0][1].st_size <= self.HEAD_SIZE]
+            sets = small + self._split(executor, large, self.HEAD_SIZE)
+            return self._split(executor, sets, None)
+
+    def _unchanged(self, path: Path, info: os.stat_result) -> bool:
+        """Check that path is still the file that was hashed (same size and modification time)"""
+        try:
+            current = path.stat()
+        except OSError:
+            return False
+        if current.st_size != info.st_size or current.st_mtime_ns != info.st_mtime_ns:
+            self.logger.info(f"Skipping {path}: changed since it was hashed")
+            return False
+        return True
+
+    def _replace(self, keeper: Path, path: Path) -> Optional[str]:
+        """Replace path with a link to keeper; returns the method used, or None if it failed"""
+        temp = path.with_name(path.name + ".dedup-tmp")
+        temp.unlink(missing_ok=True)
+        method = "reflink" if _reflink(keeper, temp) else None
+        try:
+            if method is None:
+                os.link(keeper, temp)
+                method = "hardlink"
+            # Clones get the original's timestamps; hardlinks share the keeper's identical ones
+            if method == "reflink":
+                info = path.stat()
+                os.utime(temp, ns=(info.st_atime_ns, info.st_mtime_ns))
+            os.replace(temp, path)
+            return method
+        except OSError as e:
+            # e.g. a running executable or a file without write access
+            self.logger.warning(f"Cannot replace {path}: {e}")
+            temp.unlink(missing_ok=True)
+            return None
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Deduplicate the roots
+
+        Returns:
+            Statistics: duplicate_sets, files_linked, bytes_reclaimed,
+            hardlinks, reflinks, failed
+        """
+        stats = {"duplicate_sets": 0, "files_linked": 0, "bytes_reclaimed": 0,
+                 "hardlinks": 0, "reflinks": 0, "failed": 0}
+        for inodes in self.find_duplicates():
+            stats["duplicate_sets"] += 1
+            # Keep the inode with the most links, so the fewest paths move
+            inodes.sort(key=lambda paths: paths[0][1].st_nlink, reverse=True)
+            keeper, keeper_info = inodes[0][0]
+            keeper_changed = False
+            for paths in inodes[1:]:
+                linked = 0
+                for path, info in paths:
+                    if dry_run:
+                        linked += 1
+                        continue
+                    # Both files must still be the ones that were hashed
+                    if not self._unchanged(path, info):
+                        continue
+                    if not self._unchanged(keeper, keeper_info):
+                        keeper_changed = True
+                        break
+                    method = self._replace(keeper, path)
+                    if method is None:
+                        stats["failed"] += 1
+                        continue
+                    stats[method + "s"] += 1
+                    linked += 1
+                stats["files_linked"] += linked
+                # The space only comes back once no other link (outside the scan) keeps the file
+                if linked == len(paths) and paths[0][1].st_nlink == len(paths):
+                    stats["bytes_reclaimed"] += paths[0][1].st_size
+                if keeper_changed:
+                    break
+
+        self.logger.info(f"Dedup {'dry run' if dry_run else 'finished'}: {stats}")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link identical files across AI_Environment installations")
+    parser.add_argument("paths", nargs="*", help="Installations to deduplicate (default: all found on any drive, "
+                                                 "plus their uninstall backups)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be reclaimed")
+    parser.add_argument("--min-size-kb", type=int, default=1024, help="Ignore smaller files (default 1024)")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    roots = [Path(p) for p in args.paths] or find_installations()
+    if len(roots) < 2:
+        print("Need at least two installations to deduplicate", file=sys.stderr)
+        return 1
+    print("Installations:")
+    for root in roots:
+        print(f"  {root}")
+
+    stats = Deduplicator(roots, args.min_size_kb * 1024, args.workers).run(args.dry_run)
+    action = "Would link" if args.dry_run else "Linked"
+    print(f"{action} {stats['files_linked']} files in {stats['duplicate_sets']} duplicate sets")
+    if not args.dry_run:
+        print(f"  {stats['reflinks']} reflinks, {stats['hardlinks']} hardlinks, {stats['failed']} failed")
+    print(f"{'Reclaimable' if args.dry_run else 'Reclaimed'}: {stats['bytes_reclaimed'] / (1024 ** 3):.2f} GB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download Benchmark - Measures DownloadManager against a local fault-injecting HTTP server
+Every scenario downloads the same random file; results can be saved and compared run to run
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+import statistics
+import http.server
+import multiprocessing
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from download_engine import DownloadCancelled
+from download_manager import DownloadManager
+from progress_reporter import ProgressReporter
+
+
+# Fault settings understood by the server (all off by default)
+DEFAULT_FAULTS = {
+    "ranges": True,         # Advertise and honour Range requests
+    "rate_mbps": None,      # Per-connection bandwidth cap in MB/s
+    "latency_ms": 0,        # Delay before every response
+    "drop_after": None,     # Close GET responses after this fraction of their body...
+    "drop_count": 0,        # ...for this many responses
+    "length_lie": 0,        # Bytes added to the Content-Length of GET responses...
+    "lie_count": 0,         # ...for this many responses
+    "error_count": 0,       # Answer the first N requests (HEAD or GET) with 503
+}
+
+
+class _FaultHandler(http.server.BaseHTTPRequestHandler):
+    """Serves files from server.root, misbehaving as server.faults says"""
+
+    protocol_version = 'HTTP/1.1'
+    CHUNK_SIZE = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _take(self, counter: str) -> bool:
+        """Consume one use of a limited fault; False once it is used up"""
+        with self.server.lock:
+            if self.server.used[counter] < self.server.faults[counter]:
+                self.server.used[counter] += 1
+                return True
+        return False
+
+    def _serve(self, body: bool):
+        faults = self.server.faults
+        with self.server.requests.get_lock():
+            self.server.requests.value += 1
+
+        if faults["latency_ms"]:
+            time.sleep(faults["latency_ms"] / 1000)
+
+        if self._take("error_count"):
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        path = self.server.root / self.path.split('?')[0].lstrip('/')
+        if not path.is_file():
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        size = path.stat().st_size
+        start, end, status = 0, size - 1, 200
+        range_header = self.headers.get('Range')
+        if range_header and faults["ranges"]:
+            first, _, last = range_header.split('=', 1)[1].partition('-')
+            start, end, status = int(first), int(last) if last else size - 1, 206
+        length = end - start + 1
+
+        # A lying Content-Length: too long truncates the body, too short hides its end
+        advertised = length
+        if body and faults["length_lie"] and self._take("lie_count"):
+            advertised = max(length + faults["length_lie"], 0)
+
+        self.send_response(status)
+        if faults["ranges"]:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', f'"{size:x}-{int(path.stat().st_mtime):x}"')
+        self.send_header('Content-Length', str(advertised))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if not body:
+            return
+
+        to_send = min(length, advertised)
+        drop_at = None
+        if faults["drop_after"] is not None and self._take("drop_count"):
+            drop_at = int(to_send * faults["drop_after"])
+        rate = faults["rate_mbps"] * 1024 * 1024 if faults["rate_mbps"] else None
+
+        started = time.monotonic()
+        sent = 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while sent < to_send:
+                chunk = f.read(min(self.CHUNK_SIZE, to_send - sent))
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    break
+                sent += len(chunk)
+                with self.server.bytes_sent.get_lock():
+                    self.server.bytes_sent.value += len(chunk)
+                if drop_at is not None and sent >= drop_at:
+                    break
+                if rate:
+                    ahead = sent / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+        if sent < advertised:
+            self.close_connection = True
+
+
+def _run_server(root: str, faults: Dict[str, Any], port_queue, requests, bytes_sent):
+    """Server process entry point (top level, so it can be spawned on Windows)"""
+    import threading
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FaultHandler)
+    server.daemon_threads = True
+    server.root = Path(root)
+    server.faults = faults
+    server.used = {"drop_count": 0, "lie_count": 0, "error_count": 0}
+    server.lock = threading.Lock()
+    server.requests = requests
+    server.bytes_sent = bytes_sent
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FaultInjectingServer:
+    """
+    Local HTTP server that can throttle, delay, drop, lie and fail
+
+    Runs in its own process so the client's CPU time isn't mixed with the
+    server's. Request and byte counters are shared with this process.
+    """
+
+    def __init__(self, root: Path, **faults):
+        unknown = set(faults) - set(DEFAULT_FAULTS)
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {', '.join(sorted(unknown))}")
+        self.root = root
+        self.faults = dict(DEFAULT_FAULTS, **faults)
+        self.requests = multiprocessing.Value('q', 0)
+        self.bytes_sent = multiprocessing.Value('q', 0)
+        self.port: Optional[int] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "FaultInjectingServer":
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_run_server, args=(str(self.root), self.faults, port_queue, self.requests, self.bytes_sent),
+            daemon=True)
+        self._process.start()
+        self.port = port_queue.get(timeout=30)
+        return self
+
+    def __exit__(self, *exc):
+        if self._process:
+            self._process.terminate()
+            self._process.join(10)
+            self._process = None
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{name}"
+
+
+# name -> download mode, server faults and what the scenario is for
+SCENARIOS = {
+    "clean-single": {"segmented": False, "faults": {},
+                     "about": "one connection, no faults"},
+    "clean-segmented": {"segmented": True, "faults": {},
+                        "about": "parallel range segments, no faults"},
+    "clean-no-ranges": {"segmented": True, "faults": {"ranges": False},
+                        "about": "server without range support"},
+    "throttled-single": {"segmented": False, "faults": {"rate_mbps": 20},
+                         "about": "20 MB/s per connection, one connection"},
+    "throttled-segmented": {"segmented": True, "faults": {"rate_mbps": 20},
+                            "about": "20 MB/s per connection, parallel segments"},
+    "latency-segmented": {"segmented": True, "faults": {"latency_ms": 150},
+                          "about": "150 ms before every response"},
+    "drop-single": {"segmented": False, "faults": {"drop_after": 0.5, "drop_count": 1},
+                    "about": "connection closed at 50%, resumed"},
+    "drop-segmented": {"segmented": True, "faults": {"drop_after": 0.6, "drop_count": 2},
+                       "about": "two segment connections closed at 60% of their range, resumed"},
+    "drop-no-ranges": {"segmented": True, "faults": {"ranges": False, "drop_after": 0.5, "drop_count": 1},
+                       "about": "connection closed at 50% without ranges, restarted"},
+    "overstated-length": {"segmented": False, "faults": {"length_lie": 1024 * 1024, "lie_count": 1},
+                          "about": "Content-Length 1 MB too long, body ends early"},
+    "understated-length": {"segmented": False, "faults": {"length_lie": -1024 * 1024, "lie_count": 1},
+                           "about": "Content-Length 1 MB too short, file looks complete"},
+    "server-errors": {"segmented": True, "faults": {"error_count": 2},
+                      "about": "first two requests answered with 503"},
+    "cancel-resume": {"segmented": True, "faults": {"rate_mbps": 2}, "cancel_after": 1.0,
+                      "about": "cancelled after 1 s, then resumed by a new download"},
+}
+
+
+class DownloadBenchmark:
+    """Runs scenarios against a fresh server and DownloadManager each time"""
+
+    def __init__(self, work_dir: Path, size_mb: int):
+        self.work_dir = work_dir
+        self.www_dir = work_dir / "www"
+        self.size = size_mb * 1024 * 1024
+        self.logger = logging.getLogger(__name__)
+
+        # DownloadManager reads its settings from <logs>/../config
+        config_dir = work_dir / "config"
+        config_dir.mkdir(parents=True, exist_ok=True)
+        with open(config_dir / "install_config.json", 'w', encoding='utf-8') as f:
+            json.dump({"download_cache": {"enabled": False}, "bandwidth": {"max_mbps": None}}, f)
+        (work_dir / "logs").mkdir(exist_ok=True)
+
+        self.www_dir.mkdir(exist_ok=True)
+        self.payload = self.www_dir / "payload.bin"
+        sha256 = hashlib.sha256()
+        with open(self.payload, 'wb') as f:
+            for _ in range(size_mb):
+                block = os.urandom(1024 * 1024)
+                sha256.update(block)
+                f.write(block)
+        self.sha256 = sha256.hexdigest()
+
+    def _download_manager(self) -> DownloadManager:
+        dm = DownloadManager(self.work_dir / "logs")
+        dm.staging_dir = None
+        dm.progress = ProgressReporter(stream=io.StringIO())
+        return dm
+
+    def run(self, name: str) -> Dict[str, Any]:
+        """Run one scenario and measure it"""
+        scenario = SCENARIOS[name]
+        destination = self.work_dir / "downloads" / name / "payload.bin"
+        shutil.rmtree(destination.parent, ignore_errors=True)
+
+        with FaultInjectingServer(self.www_dir, **scenario["faults"]) as server:
+            url = server.url(self.payload.name)
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+            dm = self._download_manager()
+            if scenario.get("cancel_after"):
+                handle = dm.start_download(url, destination, checksum=self.sha256, segmented=scenario["segmented"])
+                time.sleep(scenario["cancel_after"])
+                handle.cancel()
+                try:
+                    handle.result(60)
+                except DownloadCancelled:
+                    pass
+                dm = self._download_manager()  # A later run of the installer
+
+            success = dm.download_file(url, destination, checksum=self.sha256, segmented=scenario["segmented"])
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+
+            result = dm.download_results.get(destination.name, {}).get("result")
+            requests, sent = server.requests.value, server.bytes_sent.value
+
+        intact = success and destination.exists() and self._sha256(destination) == self.sha256
+        return {
+            "scenario": name,
+            "ok": intact,
+            "result": result,
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "mb_per_s": round(self.size / (1024 * 1024) / wall, 2) if wall > 0 else None,
+            "requests": requests,
+            # Bytes the server sent per byte of the file: 1.0 means nothing was fetched twice
+            "transfer_ratio": round(sent / self.size, 3),
+        }
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of the repeated runs of one scenario"""
+    summary = dict(runs[-1])
+    for key in ("wall_s", "cpu_s", "mb_per_s", "transfer_ratio"):
+        values = [run[key] for run in runs if run[key] is not None]
+        summary[key] = round(statistics.median(values), 3) if values else None
+    summary["ok"] = all(run["ok"] for run in runs)
+    summary["runs"] = len(runs)
+    return summary
+
+
+def print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None):
+    """Print results, with the change against a baseline run if given"""
+    print(f"{'scenario':<22}{'ok':<6}{'result':<11}{'wall s':>9}{'cpu s':>8}{'MB/s':>9}{'reqs':>6}{'xfer':>7}"
+          + ("   vs baseline" if baseline else ""))
+    for r in results:
+        line = (f"{r['scenario']:<22}{'yes' if r['ok'] else 'NO':<6}{str(r['result']):<11}"
+                f"{r['wall_s']:>9.2f}{r['cpu_s']:>8.2f}{r['mb_per_s'] or 0:>9.1f}{r['requests']:>6}"
+                f"{r['transfer_ratio']:>7.2f}")
+        before = (baseline or {}).get(r["scenario"])
+        if before and before.get("wall_s"):
+            wall_change = (r["wall_s"] - before["wall_s"]) / before["wall_s"] * 100
+            cpu_change = (r["cpu_s"] - before["cpu_s"]) / before["cpu_s"] * 100 if before.get("cpu_s") else 0
+            line += f"   wall {wall_change:+.0f}%, cpu {cpu_change:+.0f}%"
+            if before.get("ok") and not r["ok"]:
+                line += ", NOW FAILING"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DownloadManager against a local fault-injecting server")
+    parser.add_argument('scenarios', nargs='*', help="Scenarios to run (default: all)")
+    parser.add_argument('--list', action='store_true', help="List scenarios and exit")
+    parser.add_argument('--size-mb', type=int, default=64, help="Size of the downloaded file (default: 64)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per scenario; the median is reported")
+    parser.add_argument('--output', type=Path, help="Save results as JSON")
+    parser.add_argument('--baseline', type=Path, help="Compare with results saved by an earlier --output")
+    parser.add_argument('--work-dir', type=Path, help="Directory for the server files and downloads (temporary if not set)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, scenario in SCENARIOS.items():
+            print(f"{name:<22}{scenario['about']}")
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)} (see --list)")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    # Download errors are expected in fault scenarios; keep them out of the table
+    logging.basicConfig(level=logging.CRITICAL)
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="download_benchmark_"))
+    try:
+        print(f"Preparing {args.size_mb} MB test file in {work_dir}")
+        benchmark = DownloadBenchmark(work_dir, args.size_mb)
+        results = []
+        for name in names:
+            print(f"Running {name} ({SCENARIOS[name]['about']})...", flush=True)
+            results.append(summarize([benchmark.run(name) for _ in range(max(1, args.repeat))]))
+
+        print()
+        print_table(results, baseline)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({"size_mb": args.size_mb, "repeat": args.repeat,
+                           "python": sys.version.split()[0], "platform": sys.platform,
+                           "results": results}, f, indent=2)
+            print(f"\nResults saved to {args.output}")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
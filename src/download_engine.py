@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download Engine - Runs downloads in the background with bounded concurrency
+An asyncio loop schedules transfers; each transfer runs the blocking download code in a worker thread
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Callable, Any, List
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a transfer (and to its waiters) when it was cancelled"""
+
+
+class DownloadTimeout(DownloadCancelled):
+    """Raised when a transfer ran past its deadline"""
+
+
+_current = threading.local()
+
+
+def current_cancel_event() -> Optional[threading.Event]:
+    """Get the cancel event of the transfer running on this thread (None outside the engine)"""
+    return getattr(_current, "cancel", None)
+
+
+def check_cancelled(cancel: Optional[threading.Event], name: str = ""):
+    """Raise DownloadCancelled if cancel is set; called by transfers between chunks"""
+    if cancel is not None and cancel.is_set():
+        raise DownloadCancelled(f"Transfer cancelled: {name}" if name else "Transfer cancelled")
+
+
+class TransferHandle:
+    """Handle of a submitted transfer"""
+
+    def __init__(self, name: str, cancel: threading.Event, future: concurrent.futures.Future,
+                 stopped: threading.Event):
+        self.name = name
+        self.cancel_event = cancel
+        self._future = future
+        self._stopped = stopped  # Set once the worker thread returned (or will never start)
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancel(self):
+        """Ask the transfer to stop; it aborts at its next chunk"""
+        self.cancel_event.set()
+        self._future.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the transfer and get its result
+
+        Raises DownloadCancelled (or DownloadTimeout) if it didn't finish.
+        """
+        try:
+            return self._future.result(timeout)
+        except concurrent.futures.CancelledError:
+            raise DownloadCancelled(f"Transfer cancelled: {self.name}")
+
+    def wait_stopped(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the transfer's download code is no longer running
+
+        result() returns as soon as a transfer is cancelled or times out, while
+        its worker thread may still be stuck in a socket read and write files
+        afterwards. Returns False if it is still running after timeout.
+        """
+        return self._stopped.wait(timeout)
+
+
+class DownloadEngine:
+    """
+    Background scheduler for downloads
+
+    At most max_concurrent transfers run at once; the rest wait in submission
+    order. Cancellation is cooperative: the transfer's cancel event is set and
+    the download code raises DownloadCancelled at its next chunk. A deadline
+    is enforced by the loop, so waiters are released on time even while a
+    socket is stalled.
+    """
+
+    DEFAULT_MAX_CONCURRENT = 3
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, default_timeout: Optional[float] = None):
+        self.logger = logging.getLogger(__name__)
+        self.max_concurrent = max(1, max_concurrent)
+        self.default_timeout = default_timeout
+        self._handles: List[TransferHandle] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="download")
+
+        # The loop lives in its own daemon thread, so callers stay synchronous
+        self._loop = asyncio.new_event_loop()
+        self._slots: Optional[asyncio.Semaphore] = None
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="download-engine", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        ready.set()
+        self._loop.run_forever()
+
+    def submit(self, name: str, function: Callable[..., Any], *args,
+               timeout: Optional[float] = None, **kwargs) -> TransferHandle:
+        """
+        Schedule function(*args, **kwargs) as a transfer
+
+        timeout (seconds, counted from when the transfer starts) defaults to
+        the engine's default_timeout.
+        """
+        cancel = threading.Event()
+        started = threading.Event()
+        stopped = threading.Event()
+        if timeout is None:
+            timeout = self.default_timeout
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(name, cancel, started, stopped, timeout, function, args, kwargs), self._loop)
+        # Settled on the loop thread, where the worker is started, so the two can't race
+        future.add_done_callback(
+            lambda _: self._loop.call_soon_threadsafe(self._settle_unstarted, started, stopped))
+        handle = TransferHandle(name, cancel, future, stopped)
+        with self._lock:
+            self._handles = [h for h in self._handles if not h.done()]
+            self._handles.append(handle)
+        return handle
+
+    async def _run(self, name: str, cancel: threading.Event, started: threading.Event, stopped: threading.Event,
+                   timeout: Optional[float], function: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        await self._slots.acquire()
+        if cancel.is_set():
+            self._slots.release()
+            raise DownloadCancelled(f"Transfer cancelled: {name}")
+
+        def work():
+            _current.cancel = cancel
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _current.cancel = None
+
+        # The slot is held until the worker thread really returns, even when the
+        # waiter has been released early by a deadline or a cancel
+        started.set()
+        work_future = self._loop.run_in_executor(self._executor, work)
+        work_future.add_done_callback(self._release_slot)
+        work_future.add_done_callback(lambda _: stopped.set())
+        start_time = time.monotonic()
+        self.logger.info(f"Transfer started: {name}")
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(work_future), timeout)
+        except asyncio.TimeoutError:
+            cancel.set()
+            self.logger.error(f"Transfer timed out after {timeout:.0f}s: {name}")
+            raise DownloadTimeout(f"Transfer timed out: {name}")
+        except asyncio.CancelledError:
+            cancel.set()
+            self.logger.info(f"Transfer cancelled: {name}")
+            raise
+
+        self.logger.info(f"Transfer finished in {time.monotonic() - start_time:.1f}s: {name}")
+        return result
+
+    @staticmethod
+    def _settle_unstarted(started: threading.Event, stopped: threading.Event):
+        # A transfer cancelled before it got a slot never runs its download code
+        if not started.is_set():
+            stopped.set()
+
+    def _release_slot(self, work_future: asyncio.Future):
+        # Nobody awaits a worker that outlived its waiter, so retrieve its exception here
+        if not work_future.cancelled():
+            work_future.exception()
+        self._slots.release()
+
+    def cancel_all(self):
+        """Cancel every transfer that hasn't finished"""
+        with self._lock:
+            handles = list(self._handles)
+        for handle in handles:
+            if not handle.done():
+                handle.cancel()
+
+
+_engine: Optional[DownloadEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(config_file: Optional[Path] = None) -> DownloadEngine:
+    """
+    Get the process-wide download engine
+
+    The first call reads the download_engine section of install_config.json
+    (defaults to the installer's config directory).
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if config_file is None:
+                config_file = Path(__file__).parent.parent / "config" / "install_config.json"
+
+            settings = {}
+            try:
+                if config_file.exists():
+                    with open(config_file, 'r', encoding='utf-8') as f:
+                        settings = json.load(f).get("download_engine", {})
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not read download engine settings: {e}")
+
+            timeout_minutes = settings.get("transfer_timeout_minutes")
+            _engine = DownloadEngine(settings.get("max_concurrent") or DownloadEngine.DEFAULT_MAX_CONCURRENT,
+                                     timeout_minutes * 60 if timeout_minutes else None)
+        return _engine
@@ -7,24 +7,120 @@ Supports resumable downloads, progress tracking, and integrity verification
 
 import os
 import sys
-import requests
+import shutil
 import hashlib
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
 from urllib.parse import urlparse
 import time
+from artifact_cache import ArtifactCache
+from artifact_manifest import ArtifactManifest, MirrorSelector
+from bandwidth_scheduler import Priority, Transfer, get_scheduler
+from progress_reporter import get_reporter
+from http_client import get_session, get_download_flights
+from retry_policy import RETRYABLE_STATUS, CircuitOpenError, RetryPolicy, get_breaker, is_retryable
+from space_reservation import InsufficientSpace, SpaceClaim, get_space_manager
+from download_engine import (DownloadCancelled, TransferHandle, check_cancelled,
+                             current_cancel_event, get_engine)
+
+
+class _StreamingHash:
+    """Digest fed with a file's bytes in order while they are being downloaded"""
+
+    def __init__(self, checksum_type: str):
+        self.checksum_type = checksum_type.lower()
+        self.reset()
+
+    def reset(self):
+        """Start over from the first byte"""
+        self._hash = hashlib.new(self.checksum_type)
+        self.offset = 0
+
+    def update(self, data: bytes):
+        """Feed the next bytes of the file"""
+        self._hash.update(data)
+        self.offset += len(data)
+
+    def catch_up(self, file_path: Path, upto: int):
+        """Hash bytes that are already on disk between the current offset and upto"""
+        if upto < self.offset:
+            self.reset()
+        if upto == self.offset:
+            return
+
+        with open(file_path, 'rb') as f:
+            f.seek(self.offset)
+            while self.offset < upto:
+                data = f.read(min(1024 * 1024, upto - self.offset))
+                if not data:
+                    raise Exception(f"Unexpected end of file while hashing {file_path.name}")
+                self.update(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
 
 class DownloadManager:
     """Manages file downloads with progress tracking and resume capability"""
+
+    # Segmented (multi-connection) download settings
+    SEGMENT_COUNT = 4
+    MIN_SEGMENT_SIZE = 8 * 1024 * 1024  # Don't split files into segments smaller than 8 MB
+    SEGMENT_STATE_SAVE_INTERVAL = 1024 * 1024  # Persist segment progress every 1 MB
+
+    # Write path settings
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+    UNPINNED_CACHE_MAX_AGE = 24 * 3600  # Cached unpinned artifacts without validators are trusted this long
+    WRITE_ALIGNMENT = 64 * 1024  # Buffer sizes are rounded to this, so block writes stay aligned
+    DEFAULT_BUFFER_KB = {"Internal": 4096, "External": 1024, "Network": 1024}
     
-    def __init__(self, logs_path: Path):
+    def __init__(self, logs_path: Path, cache: Optional[ArtifactCache] = None):
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'AI-Environment-Installer/1.0'
-        })
+
+        # Machine-wide artifact cache shared by all installations
+        if cache is None:
+            cache = ArtifactCache.from_config(logs_path.parent / "config" / "install_config.json")
+        self.cache = cache
+
+        # Write buffer sizes per target drive type
+        self.buffer_kb = self._load_buffer_settings(logs_path.parent / "config" / "install_config.json")
+        self._drive_types: Dict[str, str] = {}
+
+        # Backoff between attempts; hosts that keep failing are skipped by their circuit breaker
+        self.retry_policy = RetryPolicy.from_config(logs_path.parent / "config" / "install_config.json")
+
+        # Process-wide bandwidth arbitration between concurrent transfers
+        self.scheduler = get_scheduler(logs_path.parent / "config" / "install_config.json")
+        self.progress = get_reporter()
+
+        # Keep-alive connections shared with every other component of the process
+        self.session = get_session()
+        self.flights = get_download_flights()
+
+        # Running digests of in-progress downloads, kept across retry attempts
+        self._stream_hashes: Dict[str, _StreamingHash] = {}
+
+        # (url, digest) of files this process already fetched, keyed by destination
+        self._fetched: Dict[str, tuple] = {}
+
+        # Outcome of each download (hit, revalidated, refetched, shared or bundle), keyed by file name
+        self.download_results: Dict[str, Dict[str, Any]] = {}
+
+        # Pinned artifact URLs, mirrors and digests
+        self.manifest = ArtifactManifest.load(logs_path.parent / "config" / "artifact_manifest.json")
+        self.mirror_selector = MirrorSelector(self.session)
+        self._mirror_rankings: Dict[str, List[str]] = {}
+
+        # OfflineBundle serving artifacts for air-gapped installs; no network use when set
+        self.offline_bundle = None
+
+        # Downloads prefetched by the master installer are adopted from here (None to disable)
+        self.staging_dir: Optional[Path] = ArtifactCache.default_staging_dir()
         
     def download_file(self,
                      url: str,
@@ -32,126 +128,855 @@ class DownloadManager:
                      progress_callback: Optional[Callable[[int, int], None]] = None,
                      checksum: Optional[str] = None,
                      checksum_type: str = 'sha256',
-                     max_retries: int = 3) -> bool:
+                     max_retries: Optional[int] = None,
+                     segmented: bool = True,
+                     mirrors: Optional[List[str]] = None,
+                     priority: Priority = Priority.NORMAL) -> bool:
         """
         Download a file with progress tracking and optional checksum verification
 
+        The digest is computed while the bytes arrive and recorded in a
+        <file>.verified.json sidecar, so the file is never read back just to hash it.
+        The machine-wide artifact cache is consulted before the network and is
+        updated after every successful sha256 download. HTTP validators (ETag,
+        Last-Modified) are kept in a <file>.meta.json sidecar so an existing
+        unpinned download is revalidated with a conditional request.
+
+        When mirrors are given, each failed attempt moves on to the next source.
+        url stays the identity of the artifact for the cache and the sidecars.
+
         Args:
             url: URL to download from
             destination: Local file path to save to
             progress_callback: Function to call with (downloaded, total) bytes
             checksum: Expected checksum for verification
             checksum_type: Type of checksum (sha256, md5, etc.)
-            max_retries: Maximum number of retry attempts
+            max_retries: Maximum number of attempts (the retry policy's max_attempts if None)
+            segmented: Fetch byte ranges over several connections when the server supports it
+            mirrors: URLs serving the same file, tried in this order (url first unless listed)
+            priority: Bandwidth scheduler class of this transfer
+
+        Concurrent calls for the same url (from any DownloadManager in the
+        process) are coalesced into one transfer; the other callers get a copy.
+
+        When called from a download engine transfer (see start_download) the
+        download stops with DownloadCancelled once the transfer is cancelled.
 
         Returns:
             True if download successful, False otherwise
         """
-        for attempt in range(max_retries):
+        # Fetched earlier in this process (e.g. prefetched) and unchanged since
+        fetched = self._fetched.get(str(destination))
+        if fetched and fetched[0] == url:
+            recorded_checksum = self.get_recorded_checksum(destination, checksum_type)
+            if recorded_checksum == fetched[1] and (not checksum or checksum.lower() == recorded_checksum):
+                return True
+
+        cancel = current_cancel_event()
+
+        def run():
+            return self._download_file(url, destination, progress_callback, checksum, checksum_type,
+                                       max_retries, segmented, mirrors, priority, cancel), destination
+
+        try:
+            (success, fetched_to), shared = self.flights.do(url, run)
+        except DownloadCancelled:
+            if cancel is not None and cancel.is_set():
+                raise
+            # The coalesced transfer was cancelled by its other caller, not by us
+            success = self._download_file(url, destination, progress_callback, checksum, checksum_type,
+                                          max_retries, segmented, mirrors, priority, cancel)
+            fetched_to, shared = destination, False
+
+        if shared:
+            success = self._adopt_shared_download(url, fetched_to, success, destination, progress_callback,
+                                                  checksum, checksum_type, max_retries, segmented, mirrors,
+                                                  priority, cancel)
+        if success:
+            recorded_checksum = self.get_recorded_checksum(destination, checksum_type)
+            if recorded_checksum:
+                self._fetched[str(destination)] = (url, recorded_checksum)
+        return success
+
+    def _adopt_shared_download(self, url: str, fetched_to: Path, success: bool, destination: Path,
+                               progress_callback: Optional[Callable[[int, int], None]],
+                               checksum: Optional[str], checksum_type: str, max_retries: Optional[int],
+                               segmented: bool, mirrors: Optional[List[str]], priority: Priority,
+                               cancel: Optional[threading.Event]) -> bool:
+        """Take over the outcome of a concurrent download of the same url"""
+        if not success:
+            self.logger.error(f"Shared download of {url} failed")
+            return False
+
+        # The other caller may not have pinned a digest, or pinned another one
+        recorded_checksum = self.get_recorded_checksum(fetched_to, checksum_type)
+        if recorded_checksum is None or (checksum and recorded_checksum.lower() != checksum.lower()):
+            return self._download_file(url, destination, progress_callback, checksum, checksum_type,
+                                       max_retries, segmented, mirrors, priority, cancel)
+
+        start_time = time.time()
+        if fetched_to.resolve() != destination.resolve():
             try:
-                # Create destination directory
                 destination.parent.mkdir(parents=True, exist_ok=True)
+                self._discard_partial(destination)
+                shutil.copyfile(fetched_to, destination)
+            except Exception as e:
+                self.logger.error(f"Could not copy shared download to {destination}: {e}")
+                return False
+            self._record_verified(destination, checksum_type, recorded_checksum)
+            http_metadata = self._load_http_metadata(fetched_to, url)
+            if http_metadata:
+                self._save_http_metadata(destination, http_metadata)
+
+        size = destination.stat().st_size
+        if progress_callback:
+            progress_callback(size, size)
+        self._report_result(destination, url, "shared", start_time)
+        return True
+
+    def _download_file(self, url: str, destination: Path,
+                       progress_callback: Optional[Callable[[int, int], None]],
+                       checksum: Optional[str], checksum_type: str, max_retries: Optional[int],
+                       segmented: bool, mirrors: Optional[List[str]], priority: Priority,
+                       cancel: Optional[threading.Event] = None) -> bool:
+        """Download a file (see download_file); runs once per coalesced request"""
+        start_time = time.time()
+
+        if not self.offline_bundle:
+            self._adopt_staged(url, destination)
+
+        if self._fetch_from_cache(url, destination, checksum, checksum_type):
+            return True
+
+        if self.offline_bundle:
+            self.logger.error(f"Offline mode: {destination.name} is neither in the bundle nor the cache")
+            return False
+
+        if self._revalidate(url, destination, checksum, checksum_type):
+            return True
+
+        # Every source gets at least one attempt; url goes first unless mirrors places it
+        sources = list(mirrors or [])
+        if url not in sources:
+            sources.insert(0, url)
+        max_retries = max(max_retries or self.retry_policy.max_attempts, len(sources))
+        source_url = sources[0]
+        ranges_ignored = False
+        started = time.monotonic()
+        retries = 0  # Backoff waits so far
+        dead_sources = set()  # Sources that failed in a way retrying can't fix (e.g. 404)
 
-                # Check if file already exists and is complete
-                if destination.exists() and checksum:
-                    if self._verify_checksum(destination, checksum, checksum_type):
+        # Registered for the whole download, including retries
+        with self.scheduler.transfer(destination.name, priority) as transfer, \
+                get_space_manager().claim(destination, destination.name, priority) as space:
+            for attempt in range(max_retries):
+                try:
+                    # Create destination directory
+                    destination.parent.mkdir(parents=True, exist_ok=True)
+
+                    # Check if file already exists and was verified by an earlier run. Without a
+                    # record the file may be a partial download, so the resume logic decides.
+                    if destination.exists() and checksum:
+                        recorded_checksum = self.get_recorded_checksum(destination, checksum_type)
+                        if recorded_checksum is not None:
+                            if recorded_checksum.lower() == checksum.lower():
+                                self.logger.info(f"File already exists and verified: {destination.name}")
+                                self._report_result(destination, url, "hit", start_time)
+                                return True
+                            else:
+                                self.logger.info(f"File exists but checksum mismatch, re-downloading: {destination.name}")
+                                destination.unlink()
+                                self._verified_sidecar_path(destination).unlink(missing_ok=True)
+
+                    breaker = get_breaker(source_url)
+                    if not breaker.allow():
+                        raise CircuitOpenError(breaker.host)
+
+                    if attempt == 0:
+                        self.logger.info(f"Downloading: {source_url}")
+                        self.logger.info(f"Destination: {destination}")
+                    else:
+                        self.logger.info(f"Retry attempt {attempt + 1}/{max_retries} from {source_url}")
+
+                    # Get file size for progress tracking
+                    response = self.session.head(source_url, allow_redirects=True, timeout=30)
+                    if response.status_code in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                    total_size = int(response.headers.get('content-length', 0))
+
+                    # Validators for conditional requests on later runs
+                    http_metadata = {
+                        "url": url,
+                        "source_url": source_url,
+                        "final_url": response.url,
+                        "etag": response.headers.get('etag'),
+                        "last_modified": response.headers.get('last-modified'),
+                        "content_length": total_size
+                    }
+
+                    # Check if server supports range requests for resume capability
+                    supports_resume = response.headers.get('accept-ranges') == 'bytes'
+
+                    # Running digest, continued across retries of this download
+                    stream_hash = self._stream_hashes.setdefault(str(destination), _StreamingHash(checksum_type))
+
+                    # A complete file without a digest record (e.g. from an older installer)
+                    state_file = self._segment_state_path(destination)
+                    if (checksum and destination.exists() and not state_file.exists()
+                            and destination.stat().st_size == total_size
+                            and self._verify_checksum(destination, checksum, checksum_type)):
                         self.logger.info(f"File already exists and verified: {destination.name}")
+                        self._stream_hashes.pop(str(destination), None)
+                        self._report_result(destination, url, "hit", start_time)
                         return True
-                    else:
-                        self.logger.info(f"File exists but checksum mismatch, re-downloading: {destination.name}")
-                        destination.unlink()
 
-                if attempt == 0:
-                    self.logger.info(f"Downloading: {url}")
-                    self.logger.info(f"Destination: {destination}")
-                else:
-                    self.logger.info(f"Retry attempt {attempt + 1}/{max_retries}")
-
-                # Get file size for progress tracking
-                response = self.session.head(url, allow_redirects=True, timeout=30)
-                total_size = int(response.headers.get('content-length', 0))
-
-                # Check if server supports range requests for resume capability
-                supports_resume = response.headers.get('accept-ranges') == 'bytes'
-
-                # Determine starting position for resume
-                resume_pos = 0
-                if supports_resume and destination.exists():
-                    resume_pos = destination.stat().st_size
-                    if resume_pos >= total_size:
-                        resume_pos = 0  # File is larger than expected, restart
-                        destination.unlink()
+                    # Book the bytes still to be written before the file is preallocated
+                    if total_size > 0 and not space.size:
+                        segments = self._load_segment_state(state_file, url, destination, total_size)
+                        written = sum(segment["done"] for segment in segments) if segments else 0
+                        if not space.reserve(total_size - written):
+                            self.progress.print_line(f"Not enough disk space for {destination.name} "
+                                                     f"({(total_size - written)/(1024*1024):.0f} MB)")
+                            return False
 
-                # Set up headers for resume
-                headers = {}
-                if resume_pos > 0:
-                    headers['Range'] = f'bytes={resume_pos}-'
-                    self.logger.info(f"Resuming download from byte {resume_pos} ({resume_pos/(1024*1024):.1f} MB)")
-                    print(f"Resuming from {resume_pos/(1024*1024):.1f} MB / {total_size/(1024*1024):.1f} MB")
+                    # With range support the file is preallocated and fetched as byte ranges
+                    # (in parallel for large files), which also makes it resumable
+                    downloaded = None
+                    buffer_size = self.get_buffer_size(destination)
+                    if supports_resume and total_size > 0 and not ranges_ignored:
+                        segment_count = self.SEGMENT_COUNT if segmented and total_size >= 2 * self.MIN_SEGMENT_SIZE else 1
+                        downloaded = self._download_segmented(url, destination, total_size, progress_callback,
+                                                              stream_hash, source_url, transfer,
+                                                              segment_count, buffer_size, cancel, space)
+                        if downloaded is None:
+                            self.logger.info("Server ignored range requests, falling back to a single stream")
+                            ranges_ignored = True
 
-                # Start download with timeout
-                response = self.session.get(url, headers=headers, stream=True, timeout=30)
-                response.raise_for_status()
+                    if downloaded is None:
+                        # Without usable ranges the download always starts from the first byte
+                        state_file.unlink(missing_ok=True)
+                        stream_hash.reset()
 
-                # Open file for writing (append if resuming)
-                mode = 'ab' if resume_pos > 0 else 'wb'
-                downloaded = resume_pos
+                        response = self.session.get(source_url, stream=True, timeout=30)
+                        response.raise_for_status()
 
-                with open(destination, mode) as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
+                        # A fresh file, so a hardlinked cache copy is never truncated. Preallocating
+                        # the known size lets the filesystem reserve one contiguous extent.
+                        if destination.exists():
+                            destination.unlink()
+                        progress = {"downloaded": 0}
 
-                            # Call progress callback
+                        def on_read(amount: int):
+                            check_cancelled(cancel, destination.name)
+                            space.consume(amount)
+                            transfer.consume(amount)
+                            progress["downloaded"] += amount
                             if progress_callback:
-                                progress_callback(downloaded, total_size)
+                                progress_callback(progress["downloaded"], total_size)
+
+                        with open(destination, 'wb', buffering=0) as f:
+                            if total_size > 0:
+                                f.truncate(total_size)
+                            downloaded = self._stream_to_file(response, f, total_size or None, bytearray(buffer_size),
+                                                              on_read, stream_hash.update)
+
+                    # Verify download completed
+                    if total_size > 0 and downloaded < total_size:
+                        raise Exception(f"Incomplete download: {downloaded}/{total_size} bytes")
 
-                # Verify download completed
-                if total_size > 0 and downloaded < total_size:
-                    raise Exception(f"Incomplete download: {downloaded}/{total_size} bytes")
+                    # Finish the running digest
+                    stream_hash.catch_up(destination, downloaded)
+                    actual_checksum = stream_hash.hexdigest()
+                    self._stream_hashes.pop(str(destination), None)
 
-                # Verify checksum if provided
-                if checksum:
-                    if not self._verify_checksum(destination, checksum, checksum_type):
+                    # Verify checksum if provided
+                    if checksum and actual_checksum.lower() != checksum.lower():
                         self.logger.error(f"Checksum verification failed for {destination.name}")
                         destination.unlink()
+                        self._verified_sidecar_path(destination).unlink(missing_ok=True)
                         return False
 
-                self.logger.info(f"Download completed: {destination.name}")
-                return True
+                    breaker.record_success()
+                    self.record_download(url, destination, checksum_type, actual_checksum, http_metadata,
+                                         start_time, downloaded)
+                    return True
 
-            except Exception as e:
-                self.logger.error(f"Download attempt {attempt + 1} failed for {url}: {e}")
-
-                # On last attempt, clean up partial file if it's corrupted
-                if attempt == max_retries - 1:
-                    self.logger.error(f"All {max_retries} download attempts failed")
-                    # Keep the partial file for manual resume
-                    if destination.exists():
-                        partial_size = destination.stat().st_size
-                        self.logger.info(f"Partial file kept at {destination} ({partial_size/(1024*1024):.1f} MB)")
-                        print(f"\nPartial file saved. You can retry installation to resume download.")
+                except DownloadCancelled:
+                    # The partial file and its segment state are kept for a later resume
+                    self.logger.info(f"Download cancelled: {destination.name}")
+                    raise
+
+                except InsufficientSpace as e:
+                    # Retrying can't help; the partial file is kept for a resume once space is freed
+                    self.logger.error(f"Download stopped: {e}")
+                    self.progress.print_line(f"{e}. Free some disk space and retry installation to resume.")
+                    self._stream_hashes.pop(str(destination), None)
                     return False
-                else:
-                    # Wait before retry
-                    wait_time = 5 * (attempt + 1)  # Exponential backoff
-                    self.logger.info(f"Waiting {wait_time} seconds before retry...")
-                    print(f"\nConnection interrupted. Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-
-        return False
+
+                except Exception as e:
+                    self.logger.error(f"Download attempt {attempt + 1} failed for {source_url}: {e}")
+                    if is_retryable(e):
+                        get_breaker(source_url).record_failure()
+                    elif not isinstance(e, CircuitOpenError):
+                        dead_sources.add(source_url)
+
+                    # Remaining sources in rotation order, skipping hosts whose circuit is open
+                    index = sources.index(source_url)
+                    candidates = [source for source in sources[index + 1:] + sources[:index + 1]
+                                  if source not in dead_sources and get_breaker(source).state != "open"]
+
+                    # Every source had its turn: back off before starting the next round
+                    give_up = attempt == max_retries - 1 or not candidates
+                    if not give_up and sources.index(candidates[0]) <= index:
+                        give_up = not self.retry_policy.wait(retries, started, cancel, on_retry=self._announce_retry)
+                        check_cancelled(cancel, destination.name)
+                        retries += 1
+
+                    if give_up:
+                        self.logger.error(f"Giving up on {destination.name} after {attempt + 1} attempt(s)")
+                        self._stream_hashes.pop(str(destination), None)
+                        # Keep the partial file for manual resume
+                        if destination.exists():
+                            partial_size = destination.stat().st_size
+                            self.logger.info(f"Partial file kept at {destination} ({partial_size/(1024*1024):.1f} MB)")
+                            self.progress.print_line(f"Partial file saved. You can retry installation to resume download.")
+                        return False
+
+                    if candidates[0] != source_url:
+                        # Fail over to the next mirror right away
+                        next_source = candidates[0]
+                        if not checksum:
+                            # Without a digest, bytes from two sources can't be trusted to match
+                            self._discard_partial(destination)
+                        self.logger.info(f"Switching to mirror {next_source}")
+                        self.progress.print_line(f"Switching to mirror {urlparse(next_source).netloc}...")
+                        source_url = next_source
+
+            return False
     
+    def _announce_retry(self, attempt: int, delay: float):
+        """Tell the user about a backoff wait"""
+        self.logger.info(f"Waiting {delay:.1f} seconds before attempt {attempt}...")
+        self.progress.print_line(f"Connection interrupted. Retrying in {delay:.0f} seconds...")
+
+    def _load_buffer_settings(self, config_file: Path) -> Dict[str, int]:
+        """Read download_io.buffer_kb (per drive type) from install_config.json"""
+        buffer_kb = dict(self.DEFAULT_BUFFER_KB)
+        try:
+            if config_file.exists():
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    buffer_kb.update(json.load(f).get("download_io", {}).get("buffer_kb", {}))
+        except Exception as e:
+            self.logger.warning(f"Could not read download_io settings: {e}")
+        return buffer_kb
+
+    def get_buffer_size(self, destination: Path) -> int:
+        """Get the write buffer size for the drive a download is written to"""
+        drive = Path(os.path.abspath(destination)).drive
+        if drive not in self._drive_types:
+            drive_type = "Unknown"
+            if sys.platform == 'win32' and drive[:1].isalpha():
+                from drive_selector import DriveSelector
+                drive_type = DriveSelector().get_drive_type(drive[0])
+            self._drive_types[drive] = drive_type
+
+        kb = self.buffer_kb.get(self._drive_types[drive], self.buffer_kb.get("default"))
+        if not kb:
+            return self.DEFAULT_BUFFER_SIZE
+        return max(int(kb) * 1024 // self.WRITE_ALIGNMENT, 1) * self.WRITE_ALIGNMENT
+
+    def staged_artifact(self, url: str) -> Optional[Path]:
+        """Find a complete or partial prefetched download of url in the staging directory"""
+        if not self.staging_dir or not self.staging_dir.is_dir():
+            return None
+
+        # Completed downloads have HTTP metadata, partial ones their segment state
+        for sidecar in list(self.staging_dir.glob("*.meta.json")) + list(self.staging_dir.glob("*.segments.json")):
+            try:
+                with open(sidecar, 'r', encoding='utf-8') as f:
+                    if json.load(f).get("url") != url:
+                        continue
+            except Exception:
+                continue
+            staged = sidecar.with_name(sidecar.name.rsplit('.', 2)[0])
+            if staged.exists():
+                return staged
+        return None
+
+    def _adopt_staged(self, url: str, destination: Path):
+        """Move a prefetched download of url to destination; a partial one is resumed from there"""
+        staged = self.staged_artifact(url)
+        if staged is None or destination.exists() or staged.resolve() == destination.resolve():
+            return
+
+        partial = self._segment_state_path(staged).exists()
+        try:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            # Sidecars go first, so the file never appears without its resume state
+            for suffix in (".segments.json", ".verified.json", ".meta.json", ""):
+                source = staged.with_name(staged.name + suffix)
+                if source.exists():
+                    shutil.move(str(source), str(destination.with_name(destination.name + suffix)))
+        except Exception as e:
+            self.logger.warning(f"Could not adopt prefetched {staged.name}: {e}")
+            return
+
+        self.logger.info(f"Adopted {'partial ' if partial else ''}prefetched download: {staged} -> {destination}")
+        self.progress.print_line(f"Using {'partially ' if partial else ''}prefetched {destination.name}")
+
+    def _discard_partial(self, destination: Path):
+        """Remove a partial download together with its resume state"""
+        self._stream_hashes.pop(str(destination), None)
+        self._segment_state_path(destination).unlink(missing_ok=True)
+        if destination.exists():
+            destination.unlink()
+
+    def _fetch_from_cache(self, url: str, destination: Path, checksum: Optional[str], checksum_type: str) -> bool:
+        """Place an artifact from the machine-wide cache at destination if it is cached"""
+        if not self.cache or checksum_type.lower() != 'sha256':
+            return False
+
+        # A verified destination matching the expected checksum is accepted by download_file itself
+        recorded_checksum = self.get_recorded_checksum(destination, checksum_type)
+        if recorded_checksum and checksum and recorded_checksum.lower() == checksum.lower():
+            return False
+
+        sha256 = self.cache.lookup(url=url, checksum=checksum)
+        if sha256 is None:
+            return False
+        if not checksum and not self._cached_copy_current(sha256, url, destination):
+            return False
+
+        # Unpinned ("latest") artifacts are revalidated when validators are known
+        http_metadata = None if checksum else self.cache.get_http_metadata(sha256, url)
+
+        if recorded_checksum and recorded_checksum.lower() == sha256:
+            self.logger.info(f"File already matches cached artifact: {destination.name}")
+        else:
+            if not self.cache.materialize(sha256, destination):
+                return False
+            self._segment_state_path(destination).unlink(missing_ok=True)
+            self._record_verified(destination, checksum_type, sha256)
+            self.progress.print_line(f"Using cached copy of {destination.name}")
+
+        if http_metadata:
+            self._save_http_metadata(destination, http_metadata)
+            return False
+
+        self._report_result(destination, url, "hit")
+        return True
+
+    def _cached_copy_current(self, sha256: str, url: str, destination: Path) -> bool:
+        """
+        Check that the cached copy of an unpinned ("latest") URL may still be used
+
+        With an ETag or Last-Modified it is revalidated by a conditional request
+        later. Without them, it must be younger than UNPINNED_CACHE_MAX_AGE and
+        the server's Content-Length must still match its size.
+        """
+        http_metadata = self.cache.get_http_metadata(sha256, url) or {}
+        if http_metadata.get("etag") or http_metadata.get("last_modified"):
+            return True
+
+        entry = self.cache.get_entry(sha256) or {}
+        if time.time() - entry.get("added", 0) > self.UNPINNED_CACHE_MAX_AGE:
+            self.logger.info(f"Cached copy of {destination.name} is too old to use without validators")
+            return False
+        try:
+            response = self.session.head(http_metadata.get("source_url") or url, allow_redirects=True, timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            # Without a network the cached copy is still better than nothing
+            self.logger.warning(f"Cannot check cached copy of {destination.name}, using it: {e}")
+            return True
+        length = response.headers.get('content-length')
+        if not (length or "").isdigit() or int(length) != entry.get("size"):
+            self.logger.info(f"{destination.name} changed upstream (size {length} vs {entry.get('size')}), "
+                             f"downloading again")
+            return False
+        return True
+
+    def _http_metadata_path(self, destination: Path) -> Path:
+        """Get path of the sidecar file holding HTTP validators of a download"""
+        return destination.with_name(destination.name + ".meta.json")
+
+    def _save_http_metadata(self, destination: Path, http_metadata: Dict[str, Any]):
+        """Persist HTTP validators of a download"""
+        try:
+            record = dict(http_metadata)
+            record["checked_at"] = time.time()
+            with open(self._http_metadata_path(destination), 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Could not save download metadata for {destination.name}: {e}")
+
+    def _load_http_metadata(self, destination: Path, url: str) -> Optional[Dict[str, Any]]:
+        """Load HTTP validators of a download made from url"""
+        try:
+            metadata_file = self._http_metadata_path(destination)
+            if not metadata_file.exists():
+                return None
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            return record if record.get("url") == url else None
+        except Exception:
+            return None
+
+    def _revalidate(self, url: str, destination: Path, checksum: Optional[str], checksum_type: str) -> bool:
+        """
+        Confirm with a conditional request that an existing unpinned download is current
+
+        Returns:
+            True if the server answered 304 Not Modified
+        """
+        # Pinned artifacts are verified by digest, not by the server
+        if checksum or not destination.exists():
+            return False
+
+        http_metadata = self._load_http_metadata(destination, url)
+        if not http_metadata or self.get_recorded_checksum(destination, checksum_type) is None:
+            return False
+        if http_metadata.get("content_length") and http_metadata["content_length"] != destination.stat().st_size:
+            return False
+
+        headers = {}
+        if http_metadata.get("etag"):
+            headers['If-None-Match'] = http_metadata["etag"]
+        if http_metadata.get("last_modified"):
+            headers['If-Modified-Since'] = http_metadata["last_modified"]
+        if not headers:
+            return False
+
+        start_time = time.time()
+        try:
+            # Ask the source the file was actually fetched from
+            source_url = http_metadata.get("source_url") or url
+            with self.session.get(source_url, headers=headers, stream=True, timeout=30) as response:
+                status_code = response.status_code
+        except Exception as e:
+            self.logger.warning(f"Revalidation request failed for {destination.name}: {e}")
+            return False
+
+        if status_code != 304:
+            self.logger.info(f"{destination.name} changed upstream (HTTP {status_code}), downloading again")
+            return False
+
+        self._save_http_metadata(destination, http_metadata)
+        self._report_result(destination, url, "revalidated", start_time)
+        return True
+
+    def record_download(self, url: str, destination: Path, checksum_type: str, digest: str,
+                        http_metadata: Dict[str, Any], start_time: Optional[float] = None,
+                        transferred: int = 0, result: str = "refetched"):
+        """Remember a completed download: digest record, HTTP validators, cache and result"""
+        self._record_verified(destination, checksum_type, digest)
+        self._save_http_metadata(destination, http_metadata)
+        if self.cache and checksum_type.lower() == 'sha256':
+            self.cache.add(destination, url, digest, http_metadata)
+
+        self.logger.info(f"Download completed: {destination.name}")
+        self._report_result(destination, url, result, start_time, transferred)
+
+    def _report_result(self, destination: Path, url: str, result: str,
+                       start_time: Optional[float] = None, transferred: int = 0):
+        """Log and remember how a download was satisfied"""
+        elapsed = time.time() - start_time if start_time else 0.0
+        self.download_results[destination.name] = {
+            "url": url,
+            "path": str(destination),
+            "result": result,
+            "bytes_transferred": transferred,
+            "seconds": round(elapsed, 3)
+        }
+        self.logger.info(f"Download result for {destination.name}: {result} ({elapsed:.2f}s)")
+
+    def _segment_state_path(self, destination: Path) -> Path:
+        """Get path of the sidecar file holding per-segment progress"""
+        return destination.with_name(destination.name + ".segments.json")
+
+    def _load_segment_state(self, state_file: Path, url: str, destination: Path, total_size: int) -> Optional[List[Dict[str, int]]]:
+        """Load persisted segment progress if it belongs to this download"""
+        try:
+            if not state_file.exists() or not destination.exists():
+                return None
+
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+
+            if state.get("url") != url or state.get("total_size") != total_size:
+                return None
+            if destination.stat().st_size != total_size:
+                return None
+
+            return state["segments"]
+
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable segment state {state_file.name}: {e}")
+            return None
+
+    def _save_segment_state(self, state_file: Path, url: str, total_size: int, segments: List[Dict[str, int]]):
+        """Persist segment progress atomically"""
+        temp_file = state_file.with_name(state_file.name + ".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"url": url, "total_size": total_size, "segments": segments}, f)
+        os.replace(temp_file, state_file)
+
+    def _download_segmented(self,
+                            url: str,
+                            destination: Path,
+                            total_size: int,
+                            progress_callback: Optional[Callable[[int, int], None]] = None,
+                            stream_hash: Optional[_StreamingHash] = None,
+                            source_url: Optional[str] = None,
+                            transfer: Optional[Transfer] = None,
+                            segment_count: Optional[int] = None,
+                            buffer_size: int = DEFAULT_BUFFER_SIZE,
+                            cancel: Optional[threading.Event] = None,
+                            space: Optional[SpaceClaim] = None) -> Optional[int]:
+        """
+        Download a file as byte ranges written into a preallocated file
+
+        Segment boundaries are multiples of buffer_size, so every full-buffer
+        write lands on an aligned offset.
+
+        Segment state is keyed on url; the ranges are fetched from source_url
+        (a mirror of url) when given.
+
+        Progress of every segment is persisted next to the file, so an interrupted
+        download resumes each segment where it stopped. The running digest follows
+        the contiguous prefix of the file: bytes at the hash frontier are hashed
+        as they arrive, and segments that finish ahead of it are caught up while
+        they are still in the OS cache.
+
+        Returns:
+            Number of bytes downloaded, or None if the server ignored range requests
+        """
+        state_file = self._segment_state_path(destination)
+        segments = self._load_segment_state(state_file, url, destination, total_size)
+
+        if segments is None:
+            # Split the file into equal aligned ranges and preallocate the target
+            if segment_count is None:
+                segment_count = self.SEGMENT_COUNT
+            segment_count = max(1, min(segment_count, total_size // self.MIN_SEGMENT_SIZE))
+            segment_size = max(total_size // segment_count // buffer_size, 1) * buffer_size
+            segments = []
+            for index in range(segment_count):
+                start = index * segment_size
+                end = total_size - 1 if index == segment_count - 1 else start + segment_size - 1
+                segments.append({"start": start, "end": end, "done": 0})
+
+            if destination.exists():
+                destination.unlink()
+            with open(destination, 'wb') as f:
+                f.truncate(total_size)
+            self._save_segment_state(state_file, url, total_size, segments)
+            if stream_hash:
+                stream_hash.reset()
+            if segment_count > 1:
+                self.logger.info(f"Downloading in {segment_count} segments over parallel connections")
+        else:
+            completed = sum(segment["done"] for segment in segments)
+            self.logger.info(f"Resuming segmented download from {completed/(1024*1024):.1f} MB")
+            self.progress.print_line(f"Resuming from {completed/(1024*1024):.1f} MB / {total_size/(1024*1024):.1f} MB")
+
+        lock = threading.Lock()
+        hash_lock = threading.Lock()
+        progress = {"downloaded": sum(segment["done"] for segment in segments), "unsaved": 0}
+        ranges_ignored = threading.Event()
+
+        def advance_hash():
+            # Hash every byte already written contiguously after the hash frontier
+            if not stream_hash:
+                return
+            with hash_lock:
+                for segment in segments:
+                    written_end = segment["start"] + segment["done"]
+                    if stream_hash.offset < segment["start"]:
+                        break
+                    stream_hash.catch_up(destination, max(stream_hash.offset, written_end))
+                    if written_end <= segment["end"]:
+                        break
+
+        def fetch_segment(segment: Dict[str, int]):
+            position = segment["start"] + segment["done"]
+            if position > segment["end"]:
+                return
+
+            headers = {'Range': f'bytes={position}-{segment["end"]}'}
+            with self.session.get(source_url or url, headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    ranges_ignored.set()
+                    return
+
+                def on_read(amount: int):
+                    check_cancelled(cancel, destination.name)
+                    with lock:
+                        # A full disk holds up every segment until space is freed
+                        if space:
+                            space.consume(amount)
+                        progress["downloaded"] += amount
+                        if progress_callback:
+                            progress_callback(progress["downloaded"], total_size)
+                    # Outside the lock, so a throttled segment doesn't stall the others
+                    if transfer:
+                        transfer.consume(amount)
+
+                def on_write(data: memoryview):
+                    position = segment["start"] + segment["done"]
+
+                    # Hash directly when this segment is at the hash frontier
+                    if stream_hash and stream_hash.offset == position:
+                        with hash_lock:
+                            if stream_hash.offset == position:
+                                stream_hash.update(data)
+
+                    with lock:
+                        segment["done"] += len(data)
+                        progress["unsaved"] += len(data)
+                        if progress["unsaved"] >= self.SEGMENT_STATE_SAVE_INTERVAL:
+                            self._save_segment_state(state_file, url, total_size, segments)
+                            progress["unsaved"] = 0
+
+                # Unbuffered, so bytes are visible to the hash catch-up as soon as they're counted
+                with open(destination, 'r+b', buffering=0) as f:
+                    f.seek(position)
+                    # Never write past the end of this segment
+                    self._stream_to_file(response, f, segment["end"] + 1 - position,
+                                         bytearray(buffer_size), on_read, on_write)
+
+            advance_hash()
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [executor.submit(fetch_segment, segment) for segment in segments]
+                for future in futures:
+                    future.result()
+        finally:
+            # Keep whatever progress was made for the next attempt
+            with lock:
+                if state_file.exists():
+                    self._save_segment_state(state_file, url, total_size, segments)
+
+        if ranges_ignored.is_set():
+            return None
+
+        incomplete = [s for s in segments if s["start"] + s["done"] <= s["end"]]
+        if incomplete:
+            raise Exception(f"{len(incomplete)} segment(s) ended early")
+
+        state_file.unlink()
+        return sum(segment["end"] + 1 - segment["start"] for segment in segments)
+
+    def _stream_to_file(self, response, f, limit: Optional[int], buffer: bytearray,
+                        on_read: Callable[[int], None], on_write: Callable[[memoryview], None]) -> int:
+        """
+        Copy a response body into f through a reusable buffer
+
+        The socket is read straight into the buffer, and only full buffers are
+        written (plus the tail), so writes are large and stay aligned.
+
+        Args:
+            limit: Maximum number of bytes to copy (None to read until the body ends)
+            on_read: Called with the byte count of every read
+            on_write: Called with every block after it was written
+
+        Returns:
+            Number of bytes written
+        """
+        view = memoryview(buffer)
+        raw = response.raw
+        # Encoded bodies have to go through urllib3's decoder
+        identity = response.headers.get('content-encoding', 'identity').lower() == 'identity'
+
+        written = 0
+        filled = 0
+        while limit is None or written + filled < limit:
+            wanted = len(buffer) - filled
+            if limit is not None:
+                wanted = min(wanted, limit - written - filled)
+
+            if identity:
+                count = raw.readinto(view[filled:filled + wanted])
+            else:
+                data = raw.read(wanted, decode_content=True)
+                count = len(data)
+                view[filled:filled + count] = data
+            if not count:
+                break
+
+            filled += count
+            on_read(count)
+
+            if filled == len(buffer):
+                f.write(view)
+                on_write(view)
+                written += filled
+                filled = 0
+
+        if filled:
+            f.write(view[:filled])
+            on_write(view[:filled])
+            written += filled
+
+        return written
+
+    def _verified_sidecar_path(self, file_path: Path) -> Path:
+        """Get path of the sidecar file recording a file's verified digest"""
+        return file_path.with_name(file_path.name + ".verified.json")
+
+    def _record_verified(self, file_path: Path, checksum_type: str, digest: str):
+        """Record a file's digest together with the size and mtime it was computed for"""
+        try:
+            stat = file_path.stat()
+            record = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "checksum_type": checksum_type.lower(),
+                "checksum": digest.lower()
+            }
+            with open(self._verified_sidecar_path(file_path), 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Could not record verified digest for {file_path.name}: {e}")
+
+    def get_recorded_checksum(self, file_path: Path, checksum_type: str = 'sha256') -> Optional[str]:
+        """Get the recorded digest of a file if the file hasn't changed since it was hashed"""
+        try:
+            sidecar = self._verified_sidecar_path(file_path)
+            if not sidecar.exists() or not file_path.exists():
+                return None
+
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+
+            stat = file_path.stat()
+            if (record.get("size") != stat.st_size or
+                    record.get("mtime_ns") != stat.st_mtime_ns or
+                    record.get("checksum_type") != checksum_type.lower()):
+                return None
+
+            return record.get("checksum")
+
+        except Exception:
+            return None
+
     def _verify_checksum(self, file_path: Path, expected_checksum: str, checksum_type: str) -> bool:
-        """Verify file checksum"""
+        """Verify file checksum, reusing the recorded digest when the file is unchanged"""
         try:
-            hash_func = getattr(hashlib, checksum_type.lower())()
-            
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(8192), b""):
-                    hash_func.update(chunk)
-            
-            actual_checksum = hash_func.hexdigest()
+            actual_checksum = self.get_recorded_checksum(file_path, checksum_type)
+
+            if actual_checksum is None:
+                hash_func = getattr(hashlib, checksum_type.lower())()
+
+                with open(file_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        hash_func.update(chunk)
+
+                actual_checksum = hash_func.hexdigest()
+                self._record_verified(file_path, checksum_type, actual_checksum)
+
             return actual_checksum.lower() == expected_checksum.lower()
             
         except Exception as e:
@@ -159,27 +984,108 @@ class DownloadManager:
             return False
     
     def download_with_progress(self, url: str, destination: Path, description: str = "") -> bool:
-        """Download with console progress bar"""
-        
-        def progress_callback(downloaded: int, total: int):
-            if total > 0:
-                percent = (downloaded / total) * 100
-                bar_length = 50
-                filled_length = int(bar_length * downloaded // total)
-                bar = '█' * filled_length + '-' * (bar_length - filled_length)
-                
-                # Format sizes
-                downloaded_mb = downloaded / (1024 * 1024)
-                total_mb = total / (1024 * 1024)
-                
-                print(f'\r{description}: |{bar}| {percent:.1f}% ({downloaded_mb:.1f}/{total_mb:.1f} MB)', end='')
-        
-        result = self.download_file(url, destination, progress_callback)
-        print()  # New line after progress bar
-        return result
-    
+        """Download with console progress (drawn by the shared progress reporter)"""
+        with self.progress.track(description or destination.name) as item:
+            return self.download_file(url, destination, item.update)
+
+    def rank_mirrors(self, component: str, urls: List[str]) -> List[str]:
+        """Get a component's download URLs ordered by measured latency and throughput"""
+        if component not in self._mirror_rankings:
+            self._mirror_rankings[component] = self.mirror_selector.rank(urls)
+        return self._mirror_rankings[component]
+
+    def use_mirror_probes(self, component: str, urls: List[str], results: List[Dict[str, Any]]) -> List[str]:
+        """Rank a component's mirrors from probes made elsewhere (e.g. the preflight check)"""
+        self._mirror_rankings[component] = self.mirror_selector.order(urls, results)
+        return self._mirror_rankings[component]
+
+    def probe_mirrors(self) -> Dict[str, List[str]]:
+        """Rank the mirrors of every manifest component concurrently"""
+        if not self.manifest:
+            return {}
+
+        entries = [self.manifest.get(component) for component in self.manifest.components()]
+        entries = [entry for entry in entries if entry and entry["component"] not in self._mirror_rankings]
+
+        with ThreadPoolExecutor(max_workers=max(1, len(entries))) as executor:
+            rankings = executor.map(lambda entry: self.mirror_selector.rank(entry["urls"]), entries)
+            for entry, ranking in zip(entries, rankings):
+                self._mirror_rankings[entry["component"]] = ranking
+
+        return dict(self._mirror_rankings)
+
+    def download_artifact(self,
+                          component: str,
+                          destination: Optional[Path] = None,
+                          version: Optional[str] = None,
+                          description: Optional[str] = None,
+                          fallback_url: Optional[str] = None,
+                          priority: Priority = Priority.CRITICAL) -> Optional[Path]:
+        """
+        Download a component pinned in the artifact manifest from its best mirror
+
+        Args:
+            component: Manifest component name (e.g. "miniconda")
+            destination: Local file path (downloads/<manifest filename> if None)
+            version: Manifest version key (component's default version if None)
+            description: Progress label (file name if None)
+            fallback_url: URL to use when the manifest has no entry for the component
+            priority: Bandwidth scheduler class (installers are on the critical path by default)
+
+        Returns:
+            Path to the downloaded file, or None on failure
+        """
+        if self.offline_bundle:
+            if destination is None:
+                entry = self.manifest.get(component, version) if self.manifest else None
+                destination = self.logs_path.parent / "downloads" / (entry["filename"] if entry else component)
+            start_time = time.time()
+            if not self.offline_bundle.fetch_artifact(component, destination):
+                return None
+            self._report_result(destination, f"bundle:{component}", "bundle", start_time)
+            return destination
+
+        artifact = self.resolve_artifact(component, destination, version, fallback_url)
+        if artifact is None:
+            return None
+        destination = artifact["destination"]
+
+        with self.progress.track(description or destination.name) as item:
+            success = self.download_file(artifact["url"], destination, item.update, checksum=artifact["sha256"],
+                                         mirrors=artifact["sources"], priority=priority)
+
+        return destination if success else None
+
+    def resolve_artifact(self,
+                         component: str,
+                         destination: Optional[Path] = None,
+                         version: Optional[str] = None,
+                         fallback_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get url (the artifact's identity), sources (ranked mirrors), sha256 and
+        destination of a component, as used by download_artifact
+        """
+        entry = self.manifest.get(component, version) if self.manifest else None
+        if entry:
+            if destination is None:
+                destination = self.logs_path.parent / "downloads" / entry["filename"]
+
+            # The primary URL stays the artifact's identity; the ranking only decides the order tried
+            return {"url": entry["urls"][0], "sources": self.rank_mirrors(component, entry["urls"]),
+                    "sha256": entry["sha256"], "destination": destination}
+
+        if fallback_url and destination is not None:
+            self.logger.warning(f"Component {component} not in artifact manifest, using {fallback_url}")
+            return {"url": fallback_url, "sources": [fallback_url], "sha256": None, "destination": destination}
+
+        self.logger.error(f"Component {component} {version or ''} not found in artifact manifest")
+        return None
+
     def get_download_urls(self) -> Dict[str, Dict[str, Any]]:
         """Get download URLs and metadata for all required components"""
+        if self.manifest:
+            return self.manifest.as_download_urls()
+
         return {
             "python": {
                 "3.10.11": {
@@ -244,3 +1150,23 @@ class DownloadManager:
         else:
             return None
 
+
+    def start_download(self, url: str, destination: Path, timeout: Optional[float] = None,
+                       **kwargs) -> TransferHandle:
+        """Start download_file in the background download engine; wait with handle.result()"""
+        return self._engine().submit(destination.name, self.download_file, url, destination,
+                                     timeout=timeout, **kwargs)
+
+    def start_component_download(self, component: str, version: str = "latest", destination_dir: Path = None,
+                                 timeout: Optional[float] = None) -> TransferHandle:
+        """Start download_component in the background download engine"""
+        return self._engine().submit(f"{component} {version}", self.download_component, component, version,
+                                     destination_dir, timeout=timeout)
+
+    def start_task(self, name: str, function: Callable[..., Any], *args,
+                   timeout: Optional[float] = None, **kwargs) -> TransferHandle:
+        """Run a function that downloads (e.g. an installer's download step) in the download engine"""
+        return self._engine().submit(name, function, *args, timeout=timeout, **kwargs)
+
+    def _engine(self):
+        return get_engine(self.logs_path.parent / "config" / "install_config.json")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Env Runner - Runs a conda environment's interpreter directly instead of through `conda run`
+The activation variables are worked out once per environment; every call after that
+starts only the environment's own Python
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict
+
+
+class EnvRunner:
+    """
+    Runs commands with an environment's Python, activated the way `conda run` would
+
+    PATH gets the environment's directories (on Windows also Library\\bin
+    and friends, where conda packages keep their DLLs) and the CONDA_*
+    variables plus those set with `conda env config vars` are added. If
+    packages ship activation scripts (etc/conda/activate.d), their effect
+    can't be worked out without running them: the environment is then
+    captured from a single `conda run`. The result is cached until the
+    scripts or the configured variables change. Environments without a
+    Python of their own fall back to `conda run` for every call.
+    """
+
+    SHELL_VARIABLES = {"SHLVL", "_", "PWD", "OLDPWD"}  # Set by the shell conda run starts, not by activation
+
+    def __init__(self, prefix: Path, conda_exe: Optional[Path] = None):
+        self.prefix = Path(prefix)
+        self.conda_exe = Path(conda_exe) if conda_exe else None
+        self.logger = logging.getLogger(__name__)
+        self._environment: Optional[Dict[str, str]] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    @property
+    def python(self) -> Path:
+        """The environment's interpreter"""
+        if sys.platform == "win32":
+            return self.prefix / "python.exe"
+        return self.prefix / "bin" / "python"
+
+    def exists(self) -> bool:
+        return self.python.exists()
+
+    def python_command(self, *args: str) -> List[str]:
+        """Command running the environment's Python with args"""
+        if not self.exists() and self.conda_exe:
+            return [str(self.conda_exe), "run", "--prefix", str(self.prefix), "python", *args]
+        return [str(self.python), *args]
+
+    def pip_command(self, *args: str) -> List[str]:
+        """Command running the environment's pip with args"""
+        return self.python_command("-m", "pip", *args)
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """Run the environment's Python with args and capture its output"""
+        return subprocess.run(self.python_command(*args), capture_output=True, text=True, timeout=timeout,
+                              env=self.environment())
+
+    def _path_entries(self) -> List[str]:
+        """Directories `conda activate` puts in front of PATH"""
+        if sys.platform == "win32":
+            return [str(self.prefix / sub) for sub in
+                    ("", "Library/mingw-w64/bin", "Library/usr/bin", "Library/bin", "Scripts", "bin")]
+        return [str(self.prefix / "bin")]
+
+    def _config_vars(self) -> Dict[str, str]:
+        """Variables set with `conda env config vars set` (kept in conda-meta/state)"""
+        try:
+            with open(self.prefix / "conda-meta" / "state", 'r', encoding='utf-8') as f:
+                return {str(k): str(v) for k, v in json.load(f).get("env_vars", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _activation_scripts(self) -> List[Path]:
+        scripts_dir = self.prefix / "etc" / "conda" / "activate.d"
+        suffixes = (".bat",) if sys.platform == "win32" else (".sh",)
+        if not scripts_dir.is_dir():
+            return []
+        return sorted(p for p in scripts_dir.iterdir() if p.suffix in suffixes)
+
+    def _current_stamp(self):
+        stamps = []
+        for path in (self.prefix / "etc" / "conda" / "activate.d", self.prefix / "conda-meta" / "state"):
+            try:
+                stamps.append(path.stat().st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _static_variables(self) -> Dict[str, str]:
+        """Activation variables worked out from the prefix alone"""
+        variables = {
+            "PATH": os.pathsep.join(self._path_entries() + [os.environ.get("PATH", "")]),
+            "CONDA_PREFIX": str(self.prefix),
+            "CONDA_DEFAULT_ENV": self.prefix.name,
+            "CONDA_SHLVL": "1",
+            "CONDA_PROMPT_MODIFIER": f"({self.prefix.name}) ",
+        }
+        if self.conda_exe:
+            variables["CONDA_EXE"] = str(self.conda_exe)
+        variables.update(self._config_vars())
+        return variables
+
+    def _captured_variables(self) -> Optional[Dict[str, str]]:
+        """Activation variables as `conda run` sets them, including activation scripts; None if it fails"""
+        script = "import json, os; print(json.dumps(dict(os.environ)))"
+        cmd = [str(self.conda_exe), "run", "--prefix", str(self.prefix), "python", "-c", script]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            captured = json.loads(result.stdout.strip().splitlines()[-1])
+        except (OSError, subprocess.TimeoutExpired, ValueError, IndexError) as e:
+            self.logger.warning(f"Cannot capture the activation of {self.prefix}: {e}")
+            return None
+        return {k: v for k, v in captured.items()
+                if os.environ.get(k) != v and k not in self.SHELL_VARIABLES}
+
+    def variables(self) -> Dict[str, str]:
+        """Variables activation adds or changes, relative to this process's environment"""
+        with self._lock:
+            stamp = self._current_stamp()
+            if self._environment is None or stamp != self._stamp:
+                variables = None
+                scripts = self._activation_scripts()
+                if scripts and self.conda_exe and self.exists():
+                    self.logger.info(f"{self.prefix.name} has activation scripts "
+                                     f"({', '.join(p.name for p in scripts)}), capturing them once")
+                    variables = self._captured_variables()
+                self._environment = variables if variables is not None else self._static_variables()
+                self._stamp = stamp
+            return dict(self._environment)
+
+    def environment(self) -> Dict[str, str]:
+        """Full environment for a child process"""
+        environment = dict(os.environ)
+        environment.update(self.variables())
+        return environment
+
+
+_runners: Dict[Path, EnvRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def get_env_runner(prefix: Path, conda_exe: Optional[Path] = None) -> EnvRunner:
+    """Get the process-wide runner of an environment"""
+    key = Path(prefix).absolute()
+    with _runners_lock:
+        if key not in _runners:
+            _runners[key] = EnvRunner(key, conda_exe)
+        return _runners[key]
+
+
+def _time_calls(cmd: List[str], runs: int, env: Optional[Dict[str, str]] = None) -> List[float]:
+    """Wall time of running cmd runs times, in seconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, capture_output=True, text=True, env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare `conda run` with running the environment's Python directly")
+    parser.add_argument("--conda", required=True, help="conda executable (e.g. D:\\AI_Environment\\Miniconda\\Scripts\\conda.exe)")
+    parser.add_argument("--env", default="AI2025", help="Environment name (default: AI2025)")
+    parser.add_argument("--prefix", default=None, help="Environment directory (default: <conda root>/envs/<env>)")
+    parser.add_argument("--runs", type=int, default=5, help="Calls per variant; the median is reported")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    conda_exe = Path(args.conda)
+    prefix = Path(args.prefix) if args.prefix else conda_exe.parent.parent / "envs" / args.env
+    runner = EnvRunner(prefix, conda_exe)
+    if not runner.exists():
+        print(f"No Python in {prefix}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    environment = runner.environment()
+    print(f"Activation worked out once in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    conda_run = [str(conda_exe), "run", "--prefix", str(prefix), "python"]
+    variants = [
+        ("conda run python -c pass", conda_run + ["-c", "pass"], None),
+        ("direct python -c pass", runner.python_command("-c", "pass"), environment),
+        ("conda run pip --version", conda_run + ["-m", "pip", "--version"], None),
+        ("direct pip --version", runner.pip_command("--version"), environment),
+    ]
+    print(f"{'Call':<28}{'median':>10}{'min':>10}")
+    for label, cmd, env in variants:
+        times = _time_calls(cmd, max(1, args.runs), env)
+        print(f"{label:<28}{statistics.median(times) * 1000:>8.0f}ms{min(times) * 1000:>8.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
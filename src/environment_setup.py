@@ -12,6 +12,8 @@ import shutil
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from wheelhouse import find_wheelhouse
+
 class EnvironmentSetup:
     """Manages Python virtual environments and system configuration"""
     
@@ -190,6 +192,9 @@ set "_OLD_VIRTUAL_PROMPT="
             
             # Use python -m pip to ensure we're using the right pip
             cmd = [str(venv_python), "-m", "pip", "install", package]
+            wheelhouse = find_wheelhouse(self.ai_env_path)
+            if wheelhouse:
+                cmd += ["--find-links", str(wheelhouse)]
             result = subprocess.run(cmd, capture_output=True, text=True)
             
             if result.returncode != 0:
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP Client - Process-wide pooled HTTP session and request coalescing
+All components share keep-alive connections, so TCP/TLS setup happens once per host
+"""
+
+import logging
+import threading
+from typing import Optional, Dict, Any, Callable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+USER_AGENT = 'AI-Environment-Installer/1.0'
+
+# Hosts with an open connection pool, and keep-alive connections kept per host.
+# Segmented downloads use several connections to one host at the same time.
+POOL_HOSTS = 16
+POOL_CONNECTIONS_PER_HOST = 16
+
+
+def create_session() -> requests.Session:
+    """Create a session with keep-alive pools sized for parallel downloads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_CONNECTIONS_PER_HOST)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Get the process-wide HTTP session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+class _Call:
+    """One in-flight call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0  # Callers waiting for this call
+
+
+class SingleFlight:
+    """
+    Runs a call once for all concurrent callers with the same key
+
+    The first caller runs the function; callers arriving while it runs wait
+    and get the same result (or exception). Nothing is cached afterwards.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run function unless a call for key is in flight; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            self.logger.info(f"Waiting for in-flight request: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+_downloads: Optional[SingleFlight] = None
+
+
+def get_download_flights() -> SingleFlight:
+    """Get the process-wide coalescer for downloads"""
+    global _downloads
+    with _session_lock:
+        if _downloads is None:
+            _downloads = SingleFlight()
+        return _downloads
@@ -19,17 +19,24 @@ from typing import Dict, List, Optional, Tuple
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from download_manager import DownloadManager
+from download_engine import DownloadCancelled, TransferHandle
 from conda_installer import CondaInstaller
 from conda_manager import CondaManager
 from vscode_installer import VSCodeInstaller
 from ollama_installer import OllamaInstaller
 from step_tracker import StepTracker
 from installation_status_manager import InstallationStatusManager
+from offline_bundle import OfflineBundle
+from prefetch_worker import staged_wheel_dir
+from preflight import run_preflight
+from space_reservation import component_footprint_mb, estimate_model_gb, get_space_manager
+from wheelhouse import Wheelhouse, choose_wheelhouse_dir
 
 class InstallManager:
     """Main installation manager using split Conda modules"""
     
-    def __init__(self, start_step: int = 1, target_drive: str = "D", ailab_base_path: str = None):
+    def __init__(self, start_step: int = 1, target_drive: str = "D", ailab_base_path: str = None,
+                 offline_bundle: str = None, replay_lock: bool = False):
         self.installer_path = Path(__file__).parent.parent
         self.target_drive = Path(f"{target_drive}:\\")
 
@@ -42,6 +49,9 @@ class InstallManager:
 
         self.logs_path = self.installer_path / "logs"
         self.config_path = self.installer_path / "config"
+        self.lock_dir = self.config_path / "locks"
+        self.replay_lock = replay_lock
+        self.replayed_lock = False
 
         # Create required directories
         self.logs_path.mkdir(exist_ok=True)
@@ -52,9 +62,19 @@ class InstallManager:
         
         # Load configuration
         self.config = self.load_config()
+
+        # Offline bundle (air-gapped install: nothing is fetched from the network)
+        self.offline_bundle = None
+        if offline_bundle:
+            self.offline_bundle = OfflineBundle.open(Path(offline_bundle))
+            if self.offline_bundle is None:
+                raise ValueError(f"Cannot use offline bundle: {offline_bundle}")
+            self.logger.info(f"Installing from offline bundle: {self.offline_bundle.bundle_dir}")
         
-        # Initialize managers
+        # Initialize managers (one download manager shared by all installers)
         self.download_manager = DownloadManager(self.logs_path)
+        self._recorded_downloads = set()
+        self._prefetch: Dict[str, TransferHandle] = {}
         
         # Initialize step tracker
         self.step_tracker = StepTracker(self.ai_env_path)
@@ -63,10 +83,14 @@ class InstallManager:
         self.master_status = InstallationStatusManager()
 
         # Specialized installers
-        self.conda_installer = CondaInstaller(self.ai_env_path, self.logs_path)
+        self.conda_installer = CondaInstaller(self.ai_env_path, self.logs_path, self.download_manager)
         self.conda_manager = None  # Will be initialized after conda installation
-        self.vscode_installer = VSCodeInstaller(self.ai_env_path, self.logs_path)
-        self.ollama_installer = OllamaInstaller(self.ai_env_path, self.logs_path)
+        self.vscode_installer = VSCodeInstaller(self.ai_env_path, self.logs_path, self.download_manager)
+        self.ollama_installer = OllamaInstaller(self.ai_env_path, self.logs_path, self.download_manager)
+
+        if self.offline_bundle:
+            self.download_manager.offline_bundle = self.offline_bundle
+            self.vscode_installer.extension_files = self.offline_bundle.extension_files()
         
         # Progress tracking
         self.total_steps = 8
@@ -171,30 +195,95 @@ class InstallManager:
         
         self.logger.info(f"Step {self.current_step}: {message}")
 
+    def record_download_results(self):
+        """Copy new download outcomes (hit, revalidated, refetched, shared) into the status file"""
+        for name, details in self.download_manager.download_results.items():
+            if name in self._recorded_downloads:
+                continue
+            self._recorded_downloads.add(name)
+            self.step_tracker.record_download(name, details)
+            print(f"  {name}: {details['result']}")
+
+    def start_prefetch(self):
+        """Start the Miniconda, VS Code and Ollama downloads together in the background"""
+        if self.offline_bundle:
+            return
+
+        dm = self.download_manager
+        if self.start_step <= 3 and not self.conda_installer.check_existing_installation()['found']:
+            self._prefetch["miniconda"] = dm.start_task("Miniconda", self.conda_installer.downloader.download_miniconda)
+        # Fresh VS Code and Ollama installs are extracted while they download
+        if self.start_step <= 5:
+            self._prefetch["vscode"] = dm.start_task("VS Code", self.vscode_installer.prefetch, "latest")
+        if self.start_step <= 7:
+            self._prefetch["ollama"] = dm.start_task("Ollama", self.ollama_installer.prefetch)
+
+        if self._prefetch:
+            print(f"Downloading in the background: {', '.join(self._prefetch)}")
+
+    def await_prefetch(self, name: str):
+        """Wait for a background download; the step then finds the file already fetched"""
+        handle = self._prefetch.pop(name, None)
+        if handle is None:
+            return
+        try:
+            if not handle.result():
+                self.logger.warning(f"Background download of {name} failed, the step downloads it again")
+        except DownloadCancelled as e:
+            self.logger.warning(f"Background download of {name} did not finish: {e}")
+
+    def cancel_prefetch(self):
+        """Stop background downloads nobody waits for any more"""
+        for name, handle in self._prefetch.items():
+            if not handle.done():
+                self.logger.info(f"Cancelling background download of {name}")
+                handle.cancel()
+        self._prefetch.clear()
+
     def check_prerequisites(self) -> bool:
         """Check system prerequisites"""
         self.print_progress("Checking system prerequisites", "Verifying system and disk space")
         
         try:
-            # Check disk space (Windows compatible)
-            import shutil
-            free_space_bytes = shutil.disk_usage(str(self.target_drive)).free
-            free_space_gb = free_space_bytes / (1024**3)
-            
-            print(f"Available disk space: {free_space_gb:.0f}GB")
-            
-            if free_space_gb < 50:
-                self.logger.error(f"Insufficient disk space: {free_space_gb:.1f}GB available, 50GB required")
+            # Check disk space against what the components take while they install. Models are
+            # optional: they are skipped later if they don't fit, so they only get a warning here.
+            space = get_space_manager()
+            manifest = self.download_manager.manifest
+            footprints = {name: component_footprint_mb(name, manifest)
+                          for name in ("miniconda", "environment", "vscode", "ollama")}
+            models_mb = {model: estimate_model_gb(model) * 1024 for model in self.config.get("ollama_models", [])}
+            plan = space.plan(self.target_drive, footprints)
+
+            print(f"Available disk space: {plan['free_mb'] / 1024:.0f}GB")
+            for name, size_mb in footprints.items():
+                print(f"  {name:<12} ~{size_mb / 1024:.1f} GB")
+            if models_mb:
+                print(f"  {'models':<12} ~{sum(models_mb.values()) / 1024:.1f} GB (optional)")
+
+            if not plan["fits"]:
+                self.logger.error(f"Insufficient disk space: {plan['free_mb'] / 1024:.1f}GB available, "
+                                  f"{plan['required_mb'] / 1024:.1f}GB required")
                 return False
+            if models_mb and not space.plan(self.target_drive, dict(footprints, **models_mb))["fits"]:
+                self.logger.warning("Not enough disk space for all models; models that don't fit will be skipped")
+                print("Warning: Not enough disk space for all AI models. Models that don't fit will be skipped.")
             
-            # Check internet connection
-            try:
-                import urllib.request
-                urllib.request.urlopen('https://www.google.com', timeout=10)
-                print("Internet connection available")
-            except:
-                self.logger.warning("Internet connection check failed")
+            # Check internet connection (not needed when installing from a bundle)
+            if self.offline_bundle:
+                print("Offline bundle mode - skipping internet connection check")
+                self.logger.info("Prerequisites check completed successfully")
+                return True
+
+            # Probe every download endpoint; this also warms the shared session's connections
+            print("Checking download servers...")
+            report = run_preflight(self.download_manager, self.config, self.logs_path / "preflight.json")
+            if not report["reachable"]:
+                self.logger.warning("Internet connection check failed: no download server is reachable")
                 return False
+            unreachable = [r["name"] for r in report["results"] if not r["reachable"]]
+            if unreachable:
+                # Mirrors, fallbacks and retries may still get through
+                self.logger.warning(f"Unreachable during preflight: {', '.join(unreachable)}")
             
             self.logger.info("Prerequisites check completed successfully")
             return True
@@ -230,16 +319,27 @@ class InstallManager:
             self.logger.error(f"Error creating directory structure: {e}")
             return False
 
+    def create_conda_manager(self, conda_exe: Path) -> CondaManager:
+        """Create the conda manager; online installs get prefetched wheels and a wheelhouse"""
+        if self.offline_bundle:
+            return CondaManager(conda_exe, self.ai_env_path, self.offline_bundle)
+        wheel_dir = staged_wheel_dir()
+        wheelhouse = Wheelhouse(choose_wheelhouse_dir(self.ai_env_path), self.download_manager,
+                                [wheel_dir] if wheel_dir else None)
+        return CondaManager(conda_exe, self.ai_env_path, wheel_dir=wheel_dir, wheelhouse=wheelhouse)
+
     def install_conda(self) -> bool:
         """Install Miniconda"""
         self.print_progress("Installing Miniconda", "Downloading and installing Python environment manager")
         
         try:
+            self.await_prefetch("miniconda")
             success = self.conda_installer.install()
+            self.record_download_results()
             if success:
                 # Initialize conda manager after successful installation
                 conda_exe = self.conda_installer.get_conda_exe()
-                self.conda_manager = CondaManager(conda_exe, self.ai_env_path)
+                self.conda_manager = self.create_conda_manager(conda_exe)
             return success
         except Exception as e:
             self.logger.error(f"Error installing Miniconda: {e}")
@@ -254,6 +354,13 @@ class InstallManager:
                 self.logger.error("Conda manager not initialized")
                 return False
             
+            # A lockfile from an earlier installation also installs every package, without solving
+            if self.replay_lock:
+                if self.conda_manager.replay_lockfile("AI2025", self.lock_dir):
+                    self.replayed_lock = True
+                    return True
+                print("Lockfile replay failed, creating the environment normally")
+
             success = self.conda_manager.create_environment("AI2025", self.config["python_version"])
             return success
         except Exception as e:
@@ -265,7 +372,9 @@ class InstallManager:
         self.print_progress("Installing VS Code", "Downloading and installing portable VS Code")
         
         try:
+            self.await_prefetch("vscode")
             success = self.vscode_installer.install("latest")
+            self.record_download_results()
             return success
         except Exception as e:
             self.logger.error(f"Error installing VS Code: {e}")
@@ -280,7 +389,13 @@ class InstallManager:
                 self.logger.error("Conda manager not initialized")
                 return False
             
+            if self.replayed_lock:
+                print("Packages already installed from the lockfile")
+                return True
+
             success = self.conda_manager.install_packages_batch(self.config["python_packages"], "AI2025")
+            if success and not self.conda_manager.write_lockfile("AI2025", self.lock_dir):
+                self.logger.warning("Could not write the environment lockfile, --replay-lock won't be available")
             return success
         except Exception as e:
             self.logger.error(f"Error installing Python packages: {e}")
@@ -292,20 +407,34 @@ class InstallManager:
         
         try:
             # Install Ollama server
+            self.await_prefetch("ollama")
             success = self.ollama_installer.install()
+            self.record_download_results()
             if not success:
                 return False
             
-            # Ask user if they want to download models
+            # Models in an offline bundle are copied without asking - no download involved
             models = self.config["ollama_models"]
-            if models:
+            if models and self.offline_bundle:
+                if self.offline_bundle.models_dir:
+                    print(f"\nInstalling {len(models)} AI models from offline bundle...")
+                    if not self.ollama_installer.import_models(self.offline_bundle.models_dir, models):
+                        self.logger.warning("Some models are missing from the offline bundle")
+                        print("Warning: Some models are not in the bundle. Pull them later with: ollama pull <model_name>")
+                else:
+                    print("\nOffline bundle contains no models - skipping model installation.")
+
+            # Ask user if they want to download models
+            elif models:
                 print(f"\n{'='*60}")
                 print(f"AI Model Download")
                 print(f"{'='*60}")
                 print(f"The installer can download {len(models)} AI models:")
                 for model in models:
-                    print(f"  - {model}")
-                print(f"\nTotal size: ~15-20 GB")
+                    print(f"  - {model} (~{estimate_model_gb(model):.1f} GB)")
+                available_gb = get_space_manager().available(self.ai_env_path) / (1024**3)
+                print(f"\nTotal size: ~{sum(estimate_model_gb(m) for m in models):.0f} GB "
+                      f"({max(available_gb, 0):.0f} GB available)")
                 print(f"Download time: 10-30 minutes (depending on connection)")
                 print(f"\nYou can skip this and download models later with: ollama pull <model_name>")
                 print(f"{'='*60}\n")
@@ -618,7 +747,7 @@ Environment: AI2025 (Conda)
             if self.start_step >= 4:
                 conda_exe = self.ai_env_path / "Miniconda" / "Scripts" / "conda.exe"
                 if conda_exe.exists():
-                    self.conda_manager = CondaManager(conda_exe, self.ai_env_path)
+                    self.conda_manager = self.create_conda_manager(conda_exe)
                     print(f"Conda manager initialized for resume from step {self.start_step}")
             
             # Step 1: Check prerequisites
@@ -653,6 +782,9 @@ Environment: AI2025 (Conda)
             else:
                 print(f"Skipping step 2 (Directory structure)")
             
+            # Installer downloads overlap with the steps before the ones that need them
+            self.start_prefetch()
+
             # Step 3: Install Miniconda
             if self.start_step <= 3:
                 if not self.install_conda():
@@ -786,6 +918,9 @@ Environment: AI2025 (Conda)
             self.logger.error(traceback.format_exc())
             return False
 
+        finally:
+            self.cancel_prefetch()
+
 def main():
     """Main function"""
     import argparse
@@ -797,6 +932,10 @@ def main():
                        help='Target drive letter (e.g., D, E, F)')
     parser.add_argument('--ailab', type=str, default=None,
                        help='Path to AI_Lab folder (if installing to external drive with AI_Lab)')
+    parser.add_argument('--offline-bundle', type=str, default=None,
+                       help='Install from a bundle built with offline_bundle.py build-bundle (no network access)')
+    parser.add_argument('--replay-lock', action='store_true',
+                       help='Create the environment from the lockfile of an earlier installation (config/locks)')
 
     args = parser.parse_args()
 
@@ -819,7 +958,10 @@ def main():
             print(f"Target installation: {args.ailab}\\AI_Environment")
         else:
             print(f"Target installation: {drive_letter}:\\AI_Environment")
-        installer = InstallManager(start_step=args.step, target_drive=drive_letter, ailab_base_path=args.ailab)
+        if args.offline_bundle:
+            print(f"Offline bundle: {args.offline_bundle}")
+        installer = InstallManager(start_step=args.step, target_drive=drive_letter, ailab_base_path=args.ailab,
+                                   offline_bundle=args.offline_bundle, replay_lock=args.replay_lock)
         success = installer.run_installation()
 
         if success:
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Installed Index - What an environment has installed, read from its metadata on disk
+Answers "is this package spec already satisfied?" without starting conda, pip or Python
+"""
+
+import re
+import sys
+import logging
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+
+
+_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*?)\s*$")
+_CLAUSE = re.compile(r"^(~=|===|==|!=|<=|>=|<|>|=)\s*(\S+)$")
+_VERSION = re.compile(
+    r"^v?(?:(\d+)!)?(\d+(?:\.\d+)*)"
+    r"(?:[-_.]?(a|b|c|rc|alpha|beta|pre|preview)[-_.]?(\d*))?"
+    r"(?:[-_.]?(?:post|rev|r)[-_.]?(\d*)|-(\d+))?"
+    r"(?:[-_.]?dev[-_.]?(\d*))?"
+    r"(?:\+[a-z0-9.]+)?$",
+    re.IGNORECASE,
+)
+_PRE_ORDER = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a distribution name (PEP 503): Foo_Bar and foo-bar are the same package"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _version_key(version: str) -> Optional[Tuple]:
+    """Sort key of a PEP 440 version; None if the version doesn't parse"""
+    match = _VERSION.match(version.strip())
+    if not match:
+        return None
+    epoch, release, pre_letter, pre_number, post, post_implicit, dev = match.groups()
+    numbers = [int(part) for part in release.split(".")]
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    post = post if post is not None else post_implicit
+    if pre_letter:
+        pre = (_PRE_ORDER[pre_letter.lower()], int(pre_number or 0))
+    elif dev is not None and post is None:
+        pre = (-1, 0)  # 1.0.dev1 sorts before 1.0a1
+    else:
+        pre = (3, 0)
+    return (int(epoch or 0), tuple(numbers), pre,
+            int(post or 0) if post is not None else -1,
+            int(dev or 0) if dev is not None else sys.maxsize)
+
+
+def _is_prerelease(key: Tuple) -> bool:
+    return key[2] != (3, 0) or key[4] != sys.maxsize
+
+
+def _release(version: str) -> Optional[Tuple[int, List[int]]]:
+    """Epoch and release numbers of a version, for prefix matches"""
+    match = _VERSION.match(version.strip())
+    if not match:
+        return None
+    return int(match.group(1) or 0), [int(part) for part in match.group(2).split(".")]
+
+
+def _prefix_match(installed: str, prefix: str) -> bool:
+    """Check installed against a prefix such as 1.26 (from ==1.26.*)"""
+    have, want = _release(installed), _release(prefix)
+    if have is None or want is None or have[0] != want[0]:
+        return False
+    numbers = have[1] + [0] * max(len(want[1]) - len(have[1]), 0)
+    return numbers[:len(want[1])] == want[1]
+
+
+def version_matches(installed: str, clause: str) -> Optional[bool]:
+    """
+    Evaluate one specifier clause (e.g. >=0.1.0) against an installed version
+
+    Installed pre-releases count, as they do for pip's own check. A single
+    = is conda's prefix match. Returns None when the clause or the version
+    can't be evaluated.
+    """
+    match = _CLAUSE.match(clause.strip())
+    if not match:
+        return None
+    operator, wanted = match.groups()
+    if operator == "===":
+        return installed == wanted
+    if operator in ("==", "!=", "=") and (wanted.endswith(".*") or operator == "="):
+        matched = _prefix_match(installed, wanted[:-2] if wanted.endswith(".*") else wanted)
+        return not matched if operator == "!=" else matched
+
+    have, want = _version_key(installed), _version_key(wanted)
+    if have is None or want is None:
+        return None
+    if operator == "~=":
+        release = _release(wanted)
+        if release is None or len(release[1]) < 2:
+            return None
+        prefix = ".".join(str(part) for part in release[1][:-1])
+        return have >= want and _prefix_match(installed, f"{release[0]}!{prefix}" if release[0] else prefix)
+    same_release = have[:2] == want[:2]
+    local, wanted_local = installed.partition("+")[2], wanted.partition("+")[2]
+    if operator in ("==", "!=") and wanted_local:
+        equal = have == want and local.lower() == wanted_local.lower()
+        return equal if operator == "==" else not equal
+    if operator == "<":
+        # <1.0 excludes 1.0 pre-releases, unless the bound is a pre-release itself
+        return have < want and not (same_release and _is_prerelease(have) and not _is_prerelease(want))
+    if operator == ">":
+        # >1.0 excludes 1.0 post-releases, unless the bound is a post-release itself
+        # and local builds of 1.0
+        return have > want and not (same_release and ((have[3] != -1 and want[3] == -1) or local))
+    return {"==": have == want, "!=": have != want, "<=": have <= want, ">=": have >= want}[operator]
+
+
+class InstalledPackage:
+    """One installed package"""
+
+    def __init__(self, name: str, version: str, source: str):
+        self.name = name
+        self.version = version
+        self.source = source  # "conda" (conda-meta record) or "python" (dist-info / egg-info metadata)
+
+
+class InstalledIndex:
+    """
+    Installed packages of one environment prefix
+
+    Conda packages come from the file names of conda-meta/*.json
+    (name-version-build.json), Python distributions from the Name and
+    Version headers of site-packages/*.dist-info/METADATA (or egg-info
+    PKG-INFO). Python metadata wins where both exist, since conda and pip
+    name some packages differently (pytorch / torch). Loading reads a few
+    hundred small files and takes milliseconds.
+    """
+
+    def __init__(self, prefix: Path):
+        self.prefix = Path(prefix)
+        self.logger = logging.getLogger(__name__)
+        self.packages: Dict[str, InstalledPackage] = {}
+        self.refresh()
+
+    def site_packages(self) -> List[Path]:
+        """site-packages directories of the prefix (Lib\\site-packages on Windows)"""
+        candidates = [self.prefix / "Lib" / "site-packages"]
+        candidates += sorted((self.prefix / "lib").glob("python3*/site-packages"))
+        return [path for path in candidates if path.is_dir()]
+
+    def refresh(self):
+        """Re-read the prefix's metadata"""
+        packages: Dict[str, InstalledPackage] = {}
+
+        conda_meta = self.prefix / "conda-meta"
+        if conda_meta.is_dir():
+            for record in conda_meta.glob("*.json"):
+                parts = record.stem.rsplit("-", 2)
+                if len(parts) == 3:
+                    packages[normalize_name(parts[0])] = InstalledPackage(parts[0], parts[1], "conda")
+
+        for site_packages in self.site_packages():
+            for info in list(site_packages.glob("*.dist-info")) + list(site_packages.glob("*.egg-info")):
+                metadata = info / "METADATA" if info.suffix == ".dist-info" else info / "PKG-INFO"
+                if info.is_file():
+                    metadata = info  # Single-file egg-info
+                package = self._read_metadata(metadata)
+                if package:
+                    packages[normalize_name(package.name)] = package
+
+        self.packages = packages
+        self.logger.debug(f"Indexed {len(packages)} packages in {self.prefix}")
+
+    def _read_metadata(self, path: Path) -> Optional[InstalledPackage]:
+        """Read Name and Version from the headers of a METADATA / PKG-INFO file"""
+        name = version = None
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        break  # End of the headers; the description follows
+                    if line.startswith("Name:"):
+                        name = line[5:].strip()
+                    elif line.startswith("Version:"):
+                        version = line[8:].strip()
+                    if name and version:
+                        return InstalledPackage(name, version, "python")
+        except OSError:
+            pass
+        return None
+
+    def get(self, name: str) -> Optional[InstalledPackage]:
+        """Get an installed package by name"""
+        return self.packages.get(normalize_name(name))
+
+    def satisfies(self, spec: str) -> bool:
+        """
+        Check whether a requirement such as langchain>=0.1.0 is installed
+
+        Specs this index can't judge (extras, environment markers, URLs,
+        unparsable versions) count as not satisfied, so conda or pip decide.
+        """
+        match = _NAME.match(spec)
+        if not match or match.group(2) or ";" in spec or "@" in spec:
+            return False
+        package = self.get(match.group(1))
+        if package is None:
+            return False
+        constraint = match.group(3).replace(" ", "")
+        if not constraint:
+            return True
+        for clause in constraint.split(","):
+            if version_matches(package.version, clause) is not True:
+                return False
+        return True
+
+    def modified(self) -> float:
+        """Last time a package was added to or removed from the prefix (directory mtimes)"""
+        directories = [self.prefix / "conda-meta"] + self.site_packages()
+        return max((d.stat().st_mtime for d in directories if d.is_dir()), default=0.0)
+
+    def as_requirements(self) -> List[str]:
+        """Installed packages as name==version, sorted by name"""
+        return [f"{p.name}=={p.version}" for _, p in sorted(self.packages.items())]
@@ -37,6 +37,9 @@ class MasterInstaller:
         self.ailab_base_path = None
         self.ai_environment_path = None
         self.ai_lab_path = None
+        self.offline_bundle = None  # Bundle path for air-gapped installs
+        self.replay_lock = False  # Create the environment from the lockfile of an earlier install
+        self.prefetch = None  # PrefetchWorker running while the user answers prompts
 
     def print_banner(self):
         """Print installer banner"""
@@ -61,6 +64,38 @@ class MasterInstaller:
         """Print warning message"""
         print(f"{Fore.YELLOW}[WARNING] {message}{Style.RESET_ALL}")
 
+    def start_prefetch(self):
+        """Start downloading AI_Environment artifacts in the background"""
+        if self.offline_bundle or self.prefetch:
+            return
+        try:
+            from prefetch_worker import PrefetchWorker
+            prefetch = PrefetchWorker(self.installer_dir)
+            if prefetch.start():
+                self.prefetch = prefetch
+                self.print_info("Downloading installer files in the background...")
+        except Exception as e:
+            self.print_warning(f"Background download unavailable: {e}")
+
+    def stop_prefetch(self):
+        """Stop background downloads; the AI_Environment installer picks up what they fetched"""
+        if not self.prefetch:
+            return
+        prefetch, self.prefetch = self.prefetch, None
+        try:
+            states = prefetch.stop()
+            complete = [name for name, state in states.items() if state == "complete"]
+            partial = [name for name, state in states.items() if state == "partial"]
+            running = [name for name, state in states.items() if state == "running"]
+            if complete:
+                self.print_info(f"Prefetched: {', '.join(complete)}")
+            if partial:
+                self.print_info(f"Partially prefetched (will resume): {', '.join(partial)}")
+            if running:
+                self.print_warning(f"Background download did not stop: {', '.join(running)}")
+        except Exception as e:
+            self.print_warning(f"Error stopping background downloads: {e}")
+
     def find_git(self) -> Optional[str]:
         """Find Git in PATH or common locations"""
         import os
@@ -286,6 +321,9 @@ class MasterInstaller:
             last_step=start_step - 1
         )
 
+        # The installer adopts whatever the prefetch fetched, so it must not be writing anymore
+        self.stop_prefetch()
+
         # Call existing install_manager.py
         try:
             install_manager_script = self.installer_dir / "src" / "install_manager.py"
@@ -302,6 +340,12 @@ class MasterInstaller:
             if self.ailab_base_path:
                 cmd.extend(['--ailab', str(self.ailab_base_path)])
 
+            # Install from an offline bundle instead of the network
+            if self.offline_bundle:
+                cmd.extend(['--offline-bundle', str(self.offline_bundle)])
+            if self.replay_lock:
+                cmd.append('--replay-lock')
+
             self.print_info("Calling AI_Environment installer...")
             self.print_info(f"Command: {' '.join(cmd)}")
 
@@ -330,6 +374,9 @@ class MasterInstaller:
 
     def do_fresh_installation(self) -> bool:
         """Perform fresh installation of both components"""
+        # Downloads run while the user picks a drive and (on external drives) AI_Lab is cloned
+        self.start_prefetch()
+
         # Phase 1: Drive Selection
         print(f"\n{Fore.CYAN}[Phase 1/3] Drive Selection{Style.RESET_ALL}")
         print(f"{Fore.CYAN}{'='*70}{Style.RESET_ALL}\n")
@@ -609,10 +656,17 @@ def main():
                        help='Run fresh installation non-interactively (for testing)')
     parser.add_argument('--drive', type=str,
                        help='Target drive letter (e.g., D) for auto-install')
+    parser.add_argument('--offline-bundle', type=str, default=None,
+                       help='Install AI_Environment from an offline bundle (see src/offline_bundle.py)')
+    parser.add_argument('--replay-lock', action='store_true',
+                       help='Create the AI2025 environment from the lockfile of an earlier installation')
     args = parser.parse_args()
 
+    installer = None
     try:
         installer = MasterInstaller()
+        installer.offline_bundle = args.offline_bundle
+        installer.replay_lock = args.replay_lock
 
         # Non-interactive mode
         if args.auto_install:
@@ -679,6 +733,10 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        # Download worker threads would otherwise keep the process alive
+        if installer:
+            installer.stop_prefetch()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline Bundle - Collects every installer artifact into one indexed directory
+Builds bundles on a connected machine and serves them to air-gapped installs
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import zipfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from download_manager import DownloadManager
+from conda_manager import CondaManager
+
+
+# Components fetched by InstallManager.run_installation
+BUNDLE_COMPONENTS = ["miniconda", "vscode", "ollama"]
+
+# VS Code Marketplace package URL for an extension id (publisher.name)
+VSIX_URL = ("https://marketplace.visualstudio.com/_apis/public/gallery/publishers/"
+            "{publisher}/vsextensions/{name}/latest/vspackage")
+
+DEFAULT_EXTENSIONS = [
+    "ms-python.python",
+    "ms-toolsai.jupyter",
+    "ms-python.vscode-pylance",
+    "ms-python.black-formatter",
+    "ms-vscode.vscode-json"
+]
+
+
+def copy_verified(source: Path, destination: Path, expected_sha256: Optional[str] = None) -> str:
+    """
+    Copy a file while hashing it, so verification costs no extra read
+
+    Returns:
+        sha256 of the copied bytes
+
+    Raises:
+        ValueError if expected_sha256 is given and doesn't match
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = destination.with_name(destination.name + ".part")
+    hash_func = hashlib.sha256()
+
+    with open(source, 'rb') as src, open(temp_file, 'wb') as dst:
+        for chunk in iter(lambda: src.read(4 * 1024 * 1024), b""):
+            hash_func.update(chunk)
+            dst.write(chunk)
+
+    digest = hash_func.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        temp_file.unlink()
+        raise ValueError(f"Digest mismatch for {source.name}")
+
+    os.replace(temp_file, destination)
+    return digest
+
+
+def parse_model_name(model: str) -> Path:
+    """Get the path of an Ollama model manifest relative to the manifests directory"""
+    name, _, tag = model.partition(":")
+    if "/" not in name:
+        name = f"library/{name}"
+    return Path("registry.ollama.ai") / name / (tag or "latest")
+
+
+def model_blob_path(models_dir: Path, digest: str) -> Path:
+    """Get the blob file for a layer digest (sha256:<hex>)"""
+    blob = models_dir / "blobs" / digest.replace(":", "-")
+    if not blob.exists():
+        # Older Ollama releases keep the colon in blob names
+        legacy = models_dir / "blobs" / digest
+        if legacy.exists():
+            return legacy
+    return blob
+
+
+class OfflineBundle:
+    """Read side of a bundle built by BundleBuilder"""
+
+    MANIFEST_NAME = "bundle_manifest.json"
+    SUPPORTED_VERSION = 1
+
+    def __init__(self, bundle_dir: Path, manifest: Dict[str, Any]):
+        self.bundle_dir = bundle_dir
+        self.manifest = manifest
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["OfflineBundle"]:
+        """
+        Open a bundle directory or .zip archive
+
+        An archive is unpacked once into a directory next to it.
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            path = Path(path)
+            if path.is_file() and path.suffix.lower() == ".zip":
+                bundle_dir = path.with_suffix("")
+                if not (bundle_dir / cls.MANIFEST_NAME).exists():
+                    print(f"Unpacking offline bundle to {bundle_dir}...")
+                    with zipfile.ZipFile(path, 'r') as zip_ref:
+                        zip_ref.extractall(bundle_dir)
+                path = bundle_dir
+
+            manifest_file = path / cls.MANIFEST_NAME
+            if not manifest_file.exists():
+                logger.error(f"Not an offline bundle (missing {cls.MANIFEST_NAME}): {path}")
+                return None
+
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            if manifest.get("bundle_version") != cls.SUPPORTED_VERSION:
+                logger.error(f"Unsupported offline bundle version: {manifest.get('bundle_version')}")
+                return None
+
+            return cls(path, manifest)
+
+        except Exception as e:
+            logger.error(f"Could not open offline bundle {path}: {e}")
+            return None
+
+    def _file_digest(self, relative_path: str) -> Optional[str]:
+        entry = self.manifest.get("files", {}).get(relative_path)
+        return entry["sha256"] if entry else None
+
+    def has_artifact(self, component: str) -> bool:
+        return component in self.manifest.get("artifacts", {})
+
+    def fetch_artifact(self, component: str, destination: Path) -> bool:
+        """Copy a component's artifact out of the bundle, verifying its digest on the way"""
+        relative_path = self.manifest.get("artifacts", {}).get(component)
+        if not relative_path:
+            self.logger.error(f"Offline bundle has no artifact for {component}")
+            return False
+
+        try:
+            copy_verified(self.bundle_dir / relative_path, destination, self._file_digest(relative_path))
+            self.logger.info(f"Copied {component} from offline bundle: {destination.name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Could not copy {component} from offline bundle: {e}")
+            return False
+
+    @property
+    def wheel_dir(self) -> Optional[Path]:
+        """Directory of wheels for pip --find-links"""
+        wheel_dir = self.bundle_dir / "wheels"
+        return wheel_dir if wheel_dir.exists() else None
+
+    @property
+    def conda_pkgs_dir(self) -> Optional[Path]:
+        """Conda package cache for conda create --offline"""
+        pkgs_dir = self.bundle_dir / "conda_pkgs"
+        return pkgs_dir if pkgs_dir.exists() else None
+
+    @property
+    def models_dir(self) -> Optional[Path]:
+        """Ollama model store (manifests and blobs)"""
+        models_dir = self.bundle_dir / "models"
+        return models_dir if models_dir.exists() else None
+
+    def extension_files(self) -> Dict[str, Path]:
+        """Get VSIX files of bundled VS Code extensions by extension id"""
+        return {extension: self.bundle_dir / relative_path
+                for extension, relative_path in self.manifest.get("extensions", {}).items()}
+
+    def models(self) -> List[str]:
+        return list(self.manifest.get("models", []))
+
+    def verify(self) -> List[str]:
+        """
+        Check every file in the bundle against its recorded digest
+
+        Returns:
+            Relative paths of missing or corrupted files
+        """
+        bad_files = []
+        for relative_path, entry in self.manifest.get("files", {}).items():
+            file_path = self.bundle_dir / relative_path
+            if not file_path.exists() or file_path.stat().st_size != entry["size"]:
+                bad_files.append(relative_path)
+                continue
+
+            hash_func = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                    hash_func.update(chunk)
+            if hash_func.hexdigest() != entry["sha256"]:
+                bad_files.append(relative_path)
+
+        return bad_files
+
+
+class BundleBuilder:
+    """Collects installers, wheels, extensions and models into a bundle directory"""
+
+    def __init__(self, output_dir: Path, config: Dict[str, Any], logs_path: Path):
+        self.output_dir = output_dir
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.download_manager = DownloadManager(logs_path)
+        self.manifest: Dict[str, Any] = {
+            "bundle_version": OfflineBundle.SUPPORTED_VERSION,
+            "created": datetime.now().isoformat(),
+            "python_version": config.get("python_version", "3.10"),
+            "artifacts": {},
+            "extensions": {},
+            "models": [],
+            "python_packages": [],
+            "files": {}
+        }
+
+    def _record_file(self, file_path: Path, sha256: Optional[str] = None):
+        """Add a bundle file and its digest to the manifest"""
+        if sha256 is None:
+            sha256 = self.download_manager.get_recorded_checksum(file_path)
+        if sha256 is None:
+            hash_func = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                    hash_func.update(chunk)
+            sha256 = hash_func.hexdigest()
+
+        relative_path = file_path.relative_to(self.output_dir).as_posix()
+        self.manifest["files"][relative_path] = {"sha256": sha256, "size": file_path.stat().st_size}
+        return relative_path
+
+    def add_artifacts(self) -> bool:
+        """Download the Miniconda, VS Code and Ollama installers"""
+        success = True
+        for component in BUNDLE_COMPONENTS:
+            entry = self.download_manager.manifest.get(component) if self.download_manager.manifest else None
+            filename = entry["filename"] if entry else f"{component}.zip"
+            destination = self.output_dir / "artifacts" / filename
+
+            downloaded = self.download_manager.download_artifact(
+                component, destination, description=f"Bundling {component}"
+            )
+            if not downloaded:
+                self.logger.error(f"Could not download {component} for bundle")
+                success = False
+                continue
+
+            self.manifest["artifacts"][component] = self._record_file(downloaded)
+        return success
+
+    def add_wheels(self) -> bool:
+        """Download Windows wheels for every configured Python package"""
+        wheel_dir = self.output_dir / "wheels"
+        wheel_dir.mkdir(parents=True, exist_ok=True)
+
+        packages = [CondaManager._fix_package_name(p) for p in self.config.get("python_packages", [])]
+        python_version = self.manifest["python_version"]
+        base_cmd = [
+            sys.executable, "-m", "pip", "download",
+            "--dest", str(wheel_dir),
+            "--platform", "win_amd64",
+            "--python-version", python_version,
+            "--implementation", "cp",
+            "--only-binary=:all:"
+        ]
+
+        print(f"Downloading wheels for {len(packages)} packages (win_amd64, Python {python_version})...")
+        result = subprocess.run(base_cmd + packages, capture_output=True, text=True)
+
+        failed_packages = []
+        if result.returncode != 0:
+            # One unavailable package fails the whole resolve; collect the rest one by one
+            self.logger.warning(f"Combined wheel download failed, retrying per package: {result.stderr[-500:]}")
+            for package in packages:
+                result = subprocess.run(base_cmd + [package], capture_output=True, text=True)
+                if result.returncode != 0:
+                    failed_packages.append(package)
+                    self.logger.error(f"No Windows wheel for {package}: {result.stderr[-300:]}")
+
+        for wheel in sorted(wheel_dir.glob("*.whl")):
+            self._record_file(wheel)
+
+        self.manifest["python_packages"] = [p for p in packages if p not in failed_packages]
+        if failed_packages:
+            print(f"Warning: No wheels bundled for: {', '.join(failed_packages)}")
+        return not failed_packages
+
+    def add_conda_packages(self, conda_exe: Path) -> bool:
+        """Download conda packages for the base Python environment into conda_pkgs"""
+        pkgs_dir = self.output_dir / "conda_pkgs"
+        pkgs_dir.mkdir(parents=True, exist_ok=True)
+
+        env = os.environ.copy()
+        env["CONDA_PKGS_DIRS"] = str(pkgs_dir)
+        env["CONDA_SUBDIR"] = "win-64"
+
+        cmd = [
+            str(conda_exe), "create",
+            "--prefix", str(self.output_dir / ".conda_download_env"),
+            f"python={self.manifest['python_version']}",
+            "--channel", "conda-forge",
+            "--download-only",
+            "--yes"
+        ]
+
+        print("Downloading conda packages for the Python environment...")
+        result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            self.logger.error(f"Conda package download failed: {result.stderr}")
+            return False
+
+        for package in sorted(pkgs_dir.glob("*.conda")) + sorted(pkgs_dir.glob("*.tar.bz2")):
+            self._record_file(package)
+        return True
+
+    def add_extensions(self) -> bool:
+        """Download VSIX packages of the VS Code extensions"""
+        success = True
+        for extension in self.config.get("vscode_extensions", DEFAULT_EXTENSIONS):
+            publisher, _, name = extension.partition(".")
+            url = VSIX_URL.format(publisher=publisher, name=name)
+            destination = self.output_dir / "extensions" / f"{extension}.vsix"
+
+            print(f"Downloading extension: {extension}")
+            if not self.download_manager.download_file(url, destination):
+                self.logger.error(f"Could not download extension {extension}")
+                success = False
+                continue
+
+            self.manifest["extensions"][extension] = self._record_file(destination)
+        return success
+
+    def add_models(self, source_models_dir: Path) -> bool:
+        """Copy configured Ollama models from an existing model store"""
+        success = True
+        target_dir = self.output_dir / "models"
+
+        for model in self.config.get("ollama_models", []):
+            manifest_file = source_models_dir / "manifests" / parse_model_name(model)
+            if not manifest_file.exists():
+                self.logger.error(f"Model {model} not found in {source_models_dir}")
+                print(f"Warning: Model {model} not found - pull it with 'ollama pull {model}' first")
+                success = False
+                continue
+
+            print(f"Bundling model: {model}")
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                model_manifest = json.load(f)
+
+            # Blob names are their own sha256, so the copy is verified as it's made
+            layers = [model_manifest["config"]] + model_manifest.get("layers", [])
+            for layer in layers:
+                digest = layer["digest"]
+                blob = target_dir / "blobs" / digest.replace(":", "-")
+                if not blob.exists():
+                    copy_verified(model_blob_path(source_models_dir, digest), blob, digest.split(":", 1)[1])
+                self._record_file(blob, digest.split(":", 1)[1])
+
+            target_manifest = target_dir / "manifests" / parse_model_name(model)
+            copy_verified(manifest_file, target_manifest)
+            self._record_file(target_manifest)
+            self.manifest["models"].append(model)
+
+        return success
+
+    def write_manifest(self) -> Path:
+        manifest_file = self.output_dir / OfflineBundle.MANIFEST_NAME
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        return manifest_file
+
+    def create_archive(self) -> Path:
+        """Pack the bundle into a single .zip (stored, contents are already compressed)"""
+        archive = self.output_dir.with_suffix(".zip")
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_ref:
+            for file_path in sorted(self.output_dir.rglob("*")):
+                if file_path.is_file() and ".conda_download_env" not in file_path.parts:
+                    zip_ref.write(file_path, file_path.relative_to(self.output_dir).as_posix())
+        return archive
+
+    def build(self, models_dir: Optional[Path] = None, conda_exe: Optional[Path] = None,
+              archive: bool = False) -> bool:
+        """Build the complete bundle"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        results = {
+            "artifacts": self.add_artifacts(),
+            "wheels": self.add_wheels(),
+            "extensions": self.add_extensions()
+        }
+        if conda_exe:
+            results["conda packages"] = self.add_conda_packages(conda_exe)
+        if models_dir:
+            results["models"] = self.add_models(models_dir)
+
+        manifest_file = self.write_manifest()
+        total_bytes = sum(entry["size"] for entry in self.manifest["files"].values())
+        print(f"\nBundle manifest: {manifest_file}")
+        print(f"Files: {len(self.manifest['files'])}, total {total_bytes/(1024**3):.2f} GB")
+        for part, ok in results.items():
+            print(f"  {part}: {'OK' if ok else 'incomplete'}")
+
+        if archive:
+            print(f"Archive: {self.create_archive()}")
+
+        return all(results.values())
+
+
+def main():
+    """Command-line interface for offline bundles"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or check an offline installation bundle")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build-bundle", help="Collect all installer artifacts into a bundle")
+    build_parser.add_argument("output", type=str, help="Bundle directory to create")
+    build_parser.add_argument("--models-from", type=str, default=None,
+                              help="Ollama model store to copy configured models from (e.g. D:\\AI_Environment\\Models)")
+    build_parser.add_argument("--conda", type=str, default=None,
+                              help="conda executable used to download packages for the base environment")
+    build_parser.add_argument("--archive", action="store_true", help="Also pack the bundle into a .zip")
+
+    verify_parser = subparsers.add_parser("verify", help="Check bundle files against their digests")
+    verify_parser.add_argument("bundle", type=str, help="Bundle directory or .zip")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    installer_path = Path(__file__).parent.parent
+
+    if args.command == "build-bundle":
+        config_file = installer_path / "config" / "install_config.json"
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        logs_path = installer_path / "logs"
+        logs_path.mkdir(exist_ok=True)
+        builder = BundleBuilder(Path(args.output).resolve(), config, logs_path)
+        success = builder.build(
+            models_dir=Path(args.models_from) if args.models_from else None,
+            conda_exe=Path(args.conda) if args.conda else None,
+            archive=args.archive
+        )
+        sys.exit(0 if success else 1)
+
+    elif args.command == "verify":
+        bundle = OfflineBundle.open(Path(args.bundle))
+        if bundle is None:
+            sys.exit(1)
+        bad_files = bundle.verify()
+        for relative_path in bad_files:
+            print(f"  [X] {relative_path}")
+        print(f"{len(bundle.manifest['files']) - len(bad_files)}/{len(bundle.manifest['files'])} files OK")
+        sys.exit(0 if not bad_files else 1)
+
+
+if __name__ == "__main__":
+    main()
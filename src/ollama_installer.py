@@ -7,47 +7,69 @@ Ollama Installer - Handles Ollama installation and model management
 import os
 import sys
 import json
-import zipfile
 import logging
 import subprocess
 import time
-import requests
 from pathlib import Path
 from typing import Optional, List, Dict
 from download_manager import DownloadManager
+from http_client import get_session
+from bandwidth_scheduler import Priority, get_scheduler
+from retry_policy import CircuitOpenError, RetryPolicy, is_transient_output
+from space_reservation import InsufficientSpace, SpaceClaim, estimate_model_gb, get_space_manager
+from progress_reporter import get_reporter, parse_size_pair
+from streaming_extractor import StreamingZipExtractor
+from zip_extractor import extract_zip
 
 class OllamaInstaller:
     """Handles Ollama installation and model management"""
+
+    REGISTRY_HOST = "registry.ollama.ai"
     
-    def __init__(self, ai_env_path: Path, logs_path: Path):
+    def __init__(self, ai_env_path: Path, logs_path: Path, download_manager: Optional[DownloadManager] = None):
         self.ai_env_path = ai_env_path
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
-        self.download_manager = DownloadManager(logs_path)
+        self.download_manager = download_manager or DownloadManager(logs_path)
+        self.session = get_session()
         
         # Installation paths
         self.ollama_path = ai_env_path / "Ollama"
         self.models_path = ai_env_path / "Models"
         self.downloads_path = ai_env_path / "downloads"  # Use D: drive for downloads
+
+        # Ollama download URL for Windows (used when the artifact manifest has no entry)
+        self.ollama_download_url = "https://github.com/ollama/ollama/releases/latest/download/ollama-windows-amd64.zip"
+        self.archive_path = self.downloads_path / "ollama-windows-amd64.zip"
         
         # Ollama configuration
         self.ollama_host = "127.0.0.1"
         self.ollama_port = 11434
         self.ollama_url = f"http://{self.ollama_host}:{self.ollama_port}"
+
+        # Last error message printed by ollama pull (None if the pull didn't report one)
+        self.last_pull_error: Optional[str] = None
+
+        # Set when prefetch() already extracted Ollama while downloading
+        self.streamed = False
         
     def install(self) -> bool:
         """Install Ollama"""
         try:
             self.logger.info("Installing Ollama")
             
-            # Download Ollama
-            ollama_zip = self._download_ollama()
-            if not ollama_zip:
-                return False
-            
-            # Extract Ollama
-            if not self._extract_ollama(ollama_zip):
-                return False
+            # Extract while downloading when the archive isn't on disk yet
+            if self.streamed or self._stream_install():
+                self.models_path.mkdir(parents=True, exist_ok=True)
+            else:
+                # Download Ollama
+                ollama_zip = self._download_ollama()
+                if not ollama_zip:
+                    return False
+
+                # Extract Ollama
+                if not self._extract_ollama(ollama_zip):
+                    return False
             
             # Configure Ollama
             if not self._configure_ollama():
@@ -75,28 +97,34 @@ class OllamaInstaller:
 
             success_count = 0
             failed_models = []
-            max_retries = 2
+
+            # Only network errors are retried; an unknown model fails at once. The registry's
+            # circuit breaker skips the remaining models while the registry is down.
+            policy = RetryPolicy.from_config(self.logs_path.parent / "config" / "install_config.json", max_attempts=3)
 
             for model in models:
                 print(f"Downloading model: {model}")
-                downloaded = False
-
-                # Try downloading with retries
-                for attempt in range(max_retries + 1):
-                    if attempt > 0:
-                        print(f"  Retry attempt {attempt}/{max_retries} for {model}...")
-                        self.logger.info(f"Retrying download for {model} (attempt {attempt}/{max_retries})")
-                        time.sleep(5)  # Brief pause before retry
-
-                    if self.download_model(model):
-                        success_count += 1
-                        print(f"✅ Successfully downloaded: {model}")
-                        downloaded = True
-                        break
-
-                if not downloaded:
+
+                def announce_retry(attempt: int, delay: float, model: str = model):
+                    print(f"  Retry attempt {attempt}/{policy.max_attempts} for {model} in {delay:.0f} seconds...")
+                    self.logger.info(f"Retrying download for {model} (attempt {attempt}/{policy.max_attempts})")
+
+                try:
+                    downloaded = policy.call(lambda: self.download_model(model), f"ollama pull {model}",
+                                             host=self.REGISTRY_HOST,
+                                             retry_result=lambda ok: not ok and is_transient_output(self.last_pull_error),
+                                             on_retry=announce_retry)
+                except CircuitOpenError as e:
+                    self.logger.warning(f"Skipping {model}: {e}")
+                    self.last_pull_error = str(e)
+                    downloaded = False
+
+                if downloaded:
+                    success_count += 1
+                    print(f"✅ Successfully downloaded: {model}")
+                else:
                     failed_models.append(model)
-                    print(f"❌ Failed to download: {model} (after {max_retries + 1} attempts)")
+                    print(f"❌ Failed to download: {model}" + (f" ({self.last_pull_error})" if self.last_pull_error else ""))
 
             self.logger.info(f"Model installation completed: {success_count}/{len(models)} successful")
 
@@ -112,23 +140,64 @@ class OllamaInstaller:
             self.logger.error(f"Error installing models: {e}")
             return False
     
+    def import_models(self, source_models_dir: Path, models: List[str]) -> bool:
+        """Copy models from another Ollama model store (e.g. an offline bundle) without pulling"""
+        from offline_bundle import copy_verified, parse_model_name, model_blob_path
+
+        try:
+            success_count = 0
+            for model in models:
+                manifest_file = source_models_dir / "manifests" / parse_model_name(model)
+                if not manifest_file.exists():
+                    self.logger.warning(f"Model {model} is not in {source_models_dir}")
+                    print(f"❌ Not available offline: {model}")
+                    continue
+
+                print(f"Copying model: {model}")
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    model_manifest = json.load(f)
+
+                # Blobs are named by their sha256, which is checked during the copy
+                for layer in [model_manifest["config"]] + model_manifest.get("layers", []):
+                    digest = layer["digest"]
+                    target = self.models_path / "blobs" / digest.replace(":", "-")
+                    if not target.exists():
+                        copy_verified(model_blob_path(source_models_dir, digest), target, digest.split(":", 1)[1])
+
+                copy_verified(manifest_file, self.models_path / "manifests" / parse_model_name(model))
+                success_count += 1
+                print(f"✅ Installed from bundle: {model}")
+
+            self.logger.info(f"Model import completed: {success_count}/{len(models)} successful")
+            return success_count >= len(models) * 0.5
+
+        except Exception as e:
+            self.logger.error(f"Error importing models: {e}")
+            return False
+
+    def prefetch(self) -> bool:
+        """Background download ahead of step 7, extracting while downloading where possible"""
+        return self._stream_install() or self._download_ollama() is not None
+
+    def _stream_install(self) -> bool:
+        """Extract a fresh install while downloading; False if Ollama exists or streaming isn't possible"""
+        if (self.ollama_path / "ollama.exe").exists():
+            return False  # Reinstalls and repairs go through the downloaded archive
+        self.ollama_path.mkdir(parents=True, exist_ok=True)
+        if not StreamingZipExtractor(self.download_manager).install(
+                "ollama", self.ollama_path, self.archive_path,
+                description="Downloading and extracting Ollama", fallback_url=self.ollama_download_url):
+            return False
+        self.streamed = True
+        self.logger.info("Ollama was extracted while downloading")
+        return True
+
     def _download_ollama(self) -> Optional[Path]:
         """Download Ollama"""
         try:
-            # Ollama download URL for Windows
-            url = "https://github.com/ollama/ollama/releases/latest/download/ollama-windows-amd64.zip"
-            
-            filename = "ollama-windows-amd64.zip"
-            destination = self.downloads_path / filename
-            
-            success = self.download_manager.download_with_progress(
-                url, destination, "Downloading Ollama"
+            return self.download_manager.download_artifact(
+                "ollama", self.archive_path, description="Downloading Ollama", fallback_url=self.ollama_download_url
             )
-            
-            if success:
-                return destination
-            else:
-                return None
                 
         except Exception as e:
             self.logger.error(f"Failed to download Ollama: {e}")
@@ -143,8 +212,7 @@ class OllamaInstaller:
             self.ollama_path.mkdir(parents=True, exist_ok=True)
             
             # Extract zip file
-            with zipfile.ZipFile(ollama_zip, 'r') as zip_ref:
-                zip_ref.extractall(self.ollama_path)
+            extract_zip(ollama_zip, self.ollama_path, description="Extracting Ollama")
             
             # Create models directory
             self.models_path.mkdir(parents=True, exist_ok=True)
@@ -241,7 +309,7 @@ pause
             self.logger.info("Waiting for Ollama service to start...")
             for i in range(30):  # Wait up to 30 seconds
                 try:
-                    response = requests.get(f"{self.ollama_url}/api/tags", timeout=2)
+                    response = self.session.get(f"{self.ollama_url}/api/tags", timeout=2)
                     if response.status_code == 200:
                         self.logger.info("Ollama service started successfully")
                         return True
@@ -281,7 +349,7 @@ pause
             
             # Test API connection
             try:
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
+                response = self.session.get(f"{self.ollama_url}/api/tags", timeout=5)
                 if response.status_code == 200:
                     self.logger.info("Ollama API is accessible")
                 else:
@@ -300,6 +368,7 @@ pause
         """Download and install a model with proper encoding"""
         try:
             self.logger.info(f"Downloading model: {model_name}")
+            self.last_pull_error = None
             
             ollama_exe = self.ollama_path / "ollama.exe"
             if not ollama_exe.exists():
@@ -311,6 +380,25 @@ pause
             env["OLLAMA_HOST"] = f"{self.ollama_host}:{self.ollama_port}"
             env["OLLAMA_MODELS"] = str(self.models_path)
             
+            # Models are bulk work: skipped when the drive can't hold their estimated size,
+            # and stopped first when a more important download needs the space
+            with get_space_manager().claim(self.models_path, f"ollama pull {model_name}", Priority.BULK) as space:
+                if not space.reserve(int(estimate_model_gb(model_name) * 1024 ** 3)):
+                    self.last_pull_error = "not enough disk space"
+                    return False
+
+                # Models are bulk transfers: admitted once critical downloads are done
+                with get_scheduler().transfer(f"ollama pull {model_name}", Priority.BULK, external=True):
+                    return self._run_pull(model_name, ollama_exe, env, space)
+
+        except Exception as e:
+            self.logger.error(f"Error downloading model {model_name}: {e}")
+            return False
+
+    def _run_pull(self, model_name: str, ollama_exe: Path, env: Dict[str, str],
+                  space: Optional[SpaceClaim] = None) -> bool:
+        """Run ollama pull and follow its output; the pull is stopped if space runs out"""
+        try:
             # Download model with proper encoding handling
             cmd = [str(ollama_exe), "pull", model_name]
             process = subprocess.Popen(
@@ -329,32 +417,43 @@ pause
             # Monitor download with timeout
             timeout = 5400  # 90 minutes (for large models on slower connections)
             start_time = time.time()
-            
-            while process.poll() is None:
-                if time.time() - start_time > timeout:
-                    self.logger.error(f"Model download timed out: {model_name}")
+            reporter = get_reporter()
+            last_message = None
+            layer_done = 0
+
+            with reporter.track(f"Pulling {model_name}") as item:
+                while process.poll() is None:
+                    if time.time() - start_time > timeout:
+                        self.logger.error(f"Model download timed out: {model_name}")
+                        self.last_pull_error = "pull exceeded its time limit"
+                        self._stop_pull(process)
+                        return False
+
                     try:
-                        process.terminate()
-                        time.sleep(2)  # Wait for graceful termination
-                        if process.poll() is None:
-                            process.kill()  # Force kill if still running
-                        time.sleep(1)  # Allow cleanup
-                    except Exception as e:
-                        self.logger.error(f"Error terminating process: {e}")
-                    return False
-                
-                try:
-                    # Read output with timeout
-                    output = process.stdout.readline()
-                    if output:
-                        line = output.strip()
-                        if line and not line.startswith('['):  # Skip ANSI escape sequences
-                            print(f"  {line}")
-                except UnicodeDecodeError:
-                    # Skip problematic characters
-                    continue
-                
-                time.sleep(0.1)
+                        # readline blocks until ollama prints, so no extra sleep is needed
+                        output = process.stdout.readline()
+                        if output:
+                            line = output.strip()
+                            if line and not line.startswith('['):  # Skip ANSI escape sequences
+                                # Byte counts feed the progress display; other messages are printed once
+                                sizes = parse_size_pair(line)
+                                if sizes:
+                                    item.update(*sizes)
+                                    # Counts restart with every layer
+                                    if space:
+                                        space.consume(sizes[0] - layer_done if sizes[0] >= layer_done else sizes[0])
+                                    layer_done = sizes[0]
+                                elif line != last_message:
+                                    reporter.print_line(f"  {line}")
+                                    last_message = line
+                    except UnicodeDecodeError:
+                        # Skip problematic characters
+                        continue
+                    except InsufficientSpace as e:
+                        self.logger.error(f"Stopping pull of {model_name}: {e}")
+                        self.last_pull_error = str(e)
+                        self._stop_pull(process)
+                        return False
             
             return_code = process.poll()
             
@@ -362,17 +461,30 @@ pause
                 self.logger.info(f"Model {model_name} downloaded successfully")
                 return True
             else:
-                self.logger.error(f"Failed to download model {model_name}")
+                self.last_pull_error = last_message
+                self.logger.error(f"Failed to download model {model_name}: {last_message}")
                 return False
             
         except Exception as e:
+            self.last_pull_error = str(e)
             self.logger.error(f"Error downloading model {model_name}: {e}")
             return False
     
+    def _stop_pull(self, process: subprocess.Popen):
+        """Terminate an ollama pull; its downloaded layers are kept for the next pull"""
+        try:
+            process.terminate()
+            time.sleep(2)  # Wait for graceful termination
+            if process.poll() is None:
+                process.kill()  # Force kill if still running
+            time.sleep(1)  # Allow cleanup
+        except Exception as e:
+            self.logger.error(f"Error terminating process: {e}")
+
     def list_models(self) -> List[Dict]:
         """List installed models"""
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=10)
+            response = self.session.get(f"{self.ollama_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("models", [])
@@ -395,7 +507,7 @@ pause
                 "stream": False
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.ollama_url}/api/generate",
                 json=data,
                 timeout=30
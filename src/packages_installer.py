@@ -13,6 +13,9 @@ import time
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+from installed_index import InstalledIndex
+from wheelhouse import find_wheelhouse
+
 class PackagesInstaller:
     """Handles Python package installation in virtual environment"""
     
@@ -124,6 +127,11 @@ class PackagesInstaller:
             package_name = package.split('>=')[0].split('==')[0].split('<=')[0].split('>')[0].split('<')[0].split('!=')[0]
             
             cmd = [str(self.pip_exe), "install", package, "--no-warn-script-location"]
+
+            # Wheels already in a wheelhouse are used instead of downloading them again
+            wheelhouse = find_wheelhouse(self.ai_env_path)
+            if wheelhouse:
+                cmd += ["--find-links", str(wheelhouse)]
             
             # Add timeout and show progress
             process = subprocess.Popen(
@@ -372,9 +380,7 @@ class PackagesInstaller:
             "fastapi", "jupyter", "pandas", "numpy", "requests"
         ]
         
-        status = {}
-        for package in critical_packages:
-            status[package] = self._test_import(package)
-        
-        return status
+        # Read from the environment's metadata instead of starting Python once per package
+        index = InstalledIndex(self.venv_path)
+        return {package: index.get(package) is not None for package in critical_packages}
 
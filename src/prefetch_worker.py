@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prefetch Worker - Downloads installer artifacts while the user answers prompts
+Artifacts land in the machine-wide staging directory; the install manager adopts
+finished downloads from there and resumes partial ones
+"""
+
+import sys
+import json
+import time
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List
+
+from artifact_cache import ArtifactCache
+from bandwidth_scheduler import Priority
+from conda_manager import CondaManager
+from download_engine import DownloadCancelled, TransferHandle
+from download_manager import DownloadManager
+from progress_reporter import ProgressReporter
+
+# Manifest components fetched ahead of the install manager
+PREFETCH_COMPONENTS = ("miniconda", "vscode", "ollama")
+
+
+def staged_wheel_dir() -> Optional[Path]:
+    """Get the directory of prefetched wheels, if there is one"""
+    wheel_dir = ArtifactCache.default_staging_dir() / "wheels"
+    return wheel_dir if wheel_dir.is_dir() and any(wheel_dir.glob("*.whl")) else None
+
+
+class PrefetchWorker:
+    """
+    Background downloads for the interactive phases of the master installer
+
+    Runs in the master installer's process on the download engine, at bulk
+    priority so it never holds up the AI_Lab clone. stop() must be called
+    before the install manager starts: it cancels what is still running and
+    leaves partial downloads with their resume state for the install manager.
+    Console output would interfere with prompts, so progress and log
+    messages go to prefetch.log in the staging directory.
+    """
+
+    STOP_TIMEOUT = 45  # Seconds to wait for transfers to wind down (a stalled socket read takes up to 30)
+
+    def __init__(self, installer_dir: Path, staging_dir: Optional[Path] = None):
+        self.installer_dir = installer_dir
+        self.staging_dir = staging_dir or ArtifactCache.default_staging_dir()
+        self.logger = logging.getLogger(__name__)
+        self._handles: Dict[str, TransferHandle] = {}
+        self._pip: Optional[subprocess.Popen] = None
+        self._pip_thread: Optional[threading.Thread] = None
+        self._log_file = None
+        self._log_handler: Optional[logging.Handler] = None
+
+    def start(self) -> bool:
+        """Start prefetching; returns False if there is nothing to fetch"""
+        config_file = self.installer_dir / "config" / "install_config.json"
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Prefetch disabled, cannot read {config_file}: {e}")
+            return False
+
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self._log_file = open(self.staging_dir / "prefetch.log", 'a', encoding='utf-8')
+        self._log_handler = logging.StreamHandler(self._log_file)
+        self._log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logging.getLogger().addHandler(self._log_handler)
+
+        download_manager = DownloadManager(self.installer_dir / "logs")
+        download_manager.staging_dir = None  # Fetching into staging, not out of it
+        download_manager.progress = ProgressReporter(stream=self._log_file)
+
+        manifest = download_manager.manifest
+        for component in PREFETCH_COMPONENTS:
+            entry = manifest.get(component) if manifest else None
+            if not entry:
+                continue
+            self._handles[component] = download_manager.start_task(
+                f"prefetch {component}", download_manager.download_artifact, component,
+                self.staging_dir / entry["filename"], priority=Priority.BULK)
+
+        packages = [CondaManager._fix_package_name(p) for p in config.get("python_packages", [])]
+        if packages:
+            self._pip_thread = threading.Thread(target=self._download_wheels, name="prefetch-wheels", daemon=True,
+                                                args=(packages, config.get("python_version", "3.10")))
+            self._pip_thread.start()
+
+        self.logger.info(f"Prefetching {', '.join(self._handles) or 'nothing'} and "
+                         f"{len(packages)} wheel(s) into {self.staging_dir}")
+        return bool(self._handles or packages)
+
+    def _download_wheels(self, packages: List[str], python_version: str):
+        """pip download Windows wheels for the configured packages into staging/wheels"""
+        wheel_dir = self.staging_dir / "wheels"
+        wheel_dir.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            sys.executable, "-m", "pip", "download",
+            "--dest", str(wheel_dir),
+            "--platform", "win_amd64",
+            "--python-version", python_version,
+            "--implementation", "cp",
+            "--only-binary=:all:",
+            "--quiet"
+        ] + packages
+        try:
+            self._pip = subprocess.Popen(cmd, stdout=self._log_file, stderr=self._log_file)
+            returncode = self._pip.wait()
+            if returncode != 0:
+                # Wheels fetched before the failure stay usable
+                self.logger.warning(f"Wheel prefetch ended with code {returncode}")
+        except Exception as e:
+            self.logger.warning(f"Wheel prefetch failed: {e}")
+
+    def stop(self) -> Dict[str, str]:
+        """
+        Stop prefetching and report each artifact's state
+
+        Waits until the download code has really returned, since the install
+        manager moves the staged files afterwards.
+
+        Returns:
+            Component -> "complete", "partial", "failed" or "running" (did not
+            stop within STOP_TIMEOUT)
+        """
+        for handle in self._handles.values():
+            if not handle.done():
+                handle.cancel()
+        if self._pip and self._pip.poll() is None:
+            self._pip.terminate()
+
+        states = {}
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        for component, handle in self._handles.items():
+            if not handle.wait_stopped(max(0.0, deadline - time.monotonic())):
+                self.logger.warning(f"Prefetch of {component} still running after {self.STOP_TIMEOUT}s")
+                states[component] = "running"
+                continue
+            try:
+                states[component] = "complete" if handle.result(0) else "failed"
+            except DownloadCancelled:
+                states[component] = "partial"
+            except Exception as e:
+                self.logger.warning(f"Prefetch of {component} did not stop cleanly: {e}")
+                states[component] = "partial"
+        if self._pip_thread:
+            self._pip_thread.join(self.STOP_TIMEOUT)
+
+        self.logger.info(f"Prefetch stopped: {states}")
+        if self._log_handler:
+            logging.getLogger().removeHandler(self._log_handler)
+            self._log_handler = None
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+        self._handles.clear()
+        return states
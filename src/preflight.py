@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Preflight - Probes every download endpoint of the installation before it starts
+Reports reachability, latency and a throughput sample per endpoint and estimates the total download
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from download_manager import DownloadManager
+from space_reservation import estimate_model_gb
+
+
+# Installer artifacts downloaded by every installation
+ARTIFACT_COMPONENTS = ("miniconda", "vscode", "ollama")
+
+# Endpoints behind the package, model and AI_Lab downloads: (name, url, sample)
+# With sample the endpoint serves data worth a throughput sample; otherwise only latency is measured.
+SERVICE_ENDPOINTS = [
+    ("conda-forge", "https://conda.anaconda.org/conda-forge/noarch/current_repodata.json", True),
+    ("PyPI", "https://pypi.org/simple/pip/", True),
+    ("Ollama registry", "https://registry.ollama.ai/v2/", False),
+    ("AI_Lab git remote", "https://github.com/rmisegal/AILab.git/info/refs?service=git-upload-pack", False),
+]
+
+# Rough download sizes where nothing pins them
+PACKAGES_ESTIMATE_MB = 1500          # Wheels and conda packages of the AI2025 environment
+
+
+def describe_error(error: Optional[str]) -> str:
+    """Shorten a probe error for the report table"""
+    text = error or ""
+    for marker, description in (("resolve", "DNS lookup failed"), ("timed out", "timed out"),
+                                 ("SSL", "TLS handshake failed"), ("refused", "connection refused"),
+                                 ("HTTP ", text)):
+        if marker in text:
+            return description
+    return text[:50] or "unreachable"
+
+
+class Preflight:
+    """
+    Concurrent probe of all endpoints an installation downloads from
+
+    Probes go through the download manager's pooled session, so DNS lookups
+    and TLS handshakes are done and the connections kept alive for the
+    transfers that follow. Mirror probes of the installer artifacts also
+    decide the mirror order of those downloads.
+    """
+
+    PROBE_TIMEOUT = 10
+
+    def __init__(self, download_manager: DownloadManager, config: Dict[str, Any]):
+        self.download_manager = download_manager
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+    def _endpoints(self) -> List[Dict[str, Any]]:
+        """Endpoints to probe, with the megabytes expected from each"""
+        endpoints = []
+        manifest = self.download_manager.manifest
+        for component in ARTIFACT_COMPONENTS:
+            entry = manifest.get(component) if manifest else None
+            if not entry:
+                continue
+            for index, url in enumerate(entry["urls"]):
+                endpoints.append({"name": component if index == 0 else f"{component} mirror", "url": url,
+                                  "sample": True, "component": component,
+                                  # The download comes from the best mirror, so its size is counted once
+                                  "size_mb": entry.get("size_mb") or 0})
+
+        models_mb = sum(estimate_model_gb(model) for model in self.config.get("ollama_models", [])) * 1024
+        packages_mb = PACKAGES_ESTIMATE_MB if self.config.get("python_packages") else 0
+        sizes = {"conda-forge": packages_mb / 2, "PyPI": packages_mb / 2, "Ollama registry": models_mb}
+        for name, url, sample in SERVICE_ENDPOINTS:
+            endpoints.append({"name": name, "url": url, "sample": sample, "component": None,
+                              "size_mb": sizes.get(name, 0)})
+        return endpoints
+
+    def _probe(self, endpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Probe one endpoint; sampling endpoints get the mirror selector's latency and throughput probe"""
+        if endpoint["sample"]:
+            result = self.download_manager.mirror_selector.probe(endpoint["url"])
+        else:
+            # Any answer short of a server error means the service is up (registries answer 401)
+            result = {"url": endpoint["url"], "reachable": False, "latency_ms": None, "throughput_mbps": None}
+            try:
+                start = time.time()
+                with self.download_manager.session.get(endpoint["url"], timeout=self.PROBE_TIMEOUT) as response:
+                    result["latency_ms"] = round((time.time() - start) * 1000, 1)
+                    result["reachable"] = response.status_code < 500
+                    if not result["reachable"]:
+                        result["error"] = f"HTTP {response.status_code}"
+            except Exception as e:
+                result["error"] = str(e)
+        return dict(endpoint, **result)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Probe all endpoints concurrently
+
+        Returns:
+            Report with results (one per endpoint), total_mb, estimated_seconds
+            (None if nothing was measured) and reachable (any endpoint answered)
+        """
+        endpoints = self._endpoints()
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, len(endpoints))) as executor:
+            results = list(executor.map(self._probe, endpoints))
+        self.logger.info(f"Preflight probed {len(results)} endpoints in {time.time() - start:.1f}s")
+
+        # Artifact mirrors are ranked from these probes instead of being probed again
+        for component in ARTIFACT_COMPONENTS:
+            component_results = [r for r in results if r["component"] == component]
+            if len(component_results) > 1:
+                self.download_manager.use_mirror_probes(component, [r["url"] for r in component_results],
+                                                        component_results)
+
+        # Each download is timed at the best throughput measured for its source. Sources without a
+        # sample (the registry serves its blobs from a CDN) use the best rate measured anywhere.
+        cap_bytes = self.download_manager.scheduler.max_bytes_per_sec
+        cap_mbps = cap_bytes * 8 / 1e6 if cap_bytes else None
+        any_rate = max((r["throughput_mbps"] for r in results if r["reachable"] and r["throughput_mbps"]), default=None)
+        total_mb = 0.0
+        estimated_seconds = None
+        for source in dict.fromkeys(r["component"] or r["name"] for r in results):
+            group = [r for r in results if (r["component"] or r["name"]) == source]
+            size_mb = group[0]["size_mb"]
+            rate = max((r["throughput_mbps"] for r in group if r["reachable"] and r["throughput_mbps"]),
+                       default=any_rate)
+            total_mb += size_mb
+            if size_mb and rate:
+                rate = min(rate, cap_mbps) if cap_mbps else rate
+                estimated_seconds = (estimated_seconds or 0) + size_mb * 8 / rate
+
+        return {
+            "results": results,
+            "total_mb": round(total_mb),
+            "estimated_seconds": round(estimated_seconds) if estimated_seconds is not None else None,
+            "reachable": any(r["reachable"] for r in results),
+            "probe_seconds": round(time.time() - start, 2),
+        }
+
+    @staticmethod
+    def print_report(report: Dict[str, Any]):
+        """Print the probe results and the download estimate"""
+        print(f"{'Endpoint':<20}{'Host':<34}{'Status':<8}{'Latency':>10}{'Throughput':>16}")
+        for r in report["results"]:
+            host = r["url"].split('/')[2]
+            if r["reachable"]:
+                latency = f"{r['latency_ms']:.0f} ms" if r["latency_ms"] is not None else "-"
+                throughput = f"{r['throughput_mbps']:.1f} Mbit/s" if r.get("throughput_mbps") else "-"
+                print(f"{r['name']:<20}{host[:33]:<34}{'ok':<8}{latency:>10}{throughput:>16}")
+            else:
+                print(f"{r['name']:<20}{host[:33]:<34}{'FAILED':<8}  {describe_error(r.get('error'))}")
+
+        total_gb = report["total_mb"] / 1024
+        if report["estimated_seconds"] is not None:
+            minutes = report["estimated_seconds"] / 60
+            duration = f"about {minutes:.0f} min" if minutes >= 1 else "under a minute"
+            print(f"Estimated download: {total_gb:.1f} GB, {duration} (rough: speeds come from short samples)")
+        else:
+            print(f"Estimated download: {total_gb:.1f} GB (no speed could be measured)")
+
+
+def run_preflight(download_manager: DownloadManager, config: Dict[str, Any],
+                  report_file: Optional[Path] = None) -> Dict[str, Any]:
+    """Run the preflight, print its report and save it as JSON if report_file is given"""
+    report = Preflight(download_manager, config).run()
+    Preflight.print_report(report)
+    if report_file:
+        try:
+            report_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not save preflight report: {e}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe the installer's download endpoints")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    installer_dir = Path(__file__).parent.parent
+    with open(installer_dir / "config" / "install_config.json", 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    report = Preflight(DownloadManager(installer_dir / "logs"), config).run()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        Preflight.print_report(report)
+    return 0 if report["reachable"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
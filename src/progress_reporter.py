@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Progress Reporter - One console progress display for all active transfers
+Transfers only update byte counters; a renderer thread draws on a fixed tick
+"""
+
+import re
+import sys
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Optional, List
+
+
+def format_bytes(amount: float) -> str:
+    """Format a byte count as MB or GB"""
+    if amount >= 1024 ** 3:
+        return f"{amount / 1024 ** 3:.2f} GB"
+    return f"{amount / 1024 ** 2:.1f} MB"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Format seconds as m:ss or h:mm:ss"""
+    if seconds is None or seconds < 0 or seconds > 99 * 3600:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+# "1.2 GB/3.8 GB" as printed by ollama pull
+_SIZE_PAIR = re.compile(r"([\d.]+)\s*([KMG]?B)\s*/\s*([\d.]+)\s*([KMG]?B)")
+_UNITS = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3}
+
+
+def parse_size_pair(line: str) -> Optional[tuple]:
+    """Get (done, total) bytes from a progress line such as ollama pull output"""
+    match = _SIZE_PAIR.search(line)
+    if not match:
+        return None
+    done = float(match.group(1)) * _UNITS[match.group(2)]
+    total = float(match.group(3)) * _UNITS[match.group(4)]
+    return int(done), int(total)
+
+
+class ProgressItem:
+    """Counters of one transfer; cheap enough to update per chunk"""
+
+    def __init__(self, name: str, total: int = 0):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+
+        # Maintained by the renderer
+        self._last_done = 0
+        self._rate = 0.0
+
+    def add(self, amount: int):
+        self.done += amount
+
+    def update(self, done: int, total: Optional[int] = None):
+        self.done = done
+        if total:
+            self.total = total
+
+
+class ProgressReporter:
+    """Renders every active ProgressItem on a fixed tick"""
+
+    TICK = 0.25            # Seconds between redraws on a console
+    LOG_INTERVAL = 5.0     # Seconds between lines when output is redirected
+    RATE_SMOOTHING = 0.3   # Weight of the newest sample in throughput averages
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self._items: List[ProgressItem] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._line_width = 0
+        self._last_tick = time.monotonic()
+        self._last_log = 0.0
+        self._rate = 0.0
+
+    @contextmanager
+    def track(self, name: str, total: int = 0):
+        """Register a transfer for the duration of the with block"""
+        item = ProgressItem(name, total)
+        with self._lock:
+            self._items.append(item)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="progress-renderer", daemon=True)
+                self._thread.start()
+        try:
+            yield item
+        finally:
+            with self._lock:
+                self._items.remove(item)
+                self._clear_line()
+                if item.done:
+                    elapsed = max(time.monotonic() - item.started, 1e-3)
+                    self.stream.write(f"{item.name}: {format_bytes(item.done)} in {format_eta(elapsed)} "
+                                      f"({format_bytes(item.done / elapsed)}/s)\n")
+                    self.stream.flush()
+            self._wake.set()
+
+    def print_line(self, message: str):
+        """Print a message without tearing the progress line"""
+        with self._lock:
+            self._clear_line()
+            self.stream.write(message + "\n")
+            self.stream.flush()
+
+    def _clear_line(self):
+        # Lock held
+        if self._line_width:
+            self.stream.write("\r" + " " * self._line_width + "\r")
+            self._line_width = 0
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.TICK)
+            self._wake.clear()
+            with self._lock:
+                if not self._items:
+                    self._thread = None
+                    return
+                self._render()
+
+    def _render(self):
+        # Lock held
+        now = time.monotonic()
+        interval = max(now - self._last_tick, 1e-3)
+        self._last_tick = now
+
+        aggregate = 0.0
+        for item in self._items:
+            sample = max(item.done - item._last_done, 0) / interval
+            item._rate = sample if item._rate == 0 else (
+                self.RATE_SMOOTHING * sample + (1 - self.RATE_SMOOTHING) * item._rate)
+            item._last_done = item.done
+            aggregate += sample
+        self._rate = self.RATE_SMOOTHING * aggregate + (1 - self.RATE_SMOOTHING) * self._rate
+
+        if not self.interactive:
+            if now - self._last_log < self.LOG_INTERVAL:
+                return
+            self._last_log = now
+
+        line = self._format_line()
+        width = shutil.get_terminal_size((100, 20)).columns - 1
+        line = line[:width]
+
+        if self.interactive:
+            padding = " " * max(self._line_width - len(line), 0)
+            self.stream.write("\r" + line + padding)
+            self._line_width = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def _format_line(self) -> str:
+        remaining = sum(max(item.total - item.done, 0) for item in self._items if item.total)
+
+        if len(self._items) == 1:
+            item = self._items[0]
+            if item.total:
+                percent = item.done / item.total
+                bar = '█' * int(30 * percent) + '-' * (30 - int(30 * percent))
+                eta = remaining / item._rate if item._rate > 0 else None
+                return (f"{item.name}: |{bar}| {percent * 100:.1f}% "
+                        f"({format_bytes(item.done)}/{format_bytes(item.total)}) "
+                        f"{format_bytes(self._rate)}/s ETA {format_eta(eta)}")
+            return f"{item.name}: {format_bytes(item.done)} {format_bytes(self._rate)}/s"
+
+        parts = [f"{len(self._items)} active | {format_bytes(self._rate)}/s | {format_bytes(remaining)} left"]
+        for item in self._items:
+            if item.total:
+                eta = (item.total - item.done) / item._rate if item._rate > 0 else None
+                parts.append(f"{item.name} {item.done * 100 // item.total}% ETA {format_eta(eta)}")
+            else:
+                parts.append(f"{item.name} {format_bytes(item.done)}")
+        return " | ".join(parts)
+
+
+_reporter: Optional[ProgressReporter] = None
+_reporter_lock = threading.Lock()
+
+
+def get_reporter() -> ProgressReporter:
+    """Get the process-wide progress reporter"""
+    global _reporter
+    with _reporter_lock:
+        if _reporter is None:
+            _reporter = ProgressReporter()
+        return _reporter
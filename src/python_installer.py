@@ -6,21 +6,21 @@ Python Installer - Handles Python 3.10 portable installation
 
 import os
 import sys
-import zipfile
 import logging
 import subprocess
 from pathlib import Path
 from typing import Optional
 from download_manager import DownloadManager
+from zip_extractor import extract_zip
 
 class PythonInstaller:
     """Handles Python 3.10 portable installation"""
     
-    def __init__(self, ai_env_path: Path, logs_path: Path):
+    def __init__(self, ai_env_path: Path, logs_path: Path, download_manager: Optional[DownloadManager] = None):
         self.ai_env_path = ai_env_path
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
-        self.download_manager = DownloadManager(logs_path)
+        self.download_manager = download_manager or DownloadManager(logs_path)
         
         # Installation paths
         self.python_path = ai_env_path / "Python"
@@ -97,8 +97,7 @@ class PythonInstaller:
             self.python_path.mkdir(parents=True, exist_ok=True)
             
             # Extract zip file
-            with zipfile.ZipFile(python_zip, 'r') as zip_ref:
-                zip_ref.extractall(self.python_path)
+            extract_zip(python_zip, self.python_path, description="Extracting Python")
             
             self.logger.info(f"Python extracted to: {self.python_path}")
             return True
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retry Policy - Backoff, error classification and per-host circuit breakers
+Shared by every component that talks to the network, so they all back off the same way
+"""
+
+import json
+import time
+import random
+import socket
+import logging
+import threading
+import subprocess
+import http.client
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Optional, Callable, Any, Dict
+
+import requests
+
+
+# Status codes worth another attempt; other 4xx responses will not change on retry
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# Output of git, conda, pip and ollama that points at the network rather than the request
+TRANSIENT_OUTPUT = (
+    "timed out", "readtimeout", "connecttimeout", "i/o timeout", "no such host", "unexpected eof",
+    "connection reset", "connection refused", "connection aborted", "could not resolve host",
+    "name resolution", "temporary failure", "network is unreachable", "unable to access", "early eof",
+    "rpc failed", "remote end hung up", "ssl error", "sslerror", "handshake", "max retries exceeded",
+    "connectionerror", "condahttperror", "server error", "returned error: 5", "bad gateway",
+    "service unavailable", "gateway timeout", "too many requests",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of contacting a host whose circuit breaker is open"""
+
+    def __init__(self, host: str):
+        super().__init__(f"{host} is failing, not retrying it for now")
+        self.host = host
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Decide whether an exception is transient, i.e. another attempt may succeed"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                          http.client.IncompleteRead, socket.timeout, ConnectionError, subprocess.TimeoutExpired)):
+        return True
+    if isinstance(error, (ValueError, TypeError, KeyError, PermissionError, FileNotFoundError)):
+        return False
+    # Anything else (e.g. a short read detected by the caller) is treated as transient
+    return True
+
+
+def is_transient_output(output: Optional[str]) -> bool:
+    """Decide whether a failed command's output describes a network problem"""
+    text = (output or "").lower()
+    return any(marker in text for marker in TRANSIENT_OUTPUT)
+
+
+def is_failed_result(result: Any) -> bool:
+    """Decide whether a result reports failure (False, or a process with a nonzero exit code)"""
+    return result is False or getattr(result, "returncode", 0) != 0
+
+
+def host_of(url: str) -> str:
+    """Get the breaker key of a URL (its host name, with the port if the URL has one)"""
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        return url
+    return f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after repeated failures
+
+    After failure_threshold consecutive failures the circuit opens and
+    allow() returns False for reset_seconds. Then one probe is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 3, reset_seconds: float = 60.0):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        """Check whether the host may be contacted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                self.logger.info(f"Circuit closed for {self.host}")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self.logger.warning(f"Circuit opened for {self.host} after {self._failures} failure(s)")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """End a request that says nothing about the host's health, leaving the state as it is"""
+        with self._lock:
+            self._probing = False
+
+
+def _load_settings(config_file: Optional[Path] = None) -> Dict[str, Any]:
+    """Read the retry section of install_config.json (defaults to the installer's config directory)"""
+    if config_file is None:
+        config_file = Path(__file__).parent.parent / "config" / "install_config.json"
+    try:
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("retry", {})
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not read retry settings: {e}")
+    return {}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_breaker_settings: Optional[Dict[str, Any]] = None
+
+
+def get_breaker(url_or_host: str, config_file: Optional[Path] = None) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of a host (URLs are reduced to their host)"""
+    global _breaker_settings
+    host = host_of(url_or_host) if "://" in url_or_host else url_or_host
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            if _breaker_settings is None:
+                _breaker_settings = _load_settings(config_file)
+            breaker = _breakers[host] = CircuitBreaker(host, _breaker_settings.get("breaker_failures", 3),
+                                                       _breaker_settings.get("breaker_reset_seconds", 60))
+        return breaker
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter and an overall deadline
+
+    The wait before retry n (counting from 0) is drawn uniformly from
+    [0, min(max_delay, base_delay * 2**n)], so clients that failed together
+    don't retry together. No retry starts once deadline seconds have passed
+    since the first attempt.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 deadline: Optional[float] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, config_file: Optional[Path] = None, **overrides) -> "RetryPolicy":
+        """Create a policy from the retry section of install_config.json; keyword arguments take precedence"""
+        settings = _load_settings(config_file)
+        values = {
+            "max_attempts": settings.get("max_attempts", 4),
+            "base_delay": settings.get("base_delay_seconds", 1.0),
+            "max_delay": settings.get("max_delay_seconds", 30.0),
+            "deadline": settings.get("deadline_minutes", 0) * 60 or None,
+        }
+        values.update(overrides)
+        return cls(**values)
+
+    def delay(self, retry: int) -> float:
+        """Get the wait before retry number retry (0 for the first retry)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def wait(self, retry: int, started: float, cancel: Optional[threading.Event] = None,
+             on_retry: Optional[Callable[[int, float], None]] = None) -> bool:
+        """
+        Wait before a retry
+
+        Args:
+            retry: Number of the retry (0 for the first)
+            started: time.monotonic() of the first attempt
+            cancel: Event that ends the wait early
+            on_retry: Called with (attempt about to start, wait) before waiting
+
+        Returns:
+            False if the deadline leaves no time for another attempt (nothing is waited then)
+        """
+        delay = self.delay(retry)
+        if self.deadline is not None and time.monotonic() - started + delay >= self.deadline:
+            self.logger.warning("Retry deadline reached")
+            return False
+        if on_retry:
+            on_retry(retry + 2, delay)
+        if cancel is not None:
+            cancel.wait(delay)
+        else:
+            time.sleep(delay)
+        return True
+
+    def call(self, function: Callable[[], Any], name: str, host: Optional[str] = None,
+             retry_result: Optional[Callable[[Any], bool]] = None,
+             retry_error: Callable[[BaseException], bool] = is_retryable,
+             failed_result: Callable[[Any], bool] = is_failed_result,
+             on_retry: Optional[Callable[[int, float], None]] = None) -> Any:
+        """
+        Call function until it succeeds, fails permanently or retries run out
+
+        Args:
+            function: The operation
+            name: Label for log messages
+            host: Host (or URL) whose circuit breaker guards the operation
+            retry_result: Returns True for a result that is a transient failure
+            retry_error: Returns True for an exception that is a transient failure
+            failed_result: Returns True for a result that is a failure of any kind;
+                permanent failures leave the circuit breaker as it is
+            on_retry: Called with (attempt about to start, wait) before each retry
+
+        Returns:
+            The function's result; after the last attempt a transient failure
+            result is returned as it is
+
+        Raises:
+            CircuitOpenError if the host's circuit was already open, or the
+            function's last exception
+        """
+        breaker = get_breaker(host) if host else None
+        if breaker and not breaker.allow():
+            raise CircuitOpenError(breaker.host)
+
+        started = time.monotonic()
+        for attempt in range(self.max_attempts):
+            try:
+                result = function()
+            except Exception as e:
+                if not retry_error(e):
+                    if breaker:
+                        breaker.release_probe()
+                    raise
+                if breaker:
+                    breaker.record_failure()
+                self.logger.warning(f"{name} failed (attempt {attempt + 1}/{self.max_attempts}): {e}")
+                if not self._may_retry(attempt, breaker) or not self.wait(attempt, started, on_retry=on_retry):
+                    raise
+                continue
+
+            if retry_result is None or not retry_result(result):
+                if breaker and failed_result(result):
+                    breaker.release_probe()
+                elif breaker:
+                    breaker.record_success()
+                return result
+
+            if breaker:
+                breaker.record_failure()
+            self.logger.warning(f"{name} failed (attempt {attempt + 1}/{self.max_attempts})")
+            if not self._may_retry(attempt, breaker) or not self.wait(attempt, started, on_retry=on_retry):
+                return result
+
+    def _may_retry(self, attempt: int, breaker: Optional[CircuitBreaker]) -> bool:
+        """Check whether attempts are left and the host's circuit is still closed"""
+        return attempt < self.max_attempts - 1 and (breaker is None or breaker.state != "open")
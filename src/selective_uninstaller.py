@@ -150,7 +150,8 @@ class SelectiveUninstaller:
                 shutil.rmtree(models_dir, ignore_errors=True)
                 self.logger.info("Removed AI models")
             
-            # Remove downloads directory (contains Ollama installer)
+            # Remove downloads directory (contains Ollama installer). A copy stays in the
+            # machine-wide artifact cache, so reinstalling doesn't download it again.
             downloads_dir = self.ai_env_path / "downloads"
             if downloads_dir.exists():
                 shutil.rmtree(downloads_dir, ignore_errors=True)
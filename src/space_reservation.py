@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Space Reservation - Disk-space admission control for downloads, extractions and model pulls
+Work books its expected size before it starts and keeps checking free space while it writes
+"""
+
+import os
+import re
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from bandwidth_scheduler import Priority
+
+
+# Approximate installed size of each component in MB, on top of its download
+INSTALLED_FOOTPRINT_MB = {
+    "miniconda": 900,
+    "vscode": 600,
+    "ollama": 5000,
+    "environment": 9000,  # The AI2025 environment with PyTorch & co, plus conda's package cache
+}
+
+# Download sizes where the artifact manifest has none
+DOWNLOAD_FOOTPRINT_MB = {
+    "miniconda": 90,
+    "vscode": 150,
+    "ollama": 1800,
+}
+
+MODEL_GB_PER_BILLION_PARAMS = 0.6    # Ollama models are 4-bit quantized by default
+MODEL_DEFAULT_GB = 4.0               # Models without a parameter count in their tag
+
+
+def estimate_model_gb(model: str) -> float:
+    """Estimate an Ollama model's download size from its tag (e.g. llama2:7b)"""
+    match = re.search(r'(\d+(?:\.\d+)?)b\b', model.split(':', 1)[-1].lower())
+    return float(match.group(1)) * MODEL_GB_PER_BILLION_PARAMS if match else MODEL_DEFAULT_GB
+
+
+def component_footprint_mb(component: str, manifest=None) -> float:
+    """Get the disk space a component needs while it installs: its download plus its installed files"""
+    entry = manifest.get(component) if manifest else None
+    download_mb = (entry or {}).get("size_mb") or DOWNLOAD_FOOTPRINT_MB.get(component, 0)
+    return download_mb + INSTALLED_FOOTPRINT_MB.get(component, 0)
+
+
+class InsufficientSpace(Exception):
+    """Raised when work has to stop because its drive is (nearly) full"""
+
+
+def _existing(path: Path) -> Path:
+    """Get path or its nearest existing parent"""
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
+
+
+class SpaceClaim:
+    """
+    Disk space booked by one piece of work
+
+    reserve() books the bytes the work is about to write; consume() counts
+    them as they are written and re-checks the drive every CHECK_INTERVAL
+    bytes. Use as a context manager so the booking is released.
+    """
+
+    CHECK_INTERVAL = 64 * 1024 * 1024
+
+    def __init__(self, manager: "SpaceManager", name: str, path: Path, priority: Priority):
+        self.manager = manager
+        self.name = name
+        self.path = Path(path)
+        self.priority = priority
+        self.size = 0
+        self.written = 0
+        self.preempted = False
+        self.stopped: Optional[str] = None  # Why the work had to stop; later checks fail at once
+        self._unchecked = 0
+        self._device: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Bytes booked but not written yet"""
+        return max(self.size - self.written, 0)
+
+    def reserve(self, size: int) -> bool:
+        """Book size more bytes; False if the drive can't hold them"""
+        return self.manager._reserve(self, max(int(size), 0))
+
+    def consume(self, amount: int):
+        """Count written bytes; raises InsufficientSpace when the drive runs out"""
+        with self._lock:
+            self.written += amount
+            self._unchecked += amount
+            due = self._unchecked >= self.CHECK_INTERVAL or self.preempted or self.stopped
+            if due:
+                self._unchecked = 0
+        if due:
+            self.check()
+
+    def check(self):
+        """Raise InsufficientSpace if this work has to stop for lack of space"""
+        self.manager._check(self)
+
+    def release(self):
+        self.manager._release(self)
+
+    def __enter__(self) -> "SpaceClaim":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SpaceManager:
+    """
+    Process-wide bookkeeping of disk space per drive
+
+    A booking is admitted while free space minus the unwritten part of all
+    other bookings on the drive stays above min_free. When critical or
+    normal work doesn't fit, bulk work (model pulls) on the same drive is
+    preempted: its claim stops at the next check and its unwritten booking
+    is handed over. While writing, normal and critical work that finds the
+    drive full waits up to wait_seconds for space before giving up; bulk
+    work stops at once.
+    """
+
+    MIN_FREE_MB = 1024
+    WAIT_SECONDS = 120
+    POLL_SECONDS = 5
+
+    def __init__(self, min_free_mb: float = MIN_FREE_MB, wait_seconds: float = WAIT_SECONDS):
+        self.min_free = int(min_free_mb * 1024 * 1024)
+        self.wait_seconds = wait_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._claims: List[SpaceClaim] = []
+
+    def claim(self, path: Path, name: str, priority: Priority = Priority.NORMAL) -> SpaceClaim:
+        """Create an empty claim for work writing to path's drive"""
+        return SpaceClaim(self, name, path, priority)
+
+    @staticmethod
+    def free_bytes(path: Path) -> int:
+        """Get the free space of path's drive"""
+        return shutil.disk_usage(str(_existing(path))).free
+
+    def _device(self, claim: SpaceClaim) -> int:
+        if claim._device is None:
+            claim._device = os.stat(_existing(claim.path)).st_dev
+        return claim._device
+
+    def _booked(self, claim: SpaceClaim) -> int:
+        """Unwritten bytes of the other live claims on claim's drive"""
+        device = self._device(claim)
+        return sum(other.remaining for other in self._claims
+                   if other is not claim and not other.preempted and self._device(other) == device)
+
+    def available(self, path: Path) -> int:
+        """Get the bytes a new booking on path's drive could get"""
+        probe = SpaceClaim(self, "", path, Priority.NORMAL)
+        with self._lock:
+            return self.free_bytes(path) - self._booked(probe) - self.min_free
+
+    def _reserve(self, claim: SpaceClaim, size: int) -> bool:
+        with self._lock:
+            available = self.free_bytes(claim.path) - self._booked(claim) - self.min_free - claim.remaining
+            if size > available and claim.priority != Priority.BULK:
+                available += self._preempt(claim, size - available)
+            if size > available:
+                self.logger.warning(f"Not enough disk space for {claim.name}: needs {size / 1024**2:.0f} MB, "
+                                    f"{max(available, 0) / 1024**2:.0f} MB available")
+                return False
+            claim.size += size
+            if claim not in self._claims:
+                self._claims.append(claim)
+            return True
+
+    def _preempt(self, claim: SpaceClaim, needed: int) -> int:
+        """Stop bulk claims on claim's drive until needed bytes are freed; returns the bytes freed"""
+        freed = 0
+        device = self._device(claim)
+        for other in self._claims:
+            if freed >= needed:
+                break
+            if other.priority == Priority.BULK and not other.preempted and self._device(other) == device:
+                self.logger.warning(f"Stopping {other.name} to make room for {claim.name}")
+                other.preempted = True
+                freed += other.remaining
+        return freed
+
+    def _check(self, claim: SpaceClaim):
+        if claim.preempted and not claim.stopped:
+            claim.stopped = f"{claim.name} was stopped to make room for more important downloads"
+        if claim.stopped:
+            raise InsufficientSpace(claim.stopped)
+
+        waited_since = None
+        while True:
+            with self._lock:
+                # This claim's own unwritten bytes still have to fit, but they are already booked
+                shortfall = self.min_free + self._booked(claim) - self.free_bytes(claim.path)
+                if shortfall <= 0 or (claim.priority != Priority.BULK and self._preempt(claim, shortfall) >= shortfall):
+                    return
+            if claim.priority == Priority.BULK:
+                claim.stopped = f"Disk is full, stopping {claim.name}"
+                raise InsufficientSpace(claim.stopped)
+
+            # Pause until space is freed (e.g. by the user) instead of filling the disk
+            if waited_since is None:
+                waited_since = time.monotonic()
+                self.logger.warning(f"Disk almost full, {claim.name} is waiting for "
+                                    f"{shortfall / 1024**2:.0f} MB to be freed")
+                print(f"Disk almost full: free {shortfall / 1024**2:.0f} MB on {_existing(claim.path).anchor} "
+                      f"within {self.wait_seconds:.0f} seconds to continue {claim.name}")
+            elif time.monotonic() - waited_since > self.wait_seconds:
+                claim.stopped = f"Disk is full, stopping {claim.name}"
+                raise InsufficientSpace(claim.stopped)
+            time.sleep(self.POLL_SECONDS)
+
+    def _release(self, claim: SpaceClaim):
+        with self._lock:
+            if claim in self._claims:
+                self._claims.remove(claim)
+
+    def plan(self, path: Path, items: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Compare the free space of path's drive with a set of footprints
+
+        Args:
+            items: Name -> footprint in MB
+
+        Returns:
+            Dict with free_mb, required_mb (including min_free) and fits
+        """
+        free_mb = max(self.available(path) + self.min_free, 0) / (1024 * 1024)
+        required_mb = sum(items.values()) + self.min_free / (1024 * 1024)
+        return {"free_mb": round(free_mb), "required_mb": round(required_mb), "fits": free_mb >= required_mb}
+
+
+_manager: Optional[SpaceManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_space_manager() -> SpaceManager:
+    """Get the process-wide space manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SpaceManager()
+        return _manager
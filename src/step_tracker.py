@@ -229,6 +229,14 @@ class StepTracker:
             self.logger.error(f"Error completing component {component} in step {step_number}: {e}")
             return False
     
+    def record_download(self, name: str, details: Dict):
+        """Record how a downloaded artifact was obtained (hit, revalidated or refetched)"""
+        try:
+            self.status.setdefault("downloads", {})[name] = details
+            self._save_status()
+        except Exception as e:
+            self.logger.error(f"Error recording download {name}: {e}")
+
     def get_resume_step(self) -> int:
         """Get the step number to resume from"""
         try:
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Extractor - Extracts a zip archive while it is being downloaded
+The central directory is fetched first with a range request; members are then
+inflated straight into place as their bytes arrive on a single sequential stream
+"""
+
+import os
+import zlib
+import struct
+import hashlib
+import logging
+import time
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Any
+
+from bandwidth_scheduler import Priority
+from download_engine import DownloadCancelled, check_cancelled, current_cancel_event
+from space_reservation import InsufficientSpace, get_space_manager
+from zip_extractor import member_path, save_install_manifest, top_level_directory, zip_timestamp
+
+# Zip record signatures and fixed sizes
+EOCD_SIGNATURE = b'PK\x05\x06'
+CENTRAL_SIGNATURE = b'PK\x01\x02'
+LOCAL_SIGNATURE = b'PK\x03\x04'
+EOCD_SIZE = 22
+CENTRAL_HEADER_SIZE = 46
+LOCAL_HEADER_SIZE = 30
+
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+FLAG_ENCRYPTED = 0x1
+FLAG_UTF8 = 0x800
+
+
+def parse_central_directory(data: bytes, count: int) -> List[Dict[str, Any]]:
+    """Parse count central directory entries; raises ValueError on malformed data"""
+    members = []
+    position = 0
+    for _ in range(count):
+        if data[position:position + 4] != CENTRAL_SIGNATURE:
+            raise ValueError("Bad central directory entry")
+        (flags, method, mod_time, mod_date, crc, compressed_size, file_size,
+         name_length, extra_length, comment_length, external_attr,
+         header_offset) = struct.unpack('<8xHHHHIIIHHH4xII', data[position:position + CENTRAL_HEADER_SIZE])
+        raw_name = data[position + CENTRAL_HEADER_SIZE:position + CENTRAL_HEADER_SIZE + name_length]
+        members.append({
+            "name": raw_name.decode('utf-8' if flags & FLAG_UTF8 else 'cp437'),
+            "flags": flags,
+            "method": method,
+            "date_time": ((mod_date >> 9) + 1980, (mod_date >> 5) & 0xF, mod_date & 0x1F,
+                          mod_time >> 11, (mod_time >> 5) & 0x3F, (mod_time & 0x1F) * 2),
+            "crc": crc,
+            "compressed_size": compressed_size,
+            "file_size": file_size,
+            "external_attr": external_attr,
+            "header_offset": header_offset
+        })
+        position += CENTRAL_HEADER_SIZE + name_length + extra_length + comment_length
+    return members
+
+
+class _ArchiveStream:
+    """Reads a response body in exact-size pieces, copying every byte to the archive file"""
+
+    def __init__(self, response, archive, on_bytes):
+        self.raw = response.raw
+        self.archive = archive
+        self.on_bytes = on_bytes
+        self.position = 0
+
+    def read(self, amount: int) -> bytes:
+        data = self.raw.read(amount, decode_content=True)
+        if not data:
+            raise Exception(f"Unexpected end of download at byte {self.position}")
+        self.archive.write(data)
+        self.position += len(data)
+        self.on_bytes(data)
+        return data
+
+    def read_exact(self, amount: int) -> bytes:
+        chunks = []
+        while amount > 0:
+            data = self.read(amount)
+            chunks.append(data)
+            amount -= len(data)
+        return b''.join(chunks)
+
+    def skip_to(self, offset: int, chunk_size: int):
+        while self.position < offset:
+            self.read(min(chunk_size, offset - self.position))
+
+
+class StreamingZipExtractor:
+    """
+    Downloads a zip artifact and extracts it in the same pass
+
+    Used when the archive isn't on disk or in the cache yet. The archive is
+    still written (and digested) on the way, so later runs, the cache and
+    checksum pinning behave as for an ordinary download. Returns False
+    whenever streaming isn't possible (no range support, zip64, encrypted
+    or unusual members) or fails, so the caller can fall back to
+    download-then-extract. Members are written under temporary names and
+    moved into place only once the whole archive has been read and
+    verified, so a failed run leaves destination_dir as it was.
+    """
+
+    PENDING_SUFFIX = ".streaming"  # Extracted members wait under this suffix until the archive verifies
+    TAIL_SIZE = 64 * 1024 + EOCD_SIZE  # The EOCD record sits within the last 64 KB (max comment length)
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, download_manager):
+        self.download_manager = download_manager
+        self.session = download_manager.session
+        self.logger = logging.getLogger(__name__)
+
+    def install(self,
+                component: str,
+                destination_dir: Path,
+                archive_path: Path,
+                version: Optional[str] = None,
+                description: Optional[str] = None,
+                fallback_url: Optional[str] = None,
+                strip_prefix: Optional[str] = None,
+                manifest_path: Optional[Path] = None) -> bool:
+        """
+        Stream a manifest component's archive into destination_dir
+
+        strip_prefix works as in ParallelZipExtractor.extract ("auto" drops
+        the archive's single top-level directory). An install manifest is
+        written to manifest_path for later incremental upgrades.
+
+        Returns:
+            True if the archive was downloaded and fully extracted
+        """
+        dm = self.download_manager
+        if dm.offline_bundle:
+            return False
+
+        artifact = dm.resolve_artifact(component, archive_path, version, fallback_url)
+        if artifact is None:
+            return False
+        url, checksum = artifact["url"], artifact["sha256"]
+
+        # An archive that is already available (or partly prefetched) is extracted from disk
+        if (archive_path.exists() or dm.staged_artifact(url)
+                or (dm.cache and dm.cache.lookup(url=url, checksum=checksum))):
+            return False
+
+        source_url = artifact["sources"][0]
+        try:
+            directory = self._fetch_directory(source_url)
+        except Exception as e:
+            self.logger.info(f"Cannot stream {archive_path.name}, downloading it first: {e}")
+            return False
+        if directory is None:
+            return False
+
+        try:
+            if strip_prefix == "auto":
+                strip_prefix = top_level_directory(m["name"] for m in directory["members"])
+            return self._stream(url, source_url, directory, destination_dir, archive_path, checksum,
+                                description or f"Downloading and extracting {archive_path.name}", strip_prefix,
+                                manifest_path)
+        except DownloadCancelled:
+            archive_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            self.logger.error(f"Streaming extraction of {archive_path.name} failed: {e}")
+            archive_path.unlink(missing_ok=True)
+            return False
+
+    def _fetch_directory(self, source_url: str) -> Optional[Dict[str, Any]]:
+        """HEAD the archive and read its central directory with range requests"""
+        response = self.session.head(source_url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        total_size = int(response.headers.get('content-length', 0))
+        if response.headers.get('accept-ranges') != 'bytes' or total_size < EOCD_SIZE:
+            self.logger.info("Server doesn't support range requests, downloading the archive first")
+            return None
+
+        metadata = {
+            "url": None,
+            "source_url": source_url,
+            "final_url": response.url,
+            "etag": response.headers.get('etag'),
+            "last_modified": response.headers.get('last-modified'),
+            "content_length": total_size
+        }
+
+        tail_start = max(0, total_size - self.TAIL_SIZE)
+        tail = self._get_range(source_url, tail_start, total_size - 1)
+        eocd_at = tail.rfind(EOCD_SIGNATURE)
+        if eocd_at < 0 or len(tail) - eocd_at < EOCD_SIZE:
+            raise ValueError("End of central directory not found")
+
+        count, cd_size, cd_offset = struct.unpack('<10xHII', tail[eocd_at:eocd_at + 20])
+        if count == 0xFFFF or cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF:
+            self.logger.info("Zip64 archive, downloading it first")
+            return None
+
+        if cd_offset >= tail_start:
+            data = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+        else:
+            data = self._get_range(source_url, cd_offset, cd_offset + cd_size - 1)
+        members = parse_central_directory(data, count)
+
+        for member in members:
+            if (member["flags"] & FLAG_ENCRYPTED or member["method"] not in (METHOD_STORED, METHOD_DEFLATED)
+                    or 0xFFFFFFFF in (member["compressed_size"], member["file_size"], member["header_offset"])):
+                self.logger.info(f"Member {member['name']} can't be streamed, downloading the archive first")
+                return None
+
+        self.logger.info(f"Central directory: {len(members)} members, {cd_size} bytes")
+        return {"members": members, "total_size": total_size, "http_metadata": metadata}
+
+    def _get_range(self, url: str, start: int, end: int) -> bytes:
+        response = self.session.get(url, headers={'Range': f'bytes={start}-{end}'}, timeout=30)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise ValueError("Server ignored the range request")
+        return response.content
+
+    def _stream(self, url: str, source_url: str, directory: Dict[str, Any], destination_dir: Path,
+                archive_path: Path, checksum: Optional[str], description: str,
+                strip_prefix: Optional[str] = None, manifest_path: Optional[Path] = None) -> bool:
+        dm = self.download_manager
+        total_size = directory["total_size"]
+        members = sorted(directory["members"], key=lambda m: m["header_offset"])
+        cancel = current_cancel_event()
+        digest = hashlib.sha256()
+        start_time = time.time()
+
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        destination_dir.mkdir(parents=True, exist_ok=True)
+        created: List[Path] = []  # Files and directories this run added, removed again if it fails
+        pending: List[Tuple[Path, Path]] = []  # (temporary file, final path) of extracted members
+        try:
+            # The archive is kept next to the extracted files, so both are booked
+            space = get_space_manager().claim(destination_dir, archive_path.name, Priority.CRITICAL)
+            extracted_size = sum(member["file_size"] for member in members)
+            if not space.reserve(total_size + extracted_size):
+                raise InsufficientSpace(f"Not enough disk space for {archive_path.name} "
+                                        f"({(total_size + extracted_size) / (1024 * 1024):.0f} MB)")
+
+            with space, dm.scheduler.transfer(archive_path.name, Priority.CRITICAL) as transfer, \
+                    dm.progress.track(description, total_size) as item, \
+                    self.session.get(source_url, stream=True, timeout=30) as response, \
+                    open(archive_path, 'wb') as archive:
+                response.raise_for_status()
+
+                def on_bytes(data: bytes):
+                    check_cancelled(cancel, archive_path.name)
+                    space.consume(len(data))
+                    digest.update(data)
+                    item.add(len(data))
+                    transfer.consume(len(data))
+
+                stream = _ArchiveStream(response, archive, on_bytes)
+                for member in members:
+                    stream.skip_to(member["header_offset"], self.CHUNK_SIZE)
+                    header = stream.read_exact(LOCAL_HEADER_SIZE)
+                    if header[:4] != LOCAL_SIGNATURE:
+                        raise ValueError(f"Bad local header for {member['name']}")
+                    name_length, extra_length = struct.unpack('<HH', header[26:30])
+                    stream.read_exact(name_length + extra_length)
+                    self._extract_member(stream, member, destination_dir, strip_prefix, created, pending)
+                    space.consume(member["file_size"])
+
+                # Central directory and anything after the last member
+                stream.skip_to(total_size, self.CHUNK_SIZE)
+
+            actual = digest.hexdigest()
+            if checksum and actual.lower() != checksum.lower():
+                self.logger.error(f"Checksum verification failed for {archive_path.name}")
+                archive_path.unlink(missing_ok=True)
+                self._remove_created(created, destination_dir)
+                return False
+
+            # Verified: move the members into place
+            for temporary, target in pending:
+                os.replace(temporary, target)
+            created.clear()
+
+            # Directory times last, since writing files into them changes them
+            for member in members:
+                target = member_path(destination_dir, member["name"], strip_prefix)
+                if target is not None and member["name"].endswith('/'):
+                    timestamp = zip_timestamp(member["date_time"])
+                    os.utime(target, (timestamp, timestamp))
+
+            if manifest_path is not None:
+                extracted = []
+                for member in members:
+                    target = member_path(destination_dir, member["name"], strip_prefix)
+                    if target is not None and not member["name"].endswith('/'):
+                        extracted.append((member["crc"], member["file_size"], target))
+                save_install_manifest(manifest_path, archive_path.name, destination_dir, extracted)
+
+            http_metadata = dict(directory["http_metadata"], url=url)
+            dm.record_download(url, archive_path, 'sha256', actual, http_metadata, start_time, total_size, "streamed")
+            self.logger.info(f"Extracted {len(members)} members to {destination_dir} while downloading")
+            return True
+        except BaseException:
+            self._remove_created(created, destination_dir)
+            raise
+
+    def _remove_created(self, created: List[Path], destination_dir: Path):
+        """Remove what a failed run extracted, newest first, so only empty new directories go"""
+        for path in reversed(created):
+            try:
+                if path.is_dir():
+                    path.rmdir()
+                else:
+                    path.unlink(missing_ok=True)
+            except OSError as e:
+                self.logger.warning(f"Cannot remove partially extracted {path}: {e}")
+        if created:
+            self.logger.info(f"Removed {len(created)} partially extracted entries from {destination_dir}")
+
+    @staticmethod
+    def _make_dirs(directory: Path, created: List[Path]):
+        """mkdir -p that records the directories it creates"""
+        missing = []
+        while not directory.exists():
+            missing.append(directory)
+            directory = directory.parent
+        for path in reversed(missing):
+            path.mkdir(exist_ok=True)
+            created.append(path)
+
+    def _extract_member(self, stream: _ArchiveStream, member: Dict[str, Any], destination_dir: Path,
+                        strip_prefix: Optional[str], created: List[Path], pending: List[Tuple[Path, Path]]):
+        """Inflate one member from the stream next to its final path (see PENDING_SUFFIX)"""
+        target = member_path(destination_dir, member["name"], strip_prefix)
+        if target is None:
+            if not strip_prefix or member["name"].rstrip('/') + '/' != strip_prefix:
+                self.logger.warning(f"Skipping unsafe member name: {member['name']}")
+            stream.skip_to(stream.position + member["compressed_size"], self.CHUNK_SIZE)
+            return
+
+        if member["name"].endswith('/'):
+            self._make_dirs(target, created)
+            stream.skip_to(stream.position + member["compressed_size"], self.CHUNK_SIZE)
+            return
+
+        self._make_dirs(target.parent, created)
+        temporary = target.with_name(target.name + self.PENDING_SUFFIX)
+        created.append(temporary)
+        pending.append((temporary, target))
+        inflater = zlib.decompressobj(-15) if member["method"] == METHOD_DEFLATED else None
+        crc = 0
+        written = 0
+        remaining = member["compressed_size"]
+        with open(temporary, 'wb') as f:
+            while remaining > 0:
+                data = stream.read(min(self.CHUNK_SIZE, remaining))
+                remaining -= len(data)
+                if inflater:
+                    data = inflater.decompress(data)
+                crc = zlib.crc32(data, crc)
+                written += len(data)
+                f.write(data)
+            if inflater:
+                data = inflater.flush()
+                crc = zlib.crc32(data, crc)
+                written += len(data)
+                f.write(data)
+
+        if written != member["file_size"] or crc != member["crc"]:
+            raise ValueError(f"CRC mismatch in {member['name']}")
+        timestamp = zip_timestamp(member["date_time"])
+        os.utime(temporary, (timestamp, timestamp))
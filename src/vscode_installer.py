@@ -7,40 +7,59 @@ VS Code Installer - Handles VS Code portable installation and configuration
 import os
 import sys
 import json
-import zipfile
 import logging
 import subprocess
 import time
 from pathlib import Path
 from typing import Optional, List, Dict
 from download_manager import DownloadManager
+from streaming_extractor import StreamingZipExtractor
+from zip_extractor import extract_zip
 
 class VSCodeInstaller:
     """Handles VS Code portable installation and configuration"""
     
-    def __init__(self, ai_env_path: Path, logs_path: Path):
+    def __init__(self, ai_env_path: Path, logs_path: Path, download_manager: Optional[DownloadManager] = None):
         self.ai_env_path = ai_env_path
         self.logs_path = logs_path
         self.logger = logging.getLogger(__name__)
-        self.download_manager = DownloadManager(logs_path)
+        self.download_manager = download_manager or DownloadManager(logs_path)
         
         # Installation paths
         self.vscode_path = ai_env_path / "VSCode"
         self.downloads_path = logs_path.parent / "downloads"
+
+        # Installed archive members, so a re-run only writes what changed between releases
+        self.install_manifest = self.vscode_path / ".install_manifest.json"
+
+        # VS Code download URL for Windows 64-bit (used when the artifact manifest has no entry)
+        self.vscode_url = "https://code.visualstudio.com/sha/download?build=stable&os=win32-x64-archive"
+
+        # Local VSIX packages by extension id (offline installs)
+        self.extension_files: Dict[str, Path] = {}
+
+        # Version prefetch() already extracted while downloading (None if it didn't)
+        self.streamed: Optional[str] = None
         
     def install(self, version: str = "latest") -> bool:
         """Install VS Code portable"""
         try:
             self.logger.info(f"Installing VS Code {version}")
             
-            # Download VS Code
-            vscode_zip = self._download_vscode(version)
-            if not vscode_zip:
-                return False
-            
-            # Extract VS Code
-            if not self._extract_vscode(vscode_zip):
-                return False
+            # A fresh install extracts while downloading when the archive isn't on disk yet;
+            # an existing install is upgraded in place from the downloaded archive
+            if self.streamed == version or self._stream_install(version):
+                if not self._check_extraction():
+                    return False
+            else:
+                # Download VS Code
+                vscode_zip = self._download_vscode(version)
+                if not vscode_zip:
+                    return False
+
+                # Extract VS Code
+                if not self._extract_vscode(vscode_zip):
+                    return False
             
             # Configure VS Code for portable use
             if not self._configure_vscode():
@@ -61,19 +80,40 @@ class VSCodeInstaller:
             self.logger.error(f"Error installing VS Code: {e}")
             return False
     
+    def prefetch(self, version: str = "latest") -> bool:
+        """
+        Background download ahead of step 5
+
+        A fresh install is extracted while downloading, so install() only
+        has to configure it; otherwise just the archive is downloaded.
+        """
+        return self._stream_install(version) or self._download_vscode(version) is not None
+
+    def _stream_install(self, version: str) -> bool:
+        """Extract a fresh install while downloading; False if VS Code exists or streaming isn't possible"""
+        if (self.vscode_path / "Code.exe").exists():
+            return False  # Upgrades go through the downloaded archive
+        self.vscode_path.mkdir(parents=True, exist_ok=True)
+        if not StreamingZipExtractor(self.download_manager).install(
+                "vscode", self.vscode_path, self._archive_path(version), version=version,
+                description="Downloading and extracting VS Code", fallback_url=self.vscode_url,
+                strip_prefix="auto", manifest_path=self.install_manifest):
+            return False
+        self.streamed = version
+        self.logger.info("VS Code was extracted while downloading")
+        return True
+
     def _download_vscode(self, version: str) -> Optional[Path]:
         """Download VS Code archive"""
         try:
             self.downloads_path.mkdir(exist_ok=True)
             
-            # VS Code download URL for Windows 64-bit
-            url = "https://code.visualstudio.com/sha/download?build=stable&os=win32-x64-archive"
-            destination = self.downloads_path / f"vscode-{version}-win32-x64.zip"
-            
-            success = self.download_manager.download_file(url, destination)
+            downloaded = self.download_manager.download_artifact(
+                "vscode", self._archive_path(version), version=version, fallback_url=self.vscode_url
+            )
             
-            if success:
-                return destination
+            if downloaded:
+                return downloaded
             else:
                 self.logger.error("Failed to download VS Code")
                 return None
@@ -82,6 +122,10 @@ class VSCodeInstaller:
             self.logger.error(f"Error downloading VS Code: {e}")
             return None
     
+    def _archive_path(self, version: str) -> Path:
+        """Get the download location of the VS Code archive"""
+        return self.downloads_path / f"vscode-{version}-win32-x64.zip"
+
     def _extract_vscode(self, archive_path: Path) -> bool:
         """Extract VS Code archive"""
         try:
@@ -90,22 +134,24 @@ class VSCodeInstaller:
             # Create VS Code directory
             self.vscode_path.mkdir(parents=True, exist_ok=True)
             
-            # Extract archive
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(self.vscode_path)
-            
-            # VS Code extracts to a subdirectory, move contents up
-            extracted_dirs = [d for d in self.vscode_path.iterdir() if d.is_dir()]
-            if len(extracted_dirs) == 1:
-                extracted_dir = extracted_dirs[0]
-                
-                # Move all contents from subdirectory to vscode_path
-                for item in extracted_dir.iterdir():
-                    item.rename(self.vscode_path / item.name)
-                
-                # Remove empty subdirectory
-                extracted_dir.rmdir()
-            
+            # Extract archive; a top-level folder in the archive is stripped on the way. Over an
+            # existing install only new or changed files are written, and files dropped by the
+            # release are removed (user data in data/ is never touched).
+            stats = extract_zip(archive_path, self.vscode_path, strip_prefix="auto", description="Extracting VS Code",
+                                manifest_path=self.install_manifest, preserve=("data",))
+            if stats["unchanged"] or stats["deleted"]:
+                print(f"VS Code upgraded in place: {stats['files']} files written, "
+                      f"{stats['unchanged']} unchanged, {stats['deleted']} removed")
+
+            return self._check_extraction()
+
+        except Exception as e:
+            self.logger.error(f"Error extracting VS Code: {e}")
+            return False
+
+    def _check_extraction(self) -> bool:
+        """Check that the extracted tree has the executable"""
+        try:
             # Verify VS Code executable exists
             vscode_exe = self.vscode_path / "Code.exe"
             if not vscode_exe.exists():
@@ -315,10 +361,10 @@ class VSCodeInstaller:
                 print(f"  [OK] Already installed, skipping")
                 return True
 
-            # Build command
+            # Build command (a bundled VSIX installs without the Marketplace)
             cmd = [
                 str(vscode_exe),
-                "--install-extension", extension,
+                "--install-extension", str(self.extension_files.get(extension, extension)),
                 "--force",
                 "--user-data-dir", str(user_data_path),
                 "--extensions-dir", str(extensions_path)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Wheelhouse - Local directory of resolved wheels for offline pip installs
+The pip set is resolved once, every wheel is downloaded in parallel, and pip then
+installs with --no-index from the wheelhouse instead of downloading inside its resolver
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+from urllib.parse import unquote, urlparse
+
+from artifact_cache import ArtifactCache
+from download_manager import DownloadManager
+from space_reservation import get_space_manager
+
+
+WHEELHOUSE_BUDGET_MB = 4000  # Room a wheelhouse for the AI2025 package set needs (torch is ~2.5 GB)
+
+
+def machine_wheelhouse_dir() -> Path:
+    """Get the machine-wide wheelhouse location (next to the download cache)"""
+    return ArtifactCache.default_cache_dir().parent / "wheelhouse"
+
+
+def candidate_dirs(ai_env_path: Optional[Path] = None) -> List[Path]:
+    """Wheelhouse locations in order of preference: machine-wide, then inside the installation"""
+    candidates = [machine_wheelhouse_dir()]
+    if ai_env_path is not None:
+        candidates.append(Path(ai_env_path) / "Tools" / "wheelhouse")
+    return candidates
+
+
+def find_wheelhouse(ai_env_path: Optional[Path] = None) -> Optional[Path]:
+    """Get an existing wheelhouse with wheels in it, if there is one"""
+    for directory in candidate_dirs(ai_env_path):
+        if directory.is_dir() and any(directory.glob("*.whl")):
+            return directory
+    return None
+
+
+def _write_speed(directory: Path, size_mb: int = 16) -> float:
+    """Measure sequential write speed into directory in MB/s (0 if it isn't writable)"""
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        block = os.urandom(1024 * 1024)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=True) as f:
+            start = time.perf_counter()
+            for _ in range(size_mb):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+            return size_mb / max(time.perf_counter() - start, 1e-6)
+    except OSError:
+        return 0.0
+
+
+def choose_wheelhouse_dir(ai_env_path: Optional[Path] = None) -> Path:
+    """
+    Pick the wheelhouse location
+
+    An existing wheelhouse is reused. Otherwise the candidate with room for
+    WHEELHOUSE_BUDGET_MB and the fastest measured writes wins, which puts
+    the wheelhouse on the internal SSD when installing to a USB drive.
+    """
+    existing = find_wheelhouse(ai_env_path)
+    if existing:
+        return existing
+
+    space = get_space_manager()
+    candidates = [d for d in candidate_dirs(ai_env_path) if space.available(d) >= WHEELHOUSE_BUDGET_MB * 1024 * 1024]
+    if len(candidates) > 1:
+        speeds = {d: _write_speed(d) for d in candidates}
+        logging.getLogger(__name__).info("Wheelhouse write speeds: " +
+                                         ", ".join(f"{d}: {s:.0f} MB/s" for d, s in speeds.items()))
+        return max(candidates, key=lambda d: speeds[d])
+    return candidates[0] if candidates else candidate_dirs(ai_env_path)[-1]
+
+
+class Wheelhouse:
+    """
+    Prefetches resolved wheels into a directory pip can install from offline
+
+    Resolution runs `pip install --dry-run --report` with the interpreter
+    the packages are for, so markers and the Python version match. pip
+    only fetches metadata for that when the index serves it separately
+    (PyPI does). The reported files are then downloaded concurrently
+    through the download manager, which checks their sha256, resumes
+    partial files and skips wheels already in the wheelhouse.
+    """
+
+    WORKERS = 8
+
+    def __init__(self, path: Path, download_manager: Optional[DownloadManager] = None,
+                 find_links: Optional[List[Path]] = None):
+        """
+        Args:
+            find_links: Other local wheel directories (e.g. prefetched wheels) used as they are
+        """
+        self.path = Path(path)
+        self.find_links = [Path(d) for d in find_links or []]
+        self.download_manager = download_manager or DownloadManager(Path(__file__).parent.parent / "logs")
+        self.logger = logging.getLogger(__name__)
+
+    def pip_args(self) -> List[str]:
+        """pip install options that install from the wheelhouse only"""
+        args = ["--no-index", "--find-links", str(self.path)]
+        for directory in self.find_links:
+            args += ["--find-links", str(directory)]
+        return args
+
+    def resolve(self, packages: List[str], python_cmd: Optional[List[str]] = None,
+                python_version: Optional[str] = None, timeout: int = 600,
+                env: Optional[Dict[str, str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Resolve packages and their dependencies to concrete files
+
+        Args:
+            python_cmd: Interpreter command of the target environment (see EnvRunner), run with env.
+                        Without it the installer's Python resolves for Windows and python_version.
+
+        Returns:
+            List of name, version, url, sha256 and filename per file, or None if resolution failed
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report_file = Path(temp_dir) / "report.json"
+            cmd = (python_cmd or [sys.executable]) + [
+                "-m", "pip", "install", "--dry-run", "--quiet", "--report", str(report_file)
+            ]
+            # Wheels already in the wheelhouse resolve to local files and aren't downloaded again
+            for directory in [self.path] + self.find_links:
+                if directory.is_dir():
+                    cmd += ["--find-links", str(directory)]
+            # In the target environment only what is missing gets resolved
+            if python_cmd is None:
+                cmd += ["--ignore-installed", "--target", str(Path(temp_dir) / "target"), "--platform", "win_amd64",
+                        "--python-version", python_version or "3.10", "--implementation", "cp",
+                        "--only-binary=:all:"]
+            cmd += packages
+
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env)
+            except subprocess.TimeoutExpired:
+                self.logger.warning(f"Resolving {len(packages)} packages timed out")
+                return None
+            if result.returncode != 0 or not report_file.exists():
+                self.logger.warning(f"Resolving {len(packages)} packages failed: {result.stderr[-500:]}")
+                return None
+
+            with open(report_file, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+
+        files = []
+        for item in report.get("install", []):
+            info = item.get("download_info", {})
+            url = info.get("url", "")
+            if not url.startswith(("http://", "https://")):
+                continue  # Already in a find_links directory
+            files.append({
+                "name": item["metadata"]["name"],
+                "version": item["metadata"]["version"],
+                "url": url,
+                "sha256": info.get("archive_info", {}).get("hashes", {}).get("sha256"),
+                "filename": unquote(Path(urlparse(url).path).name)
+            })
+        return files
+
+    def prefetch(self, packages: List[str], python_cmd: Optional[List[str]] = None,
+                 python_version: Optional[str] = None,
+                 env: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Resolve packages and download every file into the wheelhouse
+
+        Returns:
+            Statistics (files, bytes, failed, seconds), or None if resolution
+            failed or a file could not be downloaded
+        """
+        start = time.monotonic()
+        files = self.resolve(packages, python_cmd, python_version, env=env)
+        if files is None:
+            return None
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.logger.info(f"Resolved {len(packages)} packages to {len(files)} files")
+        print(f"Downloading {len(files)} wheels into {self.path}...")
+
+        def fetch(entry: Dict[str, Any]) -> bool:
+            return self.download_manager.download_file(entry["url"], self.path / entry["filename"],
+                                                       checksum=entry["sha256"])
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as executor:
+            results = list(executor.map(fetch, files))
+
+        failed = [entry["filename"] for entry, ok in zip(files, results) if not ok]
+        stats = {
+            "files": len(files),
+            "bytes": sum((self.path / entry["filename"]).stat().st_size
+                         for entry, ok in zip(files, results) if ok),
+            "failed": failed,
+            "seconds": round(time.monotonic() - start, 1)
+        }
+        self.logger.info(f"Wheelhouse prefetch: {stats['files']} files, {stats['bytes'] / 1024**2:.0f} MB "
+                         f"in {stats['seconds']}s")
+        if failed:
+            self.logger.warning(f"Wheels not downloaded: {failed}")
+            return None
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch wheels for offline pip installs")
+    parser.add_argument("packages", nargs="*", help="Packages (default: python_packages of install_config.json)")
+    parser.add_argument("--dir", default=None, help="Wheelhouse directory (default: machine-wide)")
+    parser.add_argument("--python", default=None, help="Interpreter to resolve for (default: Windows, --python-version)")
+    parser.add_argument("--python-version", default=None, help="Python version without --python")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    installer_dir = Path(__file__).parent.parent
+    with open(installer_dir / "config" / "install_config.json", 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    from conda_manager import CondaManager
+    packages = args.packages or [CondaManager._fix_package_name(p) for p in config.get("python_packages", [])]
+
+    wheelhouse = Wheelhouse(Path(args.dir) if args.dir else choose_wheelhouse_dir())
+    stats = wheelhouse.prefetch(packages, [args.python] if args.python else None,
+                                args.python_version or config.get("python_version", "3.10"))
+    if stats is None:
+        print("Wheelhouse prefetch failed (see the log)", file=sys.stderr)
+        return 1
+    print(f"{stats['files']} files, {stats['bytes'] / 1024**2:.0f} MB in {stats['seconds']}s -> {wheelhouse.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
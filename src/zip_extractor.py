@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zip Extractor - Parallel zip extraction shared by the installers
+Members are decompressed on a thread pool straight to their final path
+"""
+
+import os
+import sys
+import json
+import zlib
+import time
+import shutil
+import zipfile
+import logging
+import argparse
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable
+
+from bandwidth_scheduler import Priority
+from progress_reporter import get_reporter
+from space_reservation import InsufficientSpace, get_space_manager
+
+
+def member_path(destination_dir: Path, name: str, strip_prefix: Optional[str] = None) -> Optional[Path]:
+    """
+    Map a member name to a path inside destination_dir
+
+    strip_prefix (e.g. "VSCode-win32-x64/") is removed from the front of the
+    name. Returns None for unsafe names and for the stripped prefix itself.
+    """
+    name = name.replace('\\', '/')
+    if strip_prefix:
+        if not name.startswith(strip_prefix):
+            return None
+        name = name[len(strip_prefix):]
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or ':' in parts[0]:
+        return None
+    return destination_dir.joinpath(*parts)
+
+
+def top_level_directory(names: Iterable[str]) -> Optional[str]:
+    """Get "dir/" when every member lives under one top-level directory"""
+    top = None
+    for name in names:
+        name = name.replace('\\', '/')
+        if '/' not in name.strip('/') and not name.endswith('/'):
+            return None  # A file at the top level
+        first = name.split('/', 1)[0] + '/'
+        if top is None:
+            top = first
+        elif first != top:
+            return None
+    return top
+
+
+def zip_timestamp(date_time: tuple) -> float:
+    """Convert a ZipInfo date_time to a local POSIX timestamp"""
+    return time.mktime(tuple(date_time) + (0, 0, -1))
+
+
+MANIFEST_VERSION = 1
+
+
+def load_install_manifest(manifest_path: Path) -> Optional[Dict[str, Dict[str, int]]]:
+    """Get the files (relative path -> crc, size, mtime) recorded by the last extraction"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return manifest["files"]
+    except Exception:
+        return None
+
+
+def save_install_manifest(manifest_path: Path, archive_name: str, destination_dir: Path,
+                          members: Iterable[tuple]):
+    """Record crc, size and installed mtime of every extracted (crc, size, target) member"""
+    files = {}
+    for crc, size, target in members:
+        files[target.relative_to(destination_dir).as_posix()] = {
+            "crc": crc, "size": size, "mtime": int(target.stat().st_mtime)
+        }
+    temp_file = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "archive": archive_name, "files": files}, f)
+    os.replace(temp_file, manifest_path)
+
+
+def file_crc32(path: Path) -> int:
+    """CRC-32 of a file, as stored in zip headers"""
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(1024 * 1024)
+            if not data:
+                return crc
+            crc = zlib.crc32(data, crc)
+
+
+class ParallelZipExtractor:
+    """
+    Extracts a zip archive on a thread pool
+
+    zlib releases the GIL while inflating, so members decompress in
+    parallel; each worker reads through its own ZipFile handle. Directories
+    are created up front, files are written directly to their final path
+    (with strip_prefix removed) and get the member's modification time.
+
+    With a manifest_path the extraction is incremental: the CRC and size of
+    every installed file are recorded there, and the next extraction only
+    writes members that are new or changed, and deletes files the new
+    archive no longer has (except under the preserve directories).
+    """
+
+    DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or self.DEFAULT_WORKERS)
+        self.logger = logging.getLogger(__name__)
+
+    def extract(self,
+                archive_path: Path,
+                destination_dir: Path,
+                strip_prefix: Optional[str] = None,
+                description: Optional[str] = None,
+                manifest_path: Optional[Path] = None,
+                preserve: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Extract archive_path into destination_dir
+
+        Args:
+            strip_prefix: Leading path to drop from every member, or "auto" to
+                          drop the archive's single top-level directory if it has one
+            description: Progress label (no progress display if None)
+            manifest_path: Install manifest enabling incremental extraction
+            preserve: Top-level directories (e.g. "data") never deleted by an incremental extraction
+
+        Returns:
+            Statistics: files, bytes, seconds, files_per_sec, mb_per_sec,
+            and unchanged/deleted file counts
+
+        Raises:
+            InsufficientSpace if the drive can't hold the extracted files
+        """
+        start = time.monotonic()
+        destination_dir.mkdir(parents=True, exist_ok=True)
+
+        with zipfile.ZipFile(archive_path, 'r') as archive:
+            members = archive.infolist()
+
+        if strip_prefix == "auto":
+            strip_prefix = top_level_directory(m.filename for m in members)
+
+        files = []
+        directories = []
+        for member in members:
+            target = member_path(destination_dir, member.filename, strip_prefix)
+            if target is None:
+                if not strip_prefix or member.filename.rstrip('/') + '/' != strip_prefix:
+                    self.logger.warning(f"Skipping unsafe member name: {member.filename}")
+                continue
+            if member.is_dir():
+                directories.append((member, target))
+            else:
+                files.append((member, target))
+
+        all_files = list(files)
+        unchanged = 0
+        installed = None
+        if manifest_path is not None:
+            installed = load_install_manifest(manifest_path)
+            files = self._changed_members(files, destination_dir, installed)
+            unchanged = len(all_files) - len(files)
+
+        # Create every parent up front, so workers never race on mkdir
+        for parent in sorted({target.parent for _, target in files} | {target for _, target in directories}):
+            parent.mkdir(parents=True, exist_ok=True)
+
+        # Largest members first, so one big file doesn't finish last on its own
+        files.sort(key=lambda pair: pair[0].file_size, reverse=True)
+        total_bytes = sum(member.file_size for member, _ in files)
+
+        # Booked before anything is written, so a full drive fails the extraction up front
+        space = get_space_manager().claim(destination_dir, f"extracting {archive_path.name}", Priority.CRITICAL)
+        if not space.reserve(total_bytes):
+            raise InsufficientSpace(f"Not enough disk space to extract {archive_path.name} "
+                                    f"({total_bytes / (1024 * 1024):.0f} MB)")
+
+        handles = threading.local()
+        opened: List[zipfile.ZipFile] = []
+        opened_lock = threading.Lock()
+
+        def archive_handle() -> zipfile.ZipFile:
+            if not hasattr(handles, "archive"):
+                handles.archive = zipfile.ZipFile(archive_path, 'r')
+                with opened_lock:
+                    opened.append(handles.archive)
+            return handles.archive
+
+        def extract_member(member: zipfile.ZipInfo, target: Path, item):
+            with archive_handle().open(member) as source, open(target, 'wb') as output:
+                shutil.copyfileobj(source, output, self.CHUNK_SIZE)
+            timestamp = zip_timestamp(member.date_time)
+            os.utime(target, (timestamp, timestamp))
+            space.consume(member.file_size)
+            if item is not None:
+                item.add(member.file_size)
+
+        try:
+            with self._track(description, total_bytes) as item, \
+                    ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(extract_member, member, target, item) for member, target in files]
+                for future in futures:
+                    future.result()
+        finally:
+            space.release()
+            for handle in opened:
+                handle.close()
+
+        deleted = 0
+        if manifest_path is not None:
+            deleted = self._delete_removed(all_files, destination_dir, installed, preserve)
+            save_install_manifest(manifest_path, archive_path.name, destination_dir,
+                                  ((member.CRC, member.file_size, target) for member, target in all_files))
+
+        # Directory times last, since writing files into them changes them
+        for member, target in directories:
+            timestamp = zip_timestamp(member.date_time)
+            os.utime(target, (timestamp, timestamp))
+
+        elapsed = max(time.monotonic() - start, 1e-6)
+        stats = {
+            "files": len(files),
+            "bytes": total_bytes,
+            "seconds": round(elapsed, 3),
+            "files_per_sec": round(len(files) / elapsed, 1),
+            "mb_per_sec": round(total_bytes / elapsed / (1024 * 1024), 1),
+            "unchanged": unchanged,
+            "deleted": deleted
+        }
+        self.logger.info(f"Extracted {archive_path.name}: {stats['files']} files, "
+                         f"{total_bytes / (1024 * 1024):.1f} MB in {elapsed:.2f}s "
+                         f"({stats['files_per_sec']} files/s, {stats['mb_per_sec']} MB/s, {self.workers} workers)")
+        if manifest_path is not None:
+            self.logger.info(f"Incremental extraction: {unchanged} files unchanged, {deleted} removed")
+        return stats
+
+    def _changed_members(self, files: List[tuple], destination_dir: Path,
+                         installed: Optional[Dict[str, Dict[str, int]]]) -> List[tuple]:
+        """Keep the (member, target) pairs whose installed file differs from the member"""
+        if installed is None:
+            self.logger.info("No install manifest, comparing installed files by content")
+
+        changed = []
+        for member, target in files:
+            try:
+                stat = target.stat()
+            except OSError:
+                changed.append((member, target))
+                continue
+            if stat.st_size != member.file_size:
+                changed.append((member, target))
+                continue
+
+            if installed is not None:
+                # The recorded mtime shows the file wasn't touched since it was written
+                entry = installed.get(target.relative_to(destination_dir).as_posix())
+                if (entry and entry["crc"] == member.CRC and entry["size"] == member.file_size
+                        and entry["mtime"] == int(stat.st_mtime)):
+                    continue
+            elif file_crc32(target) == member.CRC:
+                # Reading is much cheaper than writing on USB drives
+                continue
+            changed.append((member, target))
+        return changed
+
+    def _delete_removed(self, files: List[tuple], destination_dir: Path,
+                        installed: Optional[Dict[str, Dict[str, int]]], preserve: Iterable[str]) -> int:
+        """Delete previously extracted files that the archive no longer contains"""
+        if not installed:
+            return 0
+
+        current = {target.relative_to(destination_dir).as_posix() for _, target in files}
+        preserved = tuple(name.strip('/') + '/' for name in preserve)
+        deleted = 0
+        parents = set()
+        for relative in installed:
+            if relative in current or relative.startswith(preserved):
+                continue
+            path = destination_dir / relative
+            try:
+                path.unlink()
+                deleted += 1
+                parents.add(path.parent)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"Could not remove {relative}: {e}")
+
+        # Remove directories left empty, deepest first
+        for parent in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+            while parent != destination_dir and destination_dir in parent.parents:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+        return deleted
+
+    def _track(self, description: Optional[str], total: int):
+        return get_reporter().track(description, total) if description else nullcontext()
+
+
+def extract_zip(archive_path: Path, destination_dir: Path, strip_prefix: Optional[str] = None,
+                description: Optional[str] = None, workers: Optional[int] = None,
+                manifest_path: Optional[Path] = None, preserve: Iterable[str] = ()) -> Dict[str, Any]:
+    """Extract an archive with a ParallelZipExtractor (see ParallelZipExtractor.extract)"""
+    return ParallelZipExtractor(workers).extract(archive_path, destination_dir, strip_prefix, description,
+                                                 manifest_path, preserve)
+
+
+def main():
+    """Extract an archive and optionally compare with zipfile.extractall on the same drive"""
+    parser = argparse.ArgumentParser(description="Parallel zip extraction")
+    parser.add_argument("archive", help="Zip archive to extract")
+    parser.add_argument("destination", help="Target directory")
+    parser.add_argument("--strip", default=None, help='Prefix to strip from member names ("auto" for the top-level directory)')
+    parser.add_argument("--workers", type=int, default=None, help="Extraction threads")
+    parser.add_argument("--compare", action="store_true", help="Also time zipfile.extractall into <destination>.extractall")
+    parser.add_argument("--manifest", default=None, help="Install manifest for an incremental extraction")
+    parser.add_argument("--preserve", action="append", default=[], help="Directory never deleted by an incremental extraction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    archive = Path(args.archive)
+    destination = Path(args.destination)
+
+    stats = extract_zip(archive, destination, args.strip, workers=args.workers,
+                        manifest_path=Path(args.manifest) if args.manifest else None, preserve=args.preserve)
+    print(f"Parallel:   {stats['files']} files, {stats['bytes'] / (1024 * 1024):.1f} MB in {stats['seconds']:.2f}s "
+          f"({stats['files_per_sec']} files/s, {stats['mb_per_sec']} MB/s)")
+    if args.manifest:
+        print(f"Incremental: {stats['unchanged']} unchanged, {stats['deleted']} removed")
+
+    if args.compare:
+        baseline = destination.with_name(destination.name + ".extractall")
+        start = time.monotonic()
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            zip_ref.extractall(baseline)
+        elapsed = max(time.monotonic() - start, 1e-6)
+        print(f"extractall: {stats['files']} files, {stats['bytes'] / (1024 * 1024):.1f} MB in {elapsed:.2f}s "
+              f"({stats['files'] / elapsed:.1f} files/s, {stats['bytes'] / elapsed / (1024 * 1024):.1f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())